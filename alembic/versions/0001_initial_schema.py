@@ -0,0 +1,127 @@
+"""initial schema
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases created earlier by Base.metadata.create_all() are stamped at
+    # this revision instead of applying it, see database/migrate.py.
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('telegram_id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=255), nullable=True),
+        sa.Column('language', sa.String(length=10), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('telegram_id')
+    )
+    op.create_table(
+        'subscriptions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('plan_type', sa.Integer(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'autopost_settings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.String(length=255), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('style', sa.String(length=50), nullable=True),
+        sa.Column('posts_per_day', sa.Integer(), nullable=True),
+        sa.Column('specific_times', sa.Text(), nullable=True),
+        sa.Column('weekdays_only', sa.Boolean(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'transactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('currency', sa.String(length=10), nullable=True),
+        sa.Column('payment_method', sa.String(length=50), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('external_id', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'action_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action_type', sa.String(length=100), nullable=False),
+        sa.Column('details', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'test_post_limits',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('test_date', sa.Date(), nullable=False),
+        sa.Column('channel_username', sa.String(length=255), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=True),
+        sa.Column('style', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_test_post_limits_user_created', 'test_post_limits', ['user_id', 'created_at'])
+    op.create_index('idx_test_post_limits_user_date', 'test_post_limits', ['user_id', 'test_date'])
+    op.create_table(
+        'post_logs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.String(length=255), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('style', sa.String(length=50), nullable=False),
+        sa.Column('post_type', sa.String(length=20), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_post_logs_user_date', 'post_logs', ['user_id', 'created_at'])
+    op.create_index('idx_post_logs_user_channel_date', 'post_logs', ['user_id', 'channel_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_post_logs_user_channel_date', table_name='post_logs')
+    op.drop_index('idx_post_logs_user_date', table_name='post_logs')
+    op.drop_table('post_logs')
+    op.drop_index('idx_test_post_limits_user_date', table_name='test_post_limits')
+    op.drop_index('idx_test_post_limits_user_created', table_name='test_post_limits')
+    op.drop_table('test_post_limits')
+    op.drop_table('action_logs')
+    op.drop_table('transactions')
+    op.drop_table('autopost_settings')
+    op.drop_table('subscriptions')
+    op.drop_table('users')
@@ -0,0 +1,36 @@
+"""store plan_type on transactions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('plan_type', sa.Integer(), nullable=True))
+
+    # Older rows only have the paid amount; map the historical prices back to plans
+    op.execute(
+        "UPDATE transactions SET plan_type = CASE amount "
+        "WHEN 100 THEN 7 WHEN 180 THEN 14 WHEN 300 THEN 30 END "
+        "WHERE plan_type IS NULL"
+    )
+
+    op.create_index('idx_transactions_status_created', 'transactions', ['status', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_transactions_status_created', table_name='transactions')
+    op.drop_column('transactions', 'plan_type')
@@ -0,0 +1,30 @@
+"""record send outcome details on post_logs
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('post_logs', sa.Column('error_class', sa.String(length=100), nullable=True))
+    op.add_column('post_logs', sa.Column('latency_ms', sa.Integer(), nullable=True))
+    op.add_column('post_logs', sa.Column('message_id', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('post_logs', 'message_id')
+    op.drop_column('post_logs', 'latency_ms')
+    op.drop_column('post_logs', 'error_class')
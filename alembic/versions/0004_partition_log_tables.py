@@ -0,0 +1,172 @@
+"""partition post_logs and action_logs by month
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from datetime import date, datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+POST_LOG_COLUMNS = (
+    'id, user_id, channel_id, category, style, post_type, success, '
+    'error_class, error_message, latency_ms, message_id'
+)
+ACTION_LOG_COLUMNS = 'id, user_id, action_type, details'
+
+MONTHS_AHEAD = 2
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_monthly_partitions(table: str, first_month: date) -> None:
+    last_month = _add_months(datetime.utcnow().date().replace(day=1), MONTHS_AHEAD)
+
+    month = first_month
+    while month <= last_month:
+        next_month = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_y{month.year:04d}m{month.month:02d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+        month = next_month
+
+
+def _first_month(table: str) -> date:
+    oldest = op.get_bind().execute(sa.text(f"SELECT min(created_at) FROM {table}")).scalar()
+    if oldest is None:
+        return datetime.utcnow().date().replace(day=1)
+    return date(oldest.year, oldest.month, 1)
+
+
+def _swap_to_partitioned(table: str, columns: Sequence[sa.Column], indexes: Sequence[tuple],
+                         copy_columns: str, created_at_expr: str) -> None:
+    first_month = _first_month(table)
+
+    op.rename_table(table, f"{table}_legacy")
+    for name, _ in indexes:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute(f"ALTER TABLE {table}_legacy DROP CONSTRAINT {table}_pkey")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq AS bigint")
+
+    op.create_table(
+        table,
+        sa.Column('id', sa.BigInteger(), server_default=sa.text(f"nextval('{table}_id_seq')"), nullable=False),
+        *columns,
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)'
+    )
+    for name, index_columns in indexes:
+        op.create_index(name, table, list(index_columns))
+
+    _create_monthly_partitions(table, first_month)
+
+    op.execute(
+        f"INSERT INTO {table} ({copy_columns}, created_at) "
+        f"SELECT {copy_columns}, {created_at_expr} FROM {table}_legacy"
+    )
+
+    # Keep the id sequence alive when the legacy table goes away
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.drop_table(f"{table}_legacy")
+
+
+def _swap_to_plain(table: str, columns: Sequence[sa.Column], indexes: Sequence[tuple],
+                   plain_indexes: Sequence[tuple], copy_columns: str,
+                   created_at_type: sa.types.TypeEngine, created_at_expr: str) -> None:
+    op.rename_table(table, f"{table}_partitioned")
+    for name, _ in indexes:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute(f"ALTER TABLE {table}_partitioned DROP CONSTRAINT {table}_pkey")
+
+    op.create_table(
+        table,
+        sa.Column('id', sa.Integer(), server_default=sa.text(f"nextval('{table}_id_seq')"), nullable=False),
+        *columns,
+        sa.Column('created_at', created_at_type, nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    for name, index_columns in plain_indexes:
+        op.create_index(name, table, list(index_columns))
+
+    op.execute(
+        f"INSERT INTO {table} ({copy_columns}, created_at) "
+        f"SELECT {copy_columns}, {created_at_expr} FROM {table}_partitioned"
+    )
+
+    op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {table}_partitioned CASCADE")
+    op.execute(f"ALTER SEQUENCE {table}_id_seq AS integer")
+
+
+def _post_log_columns():
+    return [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('channel_id', sa.String(length=255), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('style', sa.String(length=50), nullable=False),
+        sa.Column('post_type', sa.String(length=20), nullable=True),
+        sa.Column('success', sa.Boolean(), nullable=True),
+        sa.Column('error_class', sa.String(length=100), nullable=True),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('latency_ms', sa.Integer(), nullable=True),
+        sa.Column('message_id', sa.BigInteger(), nullable=True),
+    ]
+
+
+def _action_log_columns():
+    return [
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('action_type', sa.String(length=100), nullable=False),
+        sa.Column('details', sa.Text(), nullable=True),
+    ]
+
+
+POST_LOG_INDEXES = (
+    ('idx_post_logs_user_date', ('user_id', 'created_at')),
+    ('idx_post_logs_user_channel_date', ('user_id', 'channel_id', 'created_at')),
+)
+ACTION_LOG_INDEXES = (
+    ('idx_action_logs_user_created', ('user_id', 'created_at')),
+    ('idx_action_logs_type_created', ('action_type', 'created_at')),
+)
+
+
+def upgrade() -> None:
+    # post_logs.created_at was a DATE; legacy rows land at midnight of their day
+    _swap_to_partitioned(
+        'post_logs', _post_log_columns(), POST_LOG_INDEXES,
+        POST_LOG_COLUMNS, "COALESCE(created_at, CURRENT_DATE)::timestamp"
+    )
+    _swap_to_partitioned(
+        'action_logs', _action_log_columns(), ACTION_LOG_INDEXES,
+        ACTION_LOG_COLUMNS, "COALESCE(created_at, now() AT TIME ZONE 'utc')"
+    )
+
+
+def downgrade() -> None:
+    _swap_to_plain(
+        'action_logs', _action_log_columns(), ACTION_LOG_INDEXES, (),
+        ACTION_LOG_COLUMNS, sa.DateTime(), "created_at"
+    )
+    _swap_to_plain(
+        'post_logs', _post_log_columns(), POST_LOG_INDEXES, POST_LOG_INDEXES,
+        POST_LOG_COLUMNS, sa.Date(), "created_at::date"
+    )
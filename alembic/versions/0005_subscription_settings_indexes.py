@@ -0,0 +1,51 @@
+"""composite and partial indexes for subscription and autopost lookups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Built concurrently so the bot keeps writing to these tables meanwhile
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_subscriptions_user_active_expires', 'subscriptions',
+            ['user_id', 'is_active', 'expires_at'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_subscriptions_active_expires', 'subscriptions', ['expires_at'],
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_autopost_settings_user_active', 'autopost_settings',
+            ['user_id', 'is_active'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.create_index(
+            'idx_autopost_settings_active', 'autopost_settings', ['user_id'],
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_autopost_settings_active', table_name='autopost_settings', postgresql_concurrently=True)
+        op.drop_index('idx_autopost_settings_user_active', table_name='autopost_settings', postgresql_concurrently=True)
+        op.drop_index('idx_subscriptions_active_expires', table_name='subscriptions', postgresql_concurrently=True)
+        op.drop_index('idx_subscriptions_user_active_expires', table_name='subscriptions', postgresql_concurrently=True)
@@ -0,0 +1,46 @@
+"""extend the active subscriptions index with id for keyset pagination
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (expires_at, id) serves both the expiry scans and the admin list seek,
+    # so it replaces the expires_at-only partial index
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_subscriptions_active_expires_id', 'subscriptions', ['expires_at', 'id'],
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index(
+            'idx_subscriptions_active_expires', table_name='subscriptions',
+            postgresql_concurrently=True, if_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_subscriptions_active_expires', 'subscriptions', ['expires_at'],
+            postgresql_where=sa.text('is_active'),
+            postgresql_concurrently=True, if_not_exists=True
+        )
+        op.drop_index(
+            'idx_subscriptions_active_expires_id', table_name='subscriptions',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,36 @@
+"""trigram index on lower(username) for admin user search
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_username_trgm "
+            "ON users USING gin (lower(username) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    # The extension is left in place, other objects may depend on it
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_users_username_trgm', table_name='users',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,43 @@
+"""channels table tracking the bot's membership and rights
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'channels',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('handle', sa.String(length=255), nullable=True),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('type', sa.String(length=32), nullable=True),
+        sa.Column('status', sa.String(length=32), nullable=False),
+        sa.Column('is_admin', sa.Boolean(), nullable=False),
+        sa.Column('can_post', sa.Boolean(), nullable=False),
+        sa.Column('member_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('chat_id')
+    )
+    op.create_index(op.f('ix_channels_handle'), 'channels', ['handle'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_channels_handle'), table_name='channels')
+    op.drop_table('channels')
@@ -0,0 +1,57 @@
+"""daily rollup tables for analytics
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The bot's startup create_all may have created these already
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'daily_stats' not in existing:
+        op.create_table(
+            'daily_stats',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('new_users', sa.Integer(), nullable=False),
+            sa.Column('active_subscriptions', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('day')
+        )
+    if 'daily_revenue_stats' not in existing:
+        op.create_table(
+            'daily_revenue_stats',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('plan_type', sa.Integer(), nullable=False),
+            sa.Column('purchases', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'plan_type')
+        )
+    if 'daily_post_stats' not in existing:
+        op.create_table(
+            'daily_post_stats',
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('sent', sa.Integer(), nullable=False),
+            sa.Column('failed', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('day', 'category')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_post_stats')
+    op.drop_table('daily_revenue_stats')
+    op.drop_table('daily_stats')
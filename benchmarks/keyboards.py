@@ -0,0 +1,79 @@
+"""Micro-benchmark for the memoized keyboards in bot/keyboards.py.
+
+Compares the hot menu paths built from scratch (the ``__wrapped__`` builder)
+with the prebuilt / LRU cached versions: time per call and bytes of keyboard
+objects allocated per call.
+
+    python -m benchmarks.keyboards --calls 20000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from bot import keyboards
+
+SELECTED = ['it', 'crypto']
+
+HOT_PATHS = {
+    'main menu': (
+        keyboards.get_main_menu_keyboard.__wrapped__,
+        keyboards.get_main_menu_keyboard,
+    ),
+    'profile': (
+        keyboards.get_profile_keyboard.__wrapped__,
+        keyboards.get_profile_keyboard,
+    ),
+    'category selection (2 selected)': (
+        lambda: keyboards._category_selection_keyboard.__wrapped__(frozenset(SELECTED)),
+        lambda: keyboards.get_category_selection_keyboard_new(SELECTED),
+    ),
+    'style selection': (
+        lambda: keyboards.get_style_selection_keyboard_new.__wrapped__('casual'),
+        lambda: keyboards.get_style_selection_keyboard_new('casual'),
+    ),
+    'manual post': (
+        lambda: keyboards.get_manual_post_keyboard.__wrapped__(False),
+        lambda: keyboards.get_manual_post_keyboard(False),
+    ),
+}
+
+
+def time_per_call(build, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        build()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def bytes_per_call(build, calls: int) -> float:
+    # Results are kept alive so every allocation of the markup is counted
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = [build() for _ in range(calls)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del results
+    return (after - before) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'path':<34}{'built us':>10}{'cached us':>11}{'built B':>10}{'cached B':>10}")
+    for name, (built, cached) in HOT_PATHS.items():
+        cached()
+        print(
+            f"{name:<34}"
+            f"{time_per_call(built, args.calls):>10.2f}"
+            f"{time_per_call(cached, args.calls):>11.2f}"
+            f"{bytes_per_call(built, args.calls // 10):>10.0f}"
+            f"{bytes_per_call(cached, args.calls // 10):>10.0f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from config.settings import settings
+
+
+def create_bot() -> Bot:
+    """Creates a Bot that talks to TELEGRAM_API_URL when one is configured."""
+    if settings.TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.TELEGRAM_API_URL))
+        return Bot(token=settings.BOT_TOKEN, session=session)
+
+    return Bot(token=settings.BOT_TOKEN)
@@ -3,10 +3,9 @@ from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKe
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, desc
+from sqlalchemy import select, and_, func, desc, tuple_
 from datetime import datetime, timedelta
-from database.models import User, Subscription, Transaction
-from database.database import get_db
+from database.models import User, Subscription
 from bot.keyboards import (
     get_admin_keyboard, get_admin_back_keyboard,
     get_admin_users_keyboard, get_admin_sources_keyboard,
@@ -14,7 +13,13 @@ from bot.keyboards import (
     get_admin_sites_keyboard, get_admin_logs_keyboard
 )
 from bot.states import AdminStates
+from services.analytics_service import AnalyticsService
+from services.user_context_service import UserContextService
+from services.profile_service import ProfileService
+from services.redis_client import get_redis
+from services.user_search_service import UserSearchService
 from config.settings import settings
+import html
 import logging
 import uuid
 
@@ -74,59 +79,129 @@ async def admin_panel(message: Message, state: FSMContext):
     )
 
 
+USERS_PER_PAGE = 10
+USERS_TOTAL_KEY = 'admin:active_subscriptions_total'
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _encode_users_cursor(subscription: Subscription) -> str:
+    # Microseconds since epoch keep the callback data well under Telegram's 64 bytes
+    return f"{(subscription.expires_at - _EPOCH) // timedelta(microseconds=1)}_{subscription.id}"
+
+
+def _parse_users_callback(data: str):
+    """Returns (direction, page, expires_at, subscription_id) for a users list callback."""
+    parts = data.split("_")
+    if len(parts) != 6 or parts[2] not in ('next', 'prev'):
+        return None, 0, None, None
+
+    return parts[2], int(parts[3]), _EPOCH + timedelta(microseconds=int(parts[4])), int(parts[5])
+
+
+async def _get_active_subscriptions_total(db: AsyncSession) -> int:
+    try:
+        cached = await get_redis().get(USERS_TOTAL_KEY)
+        if cached is not None:
+            return int(cached)
+    except Exception as e:
+        logging.warning(f"Failed to read cached subscription total: {e}")
+
+    result = await db.execute(
+        select(func.count(Subscription.id)).where(Subscription.is_active == True)
+    )
+    total = result.scalar()
+
+    try:
+        await get_redis().set(USERS_TOTAL_KEY, total, ex=settings.ADMIN_USERS_TOTAL_TTL)
+    except Exception as e:
+        logging.warning(f"Failed to cache subscription total: {e}")
+
+    return total
+
+
+async def _fetch_users_page(db: AsyncSession, direction: str = None, expires_at: datetime = None, subscription_id: int = None):
+    """Seeks one page of active subscriptions ordered by (expires_at, id) descending.
+
+    Returns the rows in display order and whether more rows exist in the
+    direction of travel.
+    """
+    query = select(Subscription, User).join(User).where(Subscription.is_active == True)
+    position = tuple_(Subscription.expires_at, Subscription.id)
+
+    if direction == 'prev':
+        query = query.where(position > tuple_(expires_at, subscription_id)).order_by(
+            Subscription.expires_at.asc(), Subscription.id.asc()
+        )
+    else:
+        if direction == 'next':
+            query = query.where(position < tuple_(expires_at, subscription_id))
+        query = query.order_by(Subscription.expires_at.desc(), Subscription.id.desc())
+
+    result = await db.execute(query.limit(USERS_PER_PAGE + 1))
+    rows = result.all()
+
+    has_more = len(rows) > USERS_PER_PAGE
+    rows = rows[:USERS_PER_PAGE]
+    if direction == 'prev':
+        rows.reverse()
+
+    return rows, has_more
+
+
 @router.callback_query(F.data == "admin_users")
 @router.callback_query(F.data.startswith("admin_users_page_"))
-async def show_users(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(F.data.startswith("admin_users_next_"))
+@router.callback_query(F.data.startswith("admin_users_prev_"))
+async def show_users(callback: CallbackQuery, state: FSMContext, read_db: AsyncSession):
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Access denied", show_alert=True)
         return
 
-    page = 0
-    if callback.data.startswith("admin_users_page_"):
-        page = int(callback.data.split("_")[-1])
-
     try:
-        async for db in get_db():
-            count_result = await db.execute(
-                select(func.count(Subscription.id)).where(Subscription.is_active == True)
-            )
-            total_count = count_result.scalar()
-
-            users_per_page = 10
-            total_pages = (total_count + users_per_page - 1) // users_per_page
-            offset = page * users_per_page
-
-            result = await db.execute(
-                select(Subscription, User)
-                .join(User)
-                .where(Subscription.is_active == True)
-                .order_by(Subscription.expires_at.desc())
-                .offset(offset)
-                .limit(users_per_page)
-            )
-            subscriptions = result.all()
+        # Old offset-based buttons fall back to the first page
+        direction, page, expires_at, subscription_id = _parse_users_callback(callback.data)
 
-            if not subscriptions and page == 0:
-                await send_text_only(
-                    callback,
-                    "👥 <b>Users</b>\n\n❌ No active subscriptions",
-                    get_admin_users_keyboard(page, total_pages)
-                )
-            else:
-                users_text = f"👥 <b>Users</b> (page {page + 1}/{total_pages})\n\n"
+        subscriptions, has_more = await _fetch_users_page(read_db, direction, expires_at, subscription_id)
+
+        # The cursor row may have been disabled meanwhile, start over instead of showing an empty page
+        if not subscriptions and direction:
+            direction, page = None, 0
+            subscriptions, has_more = await _fetch_users_page(read_db)
+
+        # Reaching the start while paging back means this is the first page
+        if direction == 'prev' and not has_more:
+            page = 0
 
-                for subscription, user in subscriptions:
-                    expires_date = subscription.expires_at.strftime('%d.%m.%Y %H:%M')
-                    username = f"@{user.username}" if user.username else f"ID: {user.telegram_id}"
+        total_count = await _get_active_subscriptions_total(read_db)
+        total_pages = max((total_count + USERS_PER_PAGE - 1) // USERS_PER_PAGE, page + 1)
 
-                    users_text += (
-                        f"👤 {username}\n"
-                        f"📦 Plan: {subscription.plan_type} days\n"
-                        f"⏰ Until: {expires_date}\n\n"
-                    )
+        prev_cursor = _encode_users_cursor(subscriptions[0][0]) if subscriptions and page > 0 else None
+        next_cursor = (
+            _encode_users_cursor(subscriptions[-1][0])
+            if subscriptions and (has_more or direction == 'prev') else None
+        )
+        keyboard = get_admin_users_keyboard(page, total_pages, prev_cursor, next_cursor)
+
+        if not subscriptions:
+            await send_text_only(
+                callback,
+                "👥 <b>Users</b>\n\n❌ No active subscriptions",
+                keyboard
+            )
+        else:
+            users_text = f"👥 <b>Users</b> (page {page + 1}/~{total_pages})\n\n"
 
-                await send_text_only(callback, users_text, get_admin_users_keyboard(page, total_pages))
-            break
+            for subscription, user in subscriptions:
+                expires_date = subscription.expires_at.strftime('%d.%m.%Y %H:%M')
+                username = f"@{user.username}" if user.username else f"ID: {user.telegram_id}"
+
+                users_text += (
+                    f"👤 {username}\n"
+                    f"📦 Plan: {subscription.plan_type} days\n"
+                    f"⏰ Until: {expires_date}\n\n"
+                )
+
+            await send_text_only(callback, users_text, keyboard)
 
     except Exception as e:
         logging.error(f"Error retrieving user list: {e}")
@@ -161,7 +236,7 @@ async def add_subscription_prompt(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(AdminStates.adding_subscription)
-async def process_add_subscription(message: Message, state: FSMContext):
+async def process_add_subscription(message: Message, state: FSMContext, db: AsyncSession):
     try:
         parts = message.text.strip().split('|')
         if len(parts) != 2:
@@ -185,42 +260,42 @@ async def process_add_subscription(message: Message, state: FSMContext):
             await message.answer("❌ Only plans available: 7, 14, 30 days")
             return
 
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == telegram_id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await message.answer(f"❌ User with ID {telegram_id} was not found in the system")
-                return
-
-            expires_at = datetime.utcnow() + timedelta(days=days)
-            subscription = Subscription(
-                user_id=user.id,
-                plan_type=days,
-                expires_at=expires_at,
-                is_active=True
-            )
-            db.add(subscription)
-            await db.commit()
-
-            success_text = (
-                "✅ <b>Subscription added!</b>\n\n"
-                f"👤 User: @{user.username or 'Unknown'}\n"
-                f"🆔 Telegram ID: {telegram_id}\n"
-                f"📦 Plan: {days} days\n"
-                f"📅 Valid until: {expires_at.strftime('%d.%m.%Y %H:%M')}"
-            )
+        user_result = await db.execute(
+            select(User).where(User.telegram_id == telegram_id)
+        )
+        user = user_result.scalar_one_or_none()
 
-            await message.answer(
-                success_text,
-                reply_markup=get_admin_back_keyboard(),
-                parse_mode='HTML'
-            )
+        if not user:
+            await message.answer(f"❌ User with ID {telegram_id} was not found in the system")
+            return
 
-            logging.info(f"Admin {message.from_user.id} added subscription: {telegram_id}|{days} days")
-            break
+        expires_at = datetime.utcnow() + timedelta(days=days)
+        subscription = Subscription(
+            user_id=user.id,
+            plan_type=days,
+            expires_at=expires_at,
+            is_active=True
+        )
+        db.add(subscription)
+        await db.commit()
+        await UserContextService.invalidate(telegram_id)
+        await ProfileService.invalidate(telegram_id)
+
+        success_text = (
+            "✅ <b>Subscription added!</b>\n\n"
+            f"👤 User: @{user.username or 'Unknown'}\n"
+            f"🆔 Telegram ID: {telegram_id}\n"
+            f"📦 Plan: {days} days\n"
+            f"📅 Valid until: {expires_at.strftime('%d.%m.%Y %H:%M')}"
+        )
+
+        await message.answer(
+            success_text,
+            reply_markup=get_admin_back_keyboard(),
+            parse_mode='HTML'
+        )
+
+        logging.info(f"Admin {message.from_user.id} added subscription: {telegram_id}|{days} days")
 
     except Exception as e:
         logging.error(f"Error adding subscription: {e}")
@@ -250,7 +325,7 @@ async def disable_subscription_prompt(callback: CallbackQuery, state: FSMContext
 
 
 @router.message(AdminStates.disabling_subscription)
-async def process_disable_subscription(message: Message, state: FSMContext):
+async def process_disable_subscription(message: Message, state: FSMContext, db: AsyncSession):
     try:
         telegram_id = message.text.strip()
 
@@ -260,43 +335,43 @@ async def process_disable_subscription(message: Message, state: FSMContext):
 
         telegram_id = int(telegram_id)
 
-        async for db in get_db():
-            result = await db.execute(
-                select(Subscription, User)
-                .join(User)
-                .where(
-                    and_(
-                        User.telegram_id == telegram_id,
-                        Subscription.is_active == True
-                    )
+        result = await db.execute(
+            select(Subscription, User)
+            .join(User)
+            .where(
+                and_(
+                    User.telegram_id == telegram_id,
+                    Subscription.is_active == True
                 )
             )
-            subscription_user = result.first()
+        )
+        subscription_user = result.first()
 
-            if not subscription_user:
-                await message.answer(f"❌ No active subscription found for user {telegram_id}")
-                return
+        if not subscription_user:
+            await message.answer(f"❌ No active subscription found for user {telegram_id}")
+            return
 
-            subscription, user = subscription_user
+        subscription, user = subscription_user
 
-            subscription.is_active = False
-            await db.commit()
+        subscription.is_active = False
+        await db.commit()
+        await UserContextService.invalidate(telegram_id)
+        await ProfileService.invalidate(telegram_id)
 
-            success_text = (
-                "✅ <b>Subscription disabled!</b>\n\n"
-                f"👤 User: @{user.username or 'Unknown'}\n"
-                f"🆔 Telegram ID: {telegram_id}\n"
-                f"📦 Previous plan: {subscription.plan_type} days"
-            )
+        success_text = (
+            "✅ <b>Subscription disabled!</b>\n\n"
+            f"👤 User: @{user.username or 'Unknown'}\n"
+            f"🆔 Telegram ID: {telegram_id}\n"
+            f"📦 Previous plan: {subscription.plan_type} days"
+        )
 
-            await message.answer(
-                success_text,
-                reply_markup=get_admin_back_keyboard(),
-                parse_mode='HTML'
-            )
+        await message.answer(
+            success_text,
+            reply_markup=get_admin_back_keyboard(),
+            parse_mode='HTML'
+        )
 
-            logging.info(f"Admin {message.from_user.id} disabled subscription for user {telegram_id}")
-            break
+        logging.info(f"Admin {message.from_user.id} disabled subscription for user {telegram_id}")
 
     except Exception as e:
         logging.error(f"Ошибка отключения подписки: {e}")
@@ -319,7 +394,8 @@ async def search_user_prompt(callback: CallbackQuery, state: FSMContext):
         "Send the Telegram ID or username:\n\n"
         "<b>Examples:</b>\n"
         "<code>123456789</code>\n"
-        "<code>@username</code>"
+        "<code>@username</code>\n"
+        "<code>usern</code> (prefix or similar names)"
     )
 
     await send_text_only(callback, text, get_admin_back_keyboard())
@@ -327,65 +403,48 @@ async def search_user_prompt(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(AdminStates.searching_user)
-async def process_search_user(message: Message, state: FSMContext):
+async def process_search_user(message: Message, state: FSMContext, read_db: AsyncSession):
     try:
         search_query = message.text.strip()
 
-        async for db in get_db():
-            if search_query.startswith('@'):
-                username = search_query[1:]
-                result = await db.execute(
-                    select(User, Subscription)
-                    .outerjoin(Subscription)
-                    .where(User.username == username)
-                )
-            elif search_query.isdigit():
-                telegram_id = int(search_query)
-                result = await db.execute(
-                    select(User, Subscription)
-                    .outerjoin(Subscription)
-                    .where(User.telegram_id == telegram_id)
-                )
-            else:
-                await message.answer("❌ Неверный формат поиска")
-                return
+        if not search_query.lstrip('@'):
+            await message.answer("❌ Неверный формат поиска")
+            return
 
-            user_data = result.all()
+        results = await UserSearchService.search(read_db, search_query)
 
-            if not user_data:
-                await message.answer(
-                    f"❌ User <code>{search_query}</code> not found",
-                    parse_mode='HTML'
-                )
-                return
+        if not results:
+            await message.answer(
+                f"❌ User <code>{html.escape(search_query)}</code> not found",
+                parse_mode='HTML'
+            )
+            return
+
+        result_text = f"👤 <b>Users found:</b> {len(results)}\n\n"
 
-            user = user_data[0][0]  # Первый пользователь
-            subscriptions = [row[1] for row in user_data if row[1]]
+        for found in results:
+            username = f"@{html.escape(found.username)}" if found.username else "Not specified"
+            registered = found.created_at.strftime('%d.%m.%Y %H:%M') if found.created_at else "-"
 
-            result_text = (
-                f"👤 <b>User found</b>\n\n"
-                f"🆔 ID: <code>{user.telegram_id}</code>\n"
-                f"👤 Username: @{user.username or 'Not specified'}\n"
-                f"📅 Registered: {user.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
+            result_text += (
+                f"🆔 <code>{found.telegram_id}</code> {username}\n"
+                f"📅 Registered: {registered}\n"
             )
 
-            if subscriptions:
-                result_text += "<b>📦 Подписки:</b>\n"
-                for sub in subscriptions:
-                    status = "🟢 Активна" if sub.is_active else "🔴 Неактивна"
-                    result_text += (
-                        f"• {sub.plan_type} дней - {status}\n"
-                        f"  До: {sub.expires_at.strftime('%d.%m.%Y %H:%M')}\n"
-                    )
+            if found.expires_at is None:
+                result_text += "❌ Подписок нет\n\n"
             else:
-                result_text += "❌ Подписок нет"
+                status = "🟢 Активна" if found.has_active_subscription else "🔴 Неактивна"
+                result_text += (
+                    f"📦 {found.plan_type} дней - {status}\n"
+                    f"  До: {found.expires_at.strftime('%d.%m.%Y %H:%M')}\n\n"
+                )
 
-            await message.answer(
-                result_text,
-                reply_markup=get_admin_back_keyboard(),
-                parse_mode='HTML'
-            )
-            break
+        await message.answer(
+            result_text,
+            reply_markup=get_admin_back_keyboard(),
+            parse_mode='HTML'
+        )
 
     except Exception as e:
         logging.error(f"Ошибка поиска пользователя: {e}")
@@ -813,73 +872,43 @@ async def show_logs(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "admin_stats")
-async def show_purchase_stats(callback: CallbackQuery, state: FSMContext):
+async def show_purchase_stats(callback: CallbackQuery, state: FSMContext, read_db: AsyncSession):
     """View purchase statistics"""
     if not is_admin(callback.from_user.id):
         await callback.answer("❌ Access denied", show_alert=True)
         return
 
     try:
-        async for db in get_db():
-            # Статистика за последние 30 дней
-            start_date = datetime.utcnow() - timedelta(days=30)
-
-            # Общая статистика транзакций
-            result = await db.execute(
-                select(Transaction).where(
-                    and_(
-                        Transaction.status == 'completed',
-                        Transaction.created_at >= start_date
-                    )
-                )
-            )
-            transactions = result.scalars().all()
+        stats = await AnalyticsService.get_revenue_summary(read_db, 30)
+        active_subs_count = await AnalyticsService.get_active_subscriptions(read_db)
 
-            today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_transactions = [t for t in transactions if t.created_at >= today_start]
+        plans_stats = stats['by_plan']
+        plan_prices = settings.SUBSCRIPTION_PRICES
 
-            plans_stats = {}
-            for transaction in transactions:
-                if transaction.amount == 100:
-                    plans_stats['7_days'] = plans_stats.get('7_days', 0) + 1
-                elif transaction.amount == 180:
-                    plans_stats['14_days'] = plans_stats.get('14_days', 0) + 1
-                elif transaction.amount == 300:
-                    plans_stats['30_days'] = plans_stats.get('30_days', 0) + 1
+        stats_text = (
+            "📊 <b>Detailed Statistics</b>\n\n"
+            f"👥 <b>Active subscriptions:</b> {active_subs_count}\n\n"
 
-            total_amount = sum(t.amount for t in transactions)
-            today_amount = sum(t.amount for t in today_transactions)
+            f"📅 <b>Last 30 days:</b>\n"
+            f"💰 Total amount: <b>{stats['total_amount']} ⭐</b>\n"
+            f"📦 Purchases: <b>{stats['total_count']}</b>\n"
+            f"📈 Average check: <b>{stats['average_amount']:.1f} ⭐</b>\n\n"
 
-            active_subs_result = await db.execute(
-                select(func.count(Subscription.id)).where(Subscription.is_active == True)
-            )
-            active_subs_count = active_subs_result.scalar()
-
-            stats_text = (
-                "📊 <b>Detailed Statistics</b>\n\n"
-                f"👥 <b>Active subscriptions:</b> {active_subs_count}\n\n"
-
-                f"📅 <b>Last 30 days:</b>\n"
-                f"💰 Total amount: <b>{total_amount} ⭐</b>\n"
-                f"📦 Purchases: <b>{len(transactions)}</b>\n"
-                f"📈 Average check: <b>{total_amount / len(transactions) if transactions else 0:.1f} ⭐</b>\n\n"
+            f"🗓️ <b>Today:</b>\n"
+            f"💰 Amount: <b>{stats['today_amount']} ⭐</b>\n"
+            f"📦 Purchases: <b>{stats['today_count']}</b>\n\n"
 
-                f"🗓️ <b>Today:</b>\n"
-                f"💰 Amount: <b>{today_amount} ⭐</b>\n"
-                f"📦 Purchases: <b>{len(today_transactions)}</b>\n\n"
+            f"📊 <b>By plan (30 days):</b>\n"
+            f"• 7 days: <b>{plans_stats.get(7, 0)}</b> pcs ({plan_prices[7]}⭐)\n"
+            f"• 14 days: <b>{plans_stats.get(14, 0)}</b> pcs ({plan_prices[14]}⭐)\n"
+            f"• 30 days: <b>{plans_stats.get(30, 0)}</b> pcs ({plan_prices[30]}⭐)\n\n"
 
-                f"📊 <b>By plan (30 days):</b>\n"
-                f"• 7 days: <b>{plans_stats.get('7_days', 0)}</b> pcs (100⭐)\n"
-                f"• 14 days: <b>{plans_stats.get('14_days', 0)}</b> pcs (180⭐)\n"
-                f"• 30 days: <b>{plans_stats.get('30_days', 0)}</b> pcs (300⭐)\n\n"
-
-                f"💡 <b>Conversion:</b>\n"
-                f"• Most popular plan: {max(plans_stats.items(), key=lambda x: x[1])[0] if plans_stats else 'No data'}\n"
-                f"• Average duration: {sum(int(k.split('_')[0]) * v for k, v in plans_stats.items()) / sum(plans_stats.values()) if plans_stats else 0:.1f} days"
-            )
+            f"💡 <b>Conversion:</b>\n"
+            f"• Most popular plan: {f'{max(plans_stats.items(), key=lambda x: x[1])[0]}_days' if plans_stats else 'No data'}\n"
+            f"• Average duration: {sum(k * v for k, v in plans_stats.items()) / sum(plans_stats.values()) if plans_stats else 0:.1f} days"
+        )
 
-            await send_text_only(callback, stats_text, get_admin_back_keyboard())
-            break
+        await send_text_only(callback, stats_text, get_admin_back_keyboard())
 
     except Exception as e:
         logging.error(f"Error retrieving statistics: {e}")
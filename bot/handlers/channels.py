@@ -0,0 +1,34 @@
+from aiogram import Router, F
+from aiogram.types import ChatMemberUpdated
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.channel_cache_service import ChannelCacheService, ADMIN_STATUSES
+from services.channel_service import ChannelService
+import logging
+
+router = Router()
+
+
+@router.my_chat_member(F.chat.type != 'private')
+async def on_bot_membership_changed(event: ChatMemberUpdated, db: AsyncSession):
+    chat = event.chat
+    member = event.new_chat_member
+
+    try:
+        await ChannelCacheService.update_from_member(chat, member)
+
+        member_count = None
+        if member.status in ADMIN_STATUSES or member.status == 'member':
+            try:
+                member_count = await event.bot.get_chat_member_count(chat.id)
+            except Exception as e:
+                logging.warning(f"Failed to get member count for chat {chat.id}: {e}")
+
+        await ChannelService.upsert_from_member(db, chat, member, member_count)
+        await db.commit()
+
+        logging.info(
+            f"Bot status in chat {chat.id} changed: "
+            f"{event.old_chat_member.status} -> {member.status}"
+        )
+    except Exception as e:
+        logging.error(f"Error handling membership change in chat {chat.id}: {e}")
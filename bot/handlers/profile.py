@@ -2,12 +2,16 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, delete
-from datetime import datetime, timedelta, date
+from sqlalchemy import select, and_, delete
+from datetime import datetime, timedelta
 
 from tasks import send_manual_post, schedule_post_at_time
-from database.models import User, Subscription, Transaction, AutopostSettings, PostLog
-from database.database import get_db
+from database.models import Subscription, Transaction, AutopostSettings
+from services.post_quota_service import PostQuotaService
+from services.user_context_service import UserContext
+from services.channel_cache_service import ChannelCacheService
+from services.profile_service import ProfileService
+from config.settings import settings
 from bot.keyboards import get_profile_keyboard, get_main_menu_keyboard
 from bot.states import UserStates
 
@@ -139,139 +143,88 @@ def format_autopost_summary(data: dict) -> str:
 💡 Check the settings before saving"""
 
 
-async def get_user_post_stats(db: AsyncSession, user_id: int, channel_id: str = None):
-    today = date.today()
-
-    query = select(func.count(PostLog.id)).where(
-        and_(
-            PostLog.user_id == user_id,
-            PostLog.created_at >= today
-        )
-    )
-
-    if channel_id:
-        query = query.where(PostLog.channel_id == channel_id)
-
-    result = await db.execute(query)
-    posts_today = result.scalar() or 0
-
-    return posts_today
+async def get_user_post_stats(user_id: int, channel_id: str = None):
+    return await PostQuotaService.get_count(user_id, channel_id)
 
 
 @router.callback_query(F.data == "my_profile")
-async def show_profile(callback: CallbackQuery, state: FSMContext):
+async def show_profile(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     await state.set_state(UserStates.viewing_profile)
 
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
+        profile = await ProfileService.get(db, callback.from_user.id) if user_context else None
 
-            if not user:
-                await send_text_only(
-                    callback,
-                    "❌ User not found in the system",
-                    get_main_menu_keyboard()
-                )
-                await callback.answer()
-                return
-
-            subscription_result = await db.execute(
-                select(Subscription).where(
-                    and_(
-                        Subscription.user_id == user.id,
-                        Subscription.is_active == True
-                    )
-                ).order_by(Subscription.expires_at.desc())
+        if not profile:
+            await send_text_only(
+                callback,
+                "❌ User not found in the system",
+                get_main_menu_keyboard()
             )
-            active_subscription = subscription_result.first()
-            subscription = active_subscription[0] if active_subscription else None
+            await callback.answer()
+            return
 
-            history_result = await db.execute(
-                select(Subscription).where(
-                    Subscription.user_id == user.id
-                ).order_by(Subscription.created_at.desc()).limit(5)
-            )
-            subscription_history = history_result.scalars().all()
-
-            payments_result = await db.execute(
-                select(Transaction).where(
-                    and_(
-                        Transaction.user_id == user.id,
-                        Transaction.status == 'completed'
-                    )
-                ).order_by(Transaction.created_at.desc())
-            )
-            payments = payments_result.scalars().all()
+        subscription = profile.subscription
+        posts_today = await get_user_post_stats(profile.user_id)
 
-            posts_today = await get_user_post_stats(db, user.id)
+        profile_text = (
+            f"👤 <b>My Profile</b>\n\n"
+            f"🆔 ID: <code>{profile.telegram_id}</code>\n"
+            f"👤 Username: @{profile.username or 'Not set'}\n"
+            f"📅 Registered: {profile.created_at.strftime('%d.%m.%Y')}\n\n"
+        )
 
-            total_spent = sum(payment.amount for payment in payments)
-            total_payments = len(payments)
-            last_payment = payments[0] if payments else None
+        if subscription:
+            emoji = get_subscription_emoji(subscription.plan_type)
+            status = format_subscription_status(subscription)
+            expires_date = subscription.expires_at.strftime('%d.%m.%Y %H:%M')
 
-            profile_text = (
-                f"👤 <b>My Profile</b>\n\n"
-                f"🆔 ID: <code>{user.telegram_id}</code>\n"
-                f"👤 Username: @{user.username or 'Not set'}\n"
-                f"📅 Registered: {user.created_at.strftime('%d.%m.%Y')}\n\n"
+            profile_text += (
+                f"📦 <b>Current Subscription</b>\n"
+                f"{emoji} Plan: {subscription.plan_type} days\n"
+                f"📊 Status: {status}\n"
+                f"⏰ Valid until: {expires_date}\n\n"
+            )
+        else:
+            profile_text += (
+                f"📦 <b>Subscription</b>\n"
+                f"❌ No active subscription\n"
+                f"💡 Purchase a subscription to access features\n\n"
             )
 
-            if subscription:
-                emoji = get_subscription_emoji(subscription.plan_type)
-                status = format_subscription_status(subscription)
-                expires_date = subscription.expires_at.strftime('%d.%m.%Y %H:%M')
-
-                profile_text += (
-                    f"📦 <b>Current Subscription</b>\n"
-                    f"{emoji} Plan: {subscription.plan_type} days\n"
-                    f"📊 Status: {status}\n"
-                    f"⏰ Valid until: {expires_date}\n\n"
-                )
-            else:
-                profile_text += (
-                    f"📦 <b>Subscription</b>\n"
-                    f"❌ No active subscription\n"
-                    f"💡 Purchase a subscription to access features\n\n"
-                )
+        profile_text += (
+            f"📊 <b>Post Statistics</b>\n"
+            f"📈 Sent today: {posts_today}/{settings.DAILY_POST_LIMIT}\n"
+            f"⏰ Limit resets at 00:00\n\n"
+        )
 
+        if profile.total_payments:
+            last_payment_date = profile.last_payment_at.strftime('%d.%m.%Y')
             profile_text += (
-                f"📊 <b>Post Statistics</b>\n"
-                f"📈 Sent today: {posts_today}/3\n"
-                f"⏰ Limit resets at 00:00\n\n"
+                f"💳 <b>Payment Statistics</b>\n"
+                f"💰 Total spent: {profile.total_spent} ⭐\n"
+                f"📊 Number of purchases: {profile.total_payments}\n"
+                f"📅 Last payment: {last_payment_date}\n\n"
+            )
+        else:
+            profile_text += (
+                f"🎁 <b>Gift Subscriptions</b>\n"
+                f"💡 You have the opportunity to get a gift subscription!\n"
+                f"🎯 Participate in giveaways and promotions\n"
+                f"🔔 Follow our channel for updates\n\n"
             )
 
-            if payments:
-                last_payment_date = last_payment.created_at.strftime('%d.%m.%Y')
-                profile_text += (
-                    f"💳 <b>Payment Statistics</b>\n"
-                    f"💰 Total spent: {total_spent} ⭐\n"
-                    f"📊 Number of purchases: {total_payments}\n"
-                    f"📅 Last payment: {last_payment_date}\n\n"
-                )
-            else:
-                profile_text += (
-                    f"🎁 <b>Gift Subscriptions</b>\n"
-                    f"💡 You have the opportunity to get a gift subscription!\n"
-                    f"🎯 Participate in giveaways and promotions\n"
-                    f"🔔 Follow our channel for updates\n\n"
-                )
-
-            if subscription_history:
-                profile_text += f"📜 <b>Subscription History</b>\n"
-                for i, sub in enumerate(subscription_history[:3], 1):
-                    emoji = get_subscription_emoji(sub.plan_type)
-                    status_emoji = "🟢" if sub.is_active else "🔴"
-                    created_date = sub.created_at.strftime('%d.%m.%Y')
-                    profile_text += f"{status_emoji} {emoji} {sub.plan_type}d - {created_date}\n"
+        if profile.history:
+            profile_text += f"📜 <b>Subscription History</b>\n"
+            for sub in profile.history:
+                emoji = get_subscription_emoji(sub.plan_type)
+                status_emoji = "🟢" if sub.is_active else "🔴"
+                created_date = sub.created_at.strftime('%d.%m.%Y')
+                profile_text += f"{status_emoji} {emoji} {sub.plan_type}d - {created_date}\n"
 
-                if len(subscription_history) > 3:
-                    profile_text += f"... and {len(subscription_history) - 3} more\n"
+            if profile.history_total > len(profile.history):
+                profile_text += f"... and {profile.history_total - len(profile.history)} more\n"
 
-            await send_text_only(callback, profile_text, get_profile_keyboard())
-            break
+        await send_text_only(callback, profile_text, get_profile_keyboard())
 
     except Exception as e:
         logging.error(f"Error retrieving profile: {e}")
@@ -285,80 +238,66 @@ async def show_profile(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "manual_post")
-async def show_manual_post_menu(callback: CallbackQuery, state: FSMContext):
+async def show_manual_post_menu(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            subscription_result = await db.execute(
-                select(Subscription).where(
-                    and_(
-                        Subscription.user_id == user.id,
-                        Subscription.is_active == True,
-                        Subscription.expires_at > datetime.utcnow()
-                    )
-                )
-            )
-            active_subscription = subscription_result.first()
-
-            if not active_subscription:
-                text = (
-                    "📤 <b>Manual Post Sending</b>\n\n"
-                    "❌ <b>An active subscription is required</b>\n\n"
-                    "You need an active subscription to send posts manually.\n\n"
-                    "💎 Purchase a subscription to access this feature"
-                )
-                await send_text_only(callback, text, get_profile_keyboard())
-                await callback.answer()
-                return
-
-            autopost_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
-                ).limit(1)
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        active_subscription = user_context.active_subscription
+
+        if not active_subscription:
+            text = (
+                "📤 <b>Manual Post Sending</b>\n\n"
+                "❌ <b>An active subscription is required</b>\n\n"
+                "You need an active subscription to send posts manually.\n\n"
+                "💎 Purchase a subscription to access this feature"
             )
-            setting = autopost_result.scalar_one_or_none()
-
-            if not setting:
-                text = (
-                    "📤 <b>Manual Post Sending</b>\n\n"
-                    "❌ <b>Autoposting is not configured</b>\n\n"
-                    "First, set up autoposting in the 'Posting Settings' section.\n\n"
-                    "💡 After setup, manual posting features will appear here"
-                )
-                await send_text_only(callback, text, get_profile_keyboard())
-                await callback.answer()
-                return
+            await send_text_only(callback, text, get_profile_keyboard())
+            await callback.answer()
+            return
 
-            posts_today = await get_user_post_stats(db, user.id, setting.channel_id)
+        autopost_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
+                )
+            ).limit(1)
+        )
+        setting = autopost_result.scalar_one_or_none()
 
+        if not setting:
             text = (
                 "📤 <b>Manual Post Sending</b>\n\n"
-                "Choose an action:\n\n"
-                "🚀 <b>Send now</b> - send a post immediately\n"
-                "⏰ <b>Schedule</b> - send at a specified time\n\n"
-                f"📺 <b>Channel:</b> {setting.channel_id}\n"
-                f"📂 <b>Category:</b> {get_category_emoji_name(setting.category)}\n"
-                f"🎨 <b>Style:</b> {get_style_emoji_name(setting.style)}\n\n"
-                f"📊 <b>Post limit:</b> {posts_today}/3 today\n"
+                "❌ <b>Autoposting is not configured</b>\n\n"
+                "First, set up autoposting in the 'Posting Settings' section.\n\n"
+                "💡 After setup, manual posting features will appear here"
             )
+            await send_text_only(callback, text, get_profile_keyboard())
+            await callback.answer()
+            return
+
+        posts_today = await get_user_post_stats(user.id, setting.channel_id)
+
+        text = (
+            "📤 <b>Manual Post Sending</b>\n\n"
+            "Choose an action:\n\n"
+            "🚀 <b>Send now</b> - send a post immediately\n"
+            "⏰ <b>Schedule</b> - send at a specified time\n\n"
+            f"📺 <b>Channel:</b> {setting.channel_id}\n"
+            f"📂 <b>Category:</b> {get_category_emoji_name(setting.category)}\n"
+            f"🎨 <b>Style:</b> {get_style_emoji_name(setting.style)}\n\n"
+            f"📊 <b>Post limit:</b> {posts_today}/{settings.DAILY_POST_LIMIT} today\n"
+        )
 
-            if posts_today >= 3:
-                text += "⚠️ <b>Limit reached!</b> Try again tomorrow"
+        if posts_today >= settings.DAILY_POST_LIMIT:
+            text += "⚠️ <b>Limit reached!</b> Try again tomorrow"
 
-            from bot.keyboards import get_manual_post_keyboard
-            await send_text_only(callback, text, get_manual_post_keyboard(posts_today >= 3))
-            break
+        from bot.keyboards import get_manual_post_keyboard
+        await send_text_only(callback, text, get_manual_post_keyboard(posts_today >= settings.DAILY_POST_LIMIT))
 
     except Exception as e:
         logging.error(f"Error showing manual post menu: {e}")
@@ -368,59 +307,55 @@ async def show_manual_post_menu(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "manual_send_now")
-async def manual_send_now(callback: CallbackQuery, state: FSMContext):
+async def manual_send_now(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            settings_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
-                ).limit(1)
-            )
-            setting = settings_result.scalar_one_or_none()
+        user = user_context.user if user_context else None
 
-            if not setting:
-                await callback.answer("❌ Auto-posting settings not found", show_alert=True)
-                return
-
-            posts_today = await get_user_post_stats(db, user.id, setting.channel_id)
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
 
-            if posts_today >= 3:
-                await callback.answer(
-                    f"❌ Limit reached! {posts_today}/3 posts sent today",
-                    show_alert=True
+        settings_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
                 )
-                return
+            ).limit(1)
+        )
+        setting = settings_result.scalar_one_or_none()
 
-            send_manual_post.delay(
-                user_id=user.id,
-                channel_id=setting.channel_id,
-                category=setting.category,
-                style=setting.style
-            )
+        if not setting:
+            await callback.answer("❌ Auto-posting settings not found", show_alert=True)
+            return
 
-            text = (
-                "🚀 <b>Post is being sent!</b>\n\n"
-                f"📺 Channel: {setting.channel_id}\n"
-                f"📂 Category: {get_category_emoji_name(setting.category)}\n"
-                f"🎨 Style: {get_style_emoji_name(setting.style)}\n"
-                f"📊 Will be: {posts_today + 1}/3 posts today\n\n"
-                "⏳ The post will be published within a minute"
+        posts_today = await get_user_post_stats(user.id, setting.channel_id)
+
+        if posts_today >= settings.DAILY_POST_LIMIT:
+            await callback.answer(
+                f"❌ Limit reached! {posts_today}/{settings.DAILY_POST_LIMIT} posts sent today",
+                show_alert=True
             )
+            return
 
-            await send_text_only(callback, text, get_profile_keyboard())
-            break
+        send_manual_post.delay(
+            user_id=user.id,
+            channel_id=setting.channel_id,
+            category=setting.category,
+            style=setting.style,
+            request_id=callback.id
+        )
+
+        text = (
+            "🚀 <b>Post is being sent!</b>\n\n"
+            f"📺 Channel: {setting.channel_id}\n"
+            f"📂 Category: {get_category_emoji_name(setting.category)}\n"
+            f"🎨 Style: {get_style_emoji_name(setting.style)}\n"
+            f"📊 Will be: {posts_today + 1}/{settings.DAILY_POST_LIMIT} posts today\n\n"
+            "⏳ The post will be published within a minute"
+        )
+
+        await send_text_only(callback, text, get_profile_keyboard())
 
     except Exception as e:
         logging.error(f"Error sending manual post: {e}")
@@ -428,48 +363,43 @@ async def manual_send_now(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "manual_schedule")
-async def manual_schedule_setup(callback: CallbackQuery, state: FSMContext):
+async def manual_schedule_setup(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            settings_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
-                ).limit(1)
-            )
-            setting = settings_result.scalar_one_or_none()
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
 
-            if not setting:
-                await callback.answer("❌ Autoposting settings not found", show_alert=True)
-                return
+        settings_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
+                )
+            ).limit(1)
+        )
+        setting = settings_result.scalar_one_or_none()
 
-            posts_today = await get_user_post_stats(db, user.id, setting.channel_id)
+        if not setting:
+            await callback.answer("❌ Autoposting settings not found", show_alert=True)
+            return
 
-            await state.set_state(UserStates.scheduling_manual_post)
+        posts_today = await get_user_post_stats(user.id, setting.channel_id)
 
-            text = (
-                "⏰ <b>Schedule a post</b>\n\n"
-                "Send the time in HH:MM format\n"
-                "For example: <code>15:23</code> or <code>09:00</code>\n\n"
-                "📅 If the time has already passed today, the post will be sent tomorrow\n"
-                f"📊 Current limit: {posts_today}/3 posts today\n\n"
-                "💡 Enter the time:"
-            )
+        await state.set_state(UserStates.scheduling_manual_post)
 
-            from bot.keyboards import get_manual_schedule_cancel_keyboard
-            await send_text_only(callback, text, get_manual_schedule_cancel_keyboard())
-            break
+        text = (
+            "⏰ <b>Schedule a post</b>\n\n"
+            "Send the time in HH:MM format\n"
+            "For example: <code>15:23</code> or <code>09:00</code>\n\n"
+            "📅 If the time has already passed today, the post will be sent tomorrow\n"
+            f"📊 Current limit: {posts_today}/{settings.DAILY_POST_LIMIT} posts today\n\n"
+            "💡 Enter the time:"
+        )
+
+        from bot.keyboards import get_manual_schedule_cancel_keyboard
+        await send_text_only(callback, text, get_manual_schedule_cancel_keyboard())
 
     except Exception as e:
         logging.error(f"Error scheduling setup: {e}")
@@ -479,7 +409,7 @@ async def manual_schedule_setup(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(UserStates.scheduling_manual_post)
-async def process_schedule_time(message: Message, state: FSMContext):
+async def process_schedule_time(message: Message, state: FSMContext, user_context: UserContext, db: AsyncSession):
     time_input = message.text.strip()
 
     try:
@@ -495,61 +425,56 @@ async def process_schedule_time(message: Message, state: FSMContext):
         return
 
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await message.answer("❌ User not found")
-                return
-
-            settings_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
-                ).limit(1)
-            )
-            setting = settings_result.scalar_one_or_none()
-
-            if not setting:
-                await message.answer("❌ Autoposting settings not found")
-                return
-
-            schedule_post_at_time.delay(
-                user_id=user.id,
-                channel_id=setting.channel_id,
-                category=setting.category,
-                style=setting.style,
-                target_time=time_input
-            )
+        user = user_context.user if user_context else None
 
-            now = datetime.now()
-            target_hour, target_minute = hour, minute
-            target_datetime = now.replace(hour=target_hour, minute=target_minute, second=0)
+        if not user:
+            await message.answer("❌ User not found")
+            return
 
-            if target_datetime <= now:
-                target_datetime += timedelta(days=1)
-                day_text = "tomorrow"
-            else:
-                day_text = "today"
+        settings_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
+                )
+            ).limit(1)
+        )
+        setting = settings_result.scalar_one_or_none()
 
-            text = (
-                "✅ <b>Post scheduled!</b>\n\n"
-                f"⏰ Send time: {time_input} ({day_text})\n"
-                f"📺 Channel: {setting.channel_id}\n"
-                f"📂 Category: {get_category_emoji_name(setting.category)}\n"
-                f"🎨 Style: {get_style_emoji_name(setting.style)}\n\n"
-                "🔔 The post will be sent automatically at the specified time\n"
-                "⚠️ The 3 posts per day limit applies"
-            )
+        if not setting:
+            await message.answer("❌ Autoposting settings not found")
+            return
+
+        schedule_post_at_time.delay(
+            user_id=user.id,
+            channel_id=setting.channel_id,
+            category=setting.category,
+            style=setting.style,
+            target_time=time_input
+        )
 
-            await message.answer(text, reply_markup=get_profile_keyboard(), parse_mode='HTML')
-            await state.clear()
-            break
+        now = datetime.now()
+        target_hour, target_minute = hour, minute
+        target_datetime = now.replace(hour=target_hour, minute=target_minute, second=0)
+
+        if target_datetime <= now:
+            target_datetime += timedelta(days=1)
+            day_text = "tomorrow"
+        else:
+            day_text = "today"
+
+        text = (
+            "✅ <b>Post scheduled!</b>\n\n"
+            f"⏰ Send time: {time_input} ({day_text})\n"
+            f"📺 Channel: {setting.channel_id}\n"
+            f"📂 Category: {get_category_emoji_name(setting.category)}\n"
+            f"🎨 Style: {get_style_emoji_name(setting.style)}\n\n"
+            "🔔 The post will be sent automatically at the specified time\n"
+            "⚠️ The 3 posts per day limit applies"
+        )
+
+        await message.answer(text, reply_markup=get_profile_keyboard(), parse_mode='HTML')
+        await state.clear()
 
     except Exception as e:
         logging.error(f"Error scheduling post: {e}")
@@ -557,67 +482,62 @@ async def process_schedule_time(message: Message, state: FSMContext):
 
 
 @router.callback_query(F.data == "profile_subscription")
-async def show_subscription_details(callback: CallbackQuery, state: FSMContext):
+async def show_subscription_details(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
+        user = user_context.user if user_context else None
 
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        subscriptions_result = await db.execute(
+            select(Subscription).where(
+                Subscription.user_id == user.id
+            ).order_by(Subscription.created_at.desc())
+        )
+        subscriptions = subscriptions_result.scalars().all()
 
-            subscriptions_result = await db.execute(
-                select(Subscription).where(
-                    Subscription.user_id == user.id
-                ).order_by(Subscription.created_at.desc())
+        if not subscriptions:
+            text = (
+                "📦 <b>Subscriptions</b>\n\n"
+                "❌ You have no subscriptions yet\n\n"
+                "💡 Purchase a subscription to access:\n"
+                "• Automatic news posting\n"
+                "• Category and style selection\n"
+                "• Schedule setup\n"
+                "• Up to 3 posts per day"
             )
-            subscriptions = subscriptions_result.scalars().all()
-
-            if not subscriptions:
-                text = (
-                    "📦 <b>Subscriptions</b>\n\n"
-                    "❌ You have no subscriptions yet\n\n"
-                    "💡 Purchase a subscription to access:\n"
-                    "• Automatic news posting\n"
-                    "• Category and style selection\n"
-                    "• Schedule setup\n"
-                    "• Up to 3 posts per day"
+        else:
+            text = "📦 <b>Subscription Details</b>\n\n"
+
+            for i, sub in enumerate(subscriptions, 1):
+                emoji = get_subscription_emoji(sub.plan_type)
+                status = format_subscription_status(sub)
+                created_date = sub.created_at.strftime('%d.%m.%Y %H:%M')
+                expires_date = sub.expires_at.strftime('%d.%m.%Y %H:%M')
+
+                text += (
+                    f"{i}. {emoji} <b>Subscription {sub.plan_type} days</b>\n"
+                    f"📊 Status: {status}\n"
+                    f"📅 Created: {created_date}\n"
+                    f"⏰ Expires: {expires_date}\n"
                 )
-            else:
-                text = "📦 <b>Subscription Details</b>\n\n"
-
-                for i, sub in enumerate(subscriptions, 1):
-                    emoji = get_subscription_emoji(sub.plan_type)
-                    status = format_subscription_status(sub)
-                    created_date = sub.created_at.strftime('%d.%m.%Y %H:%M')
-                    expires_date = sub.expires_at.strftime('%d.%m.%Y %H:%M')
-
-                    text += (
-                        f"{i}. {emoji} <b>Subscription {sub.plan_type} days</b>\n"
-                        f"📊 Status: {status}\n"
-                        f"📅 Created: {created_date}\n"
-                        f"⏰ Expires: {expires_date}\n"
-                    )
-
-                    if sub.is_active:
-                        now = datetime.utcnow()
-                        if sub.expires_at > now:
-                            time_left = sub.expires_at - now
-                            days_left = time_left.days
-                            hours_left = time_left.seconds // 3600
-
-                            if days_left > 0:
-                                text += f"⏳ Remaining: {days_left} days {hours_left} hours\n"
-                            else:
-                                text += f"⏳ Remaining: {hours_left} hours\n"
-
-                    text += "\n"
 
-            await send_text_only(callback, text, get_profile_keyboard())
-            break
+                if sub.is_active:
+                    now = datetime.utcnow()
+                    if sub.expires_at > now:
+                        time_left = sub.expires_at - now
+                        days_left = time_left.days
+                        hours_left = time_left.seconds // 3600
+
+                        if days_left > 0:
+                            text += f"⏳ Remaining: {days_left} days {hours_left} hours\n"
+                        else:
+                            text += f"⏳ Remaining: {hours_left} hours\n"
+
+                text += "\n"
+
+        await send_text_only(callback, text, get_profile_keyboard())
 
     except Exception as e:
         logging.error(f"Error retrieving subscription details: {e}")
@@ -631,60 +551,49 @@ async def show_subscription_details(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "profile_payments")
-async def show_payment_history(callback: CallbackQuery, state: FSMContext):
+async def show_payment_history(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
 
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
+        payments_result = await db.execute(
+            select(Transaction).where(
+                Transaction.user_id == user.id
+            ).order_by(Transaction.created_at.desc()).limit(10)
+        )
+        payments = payments_result.scalars().all()
 
-            payments_result = await db.execute(
-                select(Transaction).where(
-                    Transaction.user_id == user.id
-                ).order_by(Transaction.created_at.desc()).limit(10)
+        if not payments:
+            text = (
+                "💳 <b>Payment History</b>\n\n"
+                "❌ No payments yet\n\n"
+                "💡 After your first purchase, your transaction history will appear here"
+            )
+        else:
+            total_spent = sum(p.amount for p in payments)
+            text = (
+                f"💳 <b>Payment History</b>\n\n"
+                f"💰 Total spent: <b>{total_spent} ⭐</b>\n"
+                f"📊 Number of payments: <b>{len(payments)}</b>\n\n"
             )
-            payments = payments_result.scalars().all()
 
-            if not payments:
-                text = (
-                    "💳 <b>Payment History</b>\n\n"
-                    "❌ No payments yet\n\n"
-                    "💡 After your first purchase, your transaction history will appear here"
-                )
-            else:
-                total_spent = sum(p.amount for p in payments)
-                text = (
-                    f"💳 <b>Payment History</b>\n\n"
-                    f"💰 Total spent: <b>{total_spent} ⭐</b>\n"
-                    f"📊 Number of payments: <b>{len(payments)}</b>\n\n"
-                )
+            for i, payment in enumerate(payments, 1):
+                payment_date = payment.created_at.strftime('%d.%m.%Y %H:%M')
+                status_emoji = "✅" if payment.status == "completed" else "❌"
 
-                for i, payment in enumerate(payments, 1):
-                    payment_date = payment.created_at.strftime('%d.%m.%Y %H:%M')
-                    status_emoji = "✅" if payment.status == "completed" else "❌"
-
-                    plan_type = "unknown"
-                    if payment.amount == 100:
-                        plan_type = "7 days"
-                    elif payment.amount == 180:
-                        plan_type = "14 days"
-                    elif payment.amount == 300:
-                        plan_type = "30 days"
-
-                    text += (
-                        f"{i}. {status_emoji} {plan_type} — {payment.amount} ⭐ — {payment_date}\n"
-                        f"📦 Plan: {plan_type}\n"
-                        f"📅 Date: {payment_date}\n"
-                        f"🆔 ID: <code>{payment.external_id[:12]}...</code>\n\n"
-                    )
+                plan_type = f"{payment.plan_type} days" if payment.plan_type else "unknown"
 
-            await send_text_only(callback, text, get_profile_keyboard())
-            break
+                text += (
+                    f"{i}. {status_emoji} {plan_type} — {payment.amount} ⭐ — {payment_date}\n"
+                    f"📦 Plan: {plan_type}\n"
+                    f"📅 Date: {payment_date}\n"
+                    f"🆔 ID: <code>{payment.external_id[:12]}...</code>\n\n"
+                )
+
+        await send_text_only(callback, text, get_profile_keyboard())
 
     except Exception as e:
         logging.error(f"Ошибка получения истории платежей: {e}")
@@ -698,60 +607,55 @@ async def show_payment_history(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "profile_settings")
-async def show_profile_settings(callback: CallbackQuery, state: FSMContext):
+async def show_profile_settings(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            autopost_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        autopost_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
                 )
             )
-            autopost_settings = autopost_result.scalars().all()
+        )
+        autopost_settings = autopost_result.scalars().all()
 
-            channels_count = len(set(setting.channel_id for setting in autopost_settings))
-            categories = set(setting.category for setting in autopost_settings)
-            styles = set(setting.style for setting in autopost_settings)
+        channels_count = len(set(setting.channel_id for setting in autopost_settings))
+        categories = set(setting.category for setting in autopost_settings)
+        styles = set(setting.style for setting in autopost_settings)
 
-            categories_text = ', '.join(
-                [get_category_emoji_name(cat) for cat in categories]) if categories else 'Not selected'
-            styles_text = ', '.join([get_style_emoji_name(style) for style in styles]) if styles else 'Not configured'
+        categories_text = ', '.join(
+            [get_category_emoji_name(cat) for cat in categories]) if categories else 'Not selected'
+        styles_text = ', '.join([get_style_emoji_name(style) for style in styles]) if styles else 'Not configured'
 
-            posts_today = await get_user_post_stats(db, user.id)
+        posts_today = await get_user_post_stats(user.id)
 
-            text = (
-                f"⚙️ <b>Profile Settings</b>\n\n"
-                f"👤 <b>Basic Information:</b>\n"
-                f"🆔 Telegram ID: <code>{user.telegram_id}</code>\n"
-                f"👤 Username: @{user.username or 'Not set'}\n"
-                f"🌐 Language: {user.language}\n"
-                f"📅 Registered: {user.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
-                f"📊 <b>Statistics:</b>\n"
-                f"📈 Posts today: {posts_today}/3\n"
-                f"⏰ Limit resets at 00:00\n\n"
-                f"🔔 <b>Notifications:</b>\n"
-                f"📱 Telegram notifications: Enabled\n"
-                f"📧 Email notifications: Not configured\n\n"
-                f"🤖 <b>Autoposting:</b>\n"
-                f"📺 Connected channels: {channels_count}\n"
-                f"📰 Active categories: {categories_text}\n"
-                f"🎨 Post style: {styles_text}\n\n"
-                f"💡 <b>Tip:</b> Set up autoposting after purchasing a subscription"
-            )
+        text = (
+            f"⚙️ <b>Profile Settings</b>\n\n"
+            f"👤 <b>Basic Information:</b>\n"
+            f"🆔 Telegram ID: <code>{user.telegram_id}</code>\n"
+            f"👤 Username: @{user.username or 'Not set'}\n"
+            f"🌐 Language: {user.language}\n"
+            f"📅 Registered: {user.created_at.strftime('%d.%m.%Y %H:%M')}\n\n"
+            f"📊 <b>Statistics:</b>\n"
+            f"📈 Posts today: {posts_today}/{settings.DAILY_POST_LIMIT}\n"
+            f"⏰ Limit resets at 00:00\n\n"
+            f"🔔 <b>Notifications:</b>\n"
+            f"📱 Telegram notifications: Enabled\n"
+            f"📧 Email notifications: Not configured\n\n"
+            f"🤖 <b>Autoposting:</b>\n"
+            f"📺 Connected channels: {channels_count}\n"
+            f"📰 Active categories: {categories_text}\n"
+            f"🎨 Post style: {styles_text}\n\n"
+            f"💡 <b>Tip:</b> Set up autoposting after purchasing a subscription"
+        )
 
-            await send_text_only(callback, text, get_profile_keyboard())
-            break
+        await send_text_only(callback, text, get_profile_keyboard())
 
     except Exception as e:
         logging.error(f"Error receiving settings: {e}")
@@ -833,7 +737,7 @@ async def show_gift_subscriptions(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "profile_posting_settings")
-async def show_posting_settings(callback: CallbackQuery, state: FSMContext):
+async def show_posting_settings(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     await state.set_state(UserStates.autopost_setup)
 
     await state.update_data(
@@ -845,103 +749,90 @@ async def show_posting_settings(callback: CallbackQuery, state: FSMContext):
     )
 
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            subscription_result = await db.execute(
-                select(Subscription).where(
-                    and_(
-                        Subscription.user_id == user.id,
-                        Subscription.is_active == True
-                    )
-                )
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        active_subscription = user_context.subscription
+
+        if not active_subscription:
+            text = (
+                "⚙️ <b> Auto-posting Settings </b>\n\n"
+                "❌ <b> Active Subscription Required </b>\n\n"
+                "To configure automatic posting, you need to:\n"
+                "💎 Purchase a subscription\n"
+                "📺 Add the bot to your channel as an administrator\n"
+                "📂 Choose news categories\n"
+                "🎨 Customize post style\n\n"
+                "💡 Purchase a subscription to access the settings"
             )
-            active_subscription = subscription_result.first()
-
-            if not active_subscription:
-                text = (
-                    "⚙️ <b> Auto-posting Settings </b>\n\n"
-                    "❌ <b> Active Subscription Required </b>\n\n"
-                    "To configure automatic posting, you need to:\n"
-                    "💎 Purchase a subscription\n"
-                    "📺 Add the bot to your channel as an administrator\n"
-                    "📂 Choose news categories\n"
-                    "🎨 Customize post style\n\n"
-                    "💡 Purchase a subscription to access the settings"
-                )
-                await send_text_only(callback, text, get_profile_keyboard())
-                await callback.answer()
-                return
-
-            autopost_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
+            await send_text_only(callback, text, get_profile_keyboard())
+            await callback.answer()
+            return
+
+        autopost_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
                 )
             )
-            user_settings = autopost_result.scalars().all()
+        )
+        user_settings = autopost_result.scalars().all()
 
-            if user_settings:
-                channels = list(set(setting.channel_id for setting in user_settings))
-                categories = list(set(setting.category for setting in user_settings))
-                styles = list(set(setting.style for setting in user_settings))
-                frequencies = list(set(setting.posts_per_day for setting in user_settings))
+        if user_settings:
+            channels = list(set(setting.channel_id for setting in user_settings))
+            categories = list(set(setting.category for setting in user_settings))
+            styles = list(set(setting.style for setting in user_settings))
+            frequencies = list(set(setting.posts_per_day for setting in user_settings))
 
-                text = (
-                    "⚙️ <b>Autoposting Settings</b>\n\n"
-                    "✅ <b>Autoposting is configured and active</b>\n\n"
-                )
+            text = (
+                "⚙️ <b>Autoposting Settings</b>\n\n"
+                "✅ <b>Autoposting is configured and active</b>\n\n"
+            )
 
-                if channels:
-                    text += f"📺 <b>Channels ({len(channels)}):</b>\n"
-                    for channel in channels[:3]:
-                        text += f"• {channel}\n"
-                    if len(channels) > 3:
-                        text += f"... and {len(channels) - 3} more\n"
-                    text += "\n"
-
-                if categories:
-                    text += f"📂 <b>Categories ({len(categories)}):</b>\n"
-                    for category in categories[:4]:
-                        text += f"• {get_category_emoji_name(category)}\n"
-                    if len(categories) > 4:
-                        text += f"... and {len(categories) - 4} more\n"
-                    text += "\n"
-
-                if styles:
-                    style_names = [get_style_emoji_name(style) for style in styles]
-                    text += f"🎨 <b>Style:</b> {', '.join(style_names)}\n\n"
-
-                if frequencies:
-                    freq_text = ', '.join([f"{f} times per day" for f in frequencies])
-                    text += f"⏰ <b>Schedule:</b> {freq_text}\n\n"
-
-                text += "💡 Choose an action to manage settings"
-            else:
-                text = (
-                    "⚙️ <b>Autoposting Settings</b>\n\n"
-                    "📊 <b>Status:</b> ✅ Subscription active\n\n"
-                    "❌ <b>Autoposting not configured</b>\n\n"
-                    "To get started, you need to:\n"
-                    "📺 Add channels\n"
-                    "📂 Select news categories\n"
-                    "🎨 Configure post style\n"
-                    "⏰ Set up schedule\n\n"
-                    "💡 Create a new autoposting setting"
-                )
+            if channels:
+                text += f"📺 <b>Channels ({len(channels)}):</b>\n"
+                for channel in channels[:3]:
+                    text += f"• {channel}\n"
+                if len(channels) > 3:
+                    text += f"... and {len(channels) - 3} more\n"
+                text += "\n"
+
+            if categories:
+                text += f"📂 <b>Categories ({len(categories)}):</b>\n"
+                for category in categories[:4]:
+                    text += f"• {get_category_emoji_name(category)}\n"
+                if len(categories) > 4:
+                    text += f"... and {len(categories) - 4} more\n"
+                text += "\n"
+
+            if styles:
+                style_names = [get_style_emoji_name(style) for style in styles]
+                text += f"🎨 <b>Style:</b> {', '.join(style_names)}\n\n"
+
+            if frequencies:
+                freq_text = ', '.join([f"{f} times per day" for f in frequencies])
+                text += f"⏰ <b>Schedule:</b> {freq_text}\n\n"
+
+            text += "💡 Choose an action to manage settings"
+        else:
+            text = (
+                "⚙️ <b>Autoposting Settings</b>\n\n"
+                "📊 <b>Status:</b> ✅ Subscription active\n\n"
+                "❌ <b>Autoposting not configured</b>\n\n"
+                "To get started, you need to:\n"
+                "📺 Add channels\n"
+                "📂 Select news categories\n"
+                "🎨 Configure post style\n"
+                "⏰ Set up schedule\n\n"
+                "💡 Create a new autoposting setting"
+            )
 
-                from bot.keyboards import get_autopost_setup_keyboard
-                await send_text_only(callback, text, get_autopost_setup_keyboard())
-                break
+            from bot.keyboards import get_autopost_setup_keyboard
+            await send_text_only(callback, text, get_autopost_setup_keyboard())
 
     except Exception as e:
         logging.error(f"Error getting posting settings: {e}")
@@ -1003,10 +894,12 @@ async def process_add_channel_new(message: Message, state: FSMContext):
     channel_username = channel_username.strip().split('?')[0]
 
     try:
-        chat = await message.bot.get_chat(channel_username)
-        chat_member = await message.bot.get_chat_member(channel_username, message.bot.id)
+        channel = await ChannelCacheService.get(message.bot, channel_username)
+        if not channel.can_post:
+            # The user may have just fixed the rights, don't trust a negative cache entry
+            channel = await ChannelCacheService.get(message.bot, channel_username, refresh=True)
 
-        if chat_member.status not in ['administrator']:
+        if channel.status not in ['administrator']:
             await message.answer(
                 f"❌ <b>Бот не является администратором в канале {channel_username}</b>\n\n"
                 "Пожалуйста, добавьте бота как администратора с правами на публикацию сообщений.",
@@ -1014,7 +907,7 @@ async def process_add_channel_new(message: Message, state: FSMContext):
             )
             return
 
-        if not chat_member.can_post_messages:
+        if not channel.can_post:
             await message.answer(
                 f"❌ <b>У бота нет прав на публикацию в канале {channel_username}</b>\n\n"
                 "Пожалуйста, дайте боту права на публикацию сообщений.",
@@ -1049,7 +942,7 @@ async def process_add_channel_new(message: Message, state: FSMContext):
             )
 
             await message.answer(
-                f"✅ Канал {channel_username} ({chat.title}) добавлен!",
+                f"✅ Канал {channel_username} ({channel.title}) добавлен!",
                 parse_mode='HTML'
             )
         else:
@@ -1247,7 +1140,7 @@ async def set_schedule_new(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "autopost_save_all")
-async def save_autopost_settings(callback: CallbackQuery, state: FSMContext):
+async def save_autopost_settings(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
         data = await state.get_data()
         channels = data.get('channels', [])
@@ -1259,54 +1152,49 @@ async def save_autopost_settings(callback: CallbackQuery, state: FSMContext):
             await callback.answer("❌ Not all settings are filled in!", show_alert=True)
             return
 
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            await db.execute(
-                delete(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        await db.execute(
+            delete(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
                 )
             )
+        )
 
-            schedule_times = get_schedule_times(frequency)
-
-            for channel in channels:
-                for category in categories:
-                    setting = AutopostSettings(
-                        user_id=user.id,
-                        channel_id=channel,
-                        category=category,
-                        style=style,
-                        posts_per_day=frequency,
-                        specific_times=schedule_times,
-                        is_active=True
-                    )
-                    db.add(setting)
+        schedule_times = get_schedule_times(frequency)
+
+        for channel in channels:
+            for category in categories:
+                setting = AutopostSettings(
+                    user_id=user.id,
+                    channel_id=channel,
+                    category=category,
+                    style=style,
+                    posts_per_day=frequency,
+                    specific_times=schedule_times,
+                    is_active=True
+                )
+                db.add(setting)
 
-            await db.commit()
+        await db.commit()
 
-            text = (
-                "✅ <b>Autoposting settings saved!</b>\n\n"
-                f"📺 <b>Channels:</b> {len(channels)}\n"
-                f"📂 <b>Categories:</b> {len(categories)}\n"
-                f"🎨 <b>Style:</b> {get_style_emoji_name(style)}\n"
-                f"⏰ <b>Schedule:</b> {frequency} times per day\n\n"
-                "🚀 Autoposting is now active and will work according to the schedule!"
-            )
+        text = (
+            "✅ <b>Autoposting settings saved!</b>\n\n"
+            f"📺 <b>Channels:</b> {len(channels)}\n"
+            f"📂 <b>Categories:</b> {len(categories)}\n"
+            f"🎨 <b>Style:</b> {get_style_emoji_name(style)}\n"
+            f"⏰ <b>Schedule:</b> {frequency} times per day\n\n"
+            "🚀 Autoposting is now active and will work according to the schedule!"
+        )
 
-            await send_text_only(callback, text, get_profile_keyboard())
-            await state.clear()
-            break
+        await send_text_only(callback, text, get_profile_keyboard())
+        await state.clear()
 
     except Exception as e:
         logging.error(f"Autoposting settings save error: {e}")
@@ -1427,63 +1315,58 @@ async def cancel_autopost_setup(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "autopost_edit")
-async def edit_existing_autopost(callback: CallbackQuery, state: FSMContext):
+async def edit_existing_autopost(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            settings_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        settings_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
                 )
             )
-            settings = settings_result.scalars().all()
+        )
+        settings = settings_result.scalars().all()
 
-            if not settings:
-                text = (
-                    "❌ <b>No settings to edit</b>\n\n"
-                    "First, create a new autoposting setting."
-                )
-                from bot.keyboards import get_autopost_setup_keyboard
-                await send_text_only(callback, text, get_autopost_setup_keyboard())
-                await callback.answer()
-                return
-
-            channels = list(set(s.channel_id for s in settings))
-            categories = list(set(s.category for s in settings))
-            style = settings[0].style if settings else 'formal'
-            frequency = settings[0].posts_per_day if settings else 1
-
-            await state.update_data(
-                channels=channels,
-                categories=categories,
-                style=style,
-                frequency=frequency,
-                current_step='main'
+        if not settings:
+            text = (
+                "❌ <b>No settings to edit</b>\n\n"
+                "First, create a new autoposting setting."
             )
+            from bot.keyboards import get_autopost_setup_keyboard
+            await send_text_only(callback, text, get_autopost_setup_keyboard())
+            await callback.answer()
+            return
 
-            summary_text = format_autopost_summary({
-                'channels': channels,
-                'categories': categories,
-                'style': style,
-                'frequency': frequency
-            })
+        channels = list(set(s.channel_id for s in settings))
+        categories = list(set(s.category for s in settings))
+        style = settings[0].style if settings else 'formal'
+        frequency = settings[0].posts_per_day if settings else 1
+
+        await state.update_data(
+            channels=channels,
+            categories=categories,
+            style=style,
+            frequency=frequency,
+            current_step='main'
+        )
 
-            summary_text += "\n\n💡 Click 'Edit' to change the settings"
+        summary_text = format_autopost_summary({
+            'channels': channels,
+            'categories': categories,
+            'style': style,
+            'frequency': frequency
+        })
 
-            from bot.keyboards import get_confirmation_keyboard_autopost
-            await send_text_only(callback, summary_text, get_confirmation_keyboard_autopost())
-            break
+        summary_text += "\n\n💡 Click 'Edit' to change the settings"
+
+        from bot.keyboards import get_confirmation_keyboard_autopost
+        await send_text_only(callback, summary_text, get_confirmation_keyboard_autopost())
 
     except Exception as e:
         logging.error(f"Error loading settings for editing: {e}")
@@ -1495,43 +1378,38 @@ async def edit_existing_autopost(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "autopost_delete")
-async def delete_autopost_settings(callback: CallbackQuery, state: FSMContext):
+async def delete_autopost_settings(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            result = await db.execute(
-                delete(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        result = await db.execute(
+            delete(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
                 )
             )
+        )
 
-            await db.commit()
+        await db.commit()
 
-            if result.rowcount > 0:
-                text = (
-                    "✅ <b>Autoposting settings deleted</b>\n\n"
-                    f"Deleted settings: {result.rowcount}\n\n"
-                    "Autoposting stopped. You can create a new setting at any time."
-                )
-            else:
-                text = (
-                    "⚠️ <b>No autoposting settings found</b>\n\n"
-                    "You have no active settings to delete."
-                )
+        if result.rowcount > 0:
+            text = (
+                "✅ <b>Autoposting settings deleted</b>\n\n"
+                f"Deleted settings: {result.rowcount}\n\n"
+                "Autoposting stopped. You can create a new setting at any time."
+            )
+        else:
+            text = (
+                "⚠️ <b>No autoposting settings found</b>\n\n"
+                "You have no active settings to delete."
+            )
 
-            await send_text_only(callback, text, get_profile_keyboard())
-            break
+        await send_text_only(callback, text, get_profile_keyboard())
 
     except Exception as e:
         logging.error(f"Error deleting autoposting settings: {e}")
@@ -1542,79 +1420,65 @@ async def delete_autopost_settings(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "profile_back")
-async def back_to_profile(callback: CallbackQuery, state: FSMContext):
-    await show_profile(callback, state)
+async def back_to_profile(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
+    await show_profile(callback, state, user_context, db)
 
 @router.callback_query(F.data == "manual_post")
-async def show_manual_post_menu(callback: CallbackQuery, state: FSMContext):
+async def show_manual_post_menu(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            subscription_result = await db.execute(
-                select(Subscription).where(
-                    and_(
-                        Subscription.user_id == user.id,
-                        Subscription.is_active == True,
-                        Subscription.expires_at > datetime.utcnow()
-                    )
-                )
-            )
-            active_subscription = subscription_result.first()
-
-            if not active_subscription:
-                text = (
-                    "📤 <b>Manual post sending</b>\n\n"
-                    "❌ <b>Active subscription required</b>\n\n"
-                    "An active subscription is required to send posts manually.\n\n"
-                    "💎 Purchase a subscription to access this feature"
-                )
-                await send_text_only(callback, text, get_profile_keyboard())
-                await callback.answer()
-                return
-
-            autopost_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
-                ).limit(1)
+        user = user_context.user if user_context else None
+
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
+
+        active_subscription = user_context.active_subscription
+
+        if not active_subscription:
+            text = (
+                "📤 <b>Manual post sending</b>\n\n"
+                "❌ <b>Active subscription required</b>\n\n"
+                "An active subscription is required to send posts manually.\n\n"
+                "💎 Purchase a subscription to access this feature"
             )
-            setting = autopost_result.scalar_one_or_none()
-
-            if not setting:
-                text = (
-                    "📤 <b>Manual post sending</b>\n\n"
-                    "❌ <b>Autoposting not configured</b>\n\n"
-                    "First, configure autoposting in the 'Posting settings' section.\n\n"
-                    "💡 After setup, manual post features will appear here"
+            await send_text_only(callback, text, get_profile_keyboard())
+            await callback.answer()
+            return
+
+        autopost_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
                 )
-                await send_text_only(callback, text, get_profile_keyboard())
-                await callback.answer()
-                return
+            ).limit(1)
+        )
+        setting = autopost_result.scalar_one_or_none()
 
+        if not setting:
             text = (
                 "📤 <b>Manual post sending</b>\n\n"
-                "Choose an action:\n\n"
-                "🚀 <b>Send now</b> - send a post immediately\n"
-                "⏰ <b>Schedule</b> - send at a specified time\n"
-                "📊 <b>Test post</b> - send a test message\n\n"
-                f"📺 <b>Channel:</b> {setting.channel_id}\n"
-                f"📂 <b>Category:</b> {get_category_emoji_name(setting.category)}\n"
-                f"🎨 <b>Style:</b> {get_style_emoji_name(setting.style)}"
+                "❌ <b>Autoposting not configured</b>\n\n"
+                "First, configure autoposting in the 'Posting settings' section.\n\n"
+                "💡 After setup, manual post features will appear here"
             )
+            await send_text_only(callback, text, get_profile_keyboard())
+            await callback.answer()
+            return
+
+        text = (
+            "📤 <b>Manual post sending</b>\n\n"
+            "Choose an action:\n\n"
+            "🚀 <b>Send now</b> - send a post immediately\n"
+            "⏰ <b>Schedule</b> - send at a specified time\n"
+            "📊 <b>Test post</b> - send a test message\n\n"
+            f"📺 <b>Channel:</b> {setting.channel_id}\n"
+            f"📂 <b>Category:</b> {get_category_emoji_name(setting.category)}\n"
+            f"🎨 <b>Style:</b> {get_style_emoji_name(setting.style)}"
+        )
 
-            from bot.keyboards import get_manual_post_keyboard
-            await send_text_only(callback, text, get_manual_post_keyboard())
-            break
+        from bot.keyboards import get_manual_post_keyboard
+        await send_text_only(callback, text, get_manual_post_keyboard())
 
     except Exception as e:
         logging.error(f"Error showing manual post menu: {e}")
@@ -1624,49 +1488,45 @@ async def show_manual_post_menu(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(F.data == "manual_send_now")
-async def manual_send_now(callback: CallbackQuery, state: FSMContext):
+async def manual_send_now(callback: CallbackQuery, state: FSMContext, user_context: UserContext, db: AsyncSession):
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == callback.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await callback.answer("❌ User not found", show_alert=True)
-                return
-
-            settings_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
-                ).limit(1)
-            )
-            setting = settings_result.scalar_one_or_none()
+        user = user_context.user if user_context else None
 
-            if not setting:
-                await callback.answer("❌ Auto-posting settings not found", show_alert=True)
-                return
+        if not user:
+            await callback.answer("❌ User not found", show_alert=True)
+            return
 
-            send_manual_post.delay(
-                user_id=user.id,
-                channel_id=setting.channel_id,
-                category=setting.category,
-                style=setting.style
-            )
+        settings_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
+                )
+            ).limit(1)
+        )
+        setting = settings_result.scalar_one_or_none()
 
-            text = (
-                "🚀 <b>Post is being sent!</b>\n\n"
-                f"📺 Channel: {setting.channel_id}\n"
-                f"📂 Category: {get_category_emoji_name(setting.category)}\n"
-                f"🎨 Style: {get_style_emoji_name(setting.style)}\n\n"
-                "⏳ The post will be published within a minute"
-            )
+        if not setting:
+            await callback.answer("❌ Auto-posting settings not found", show_alert=True)
+            return
 
-            await send_text_only(callback, text, get_profile_keyboard())
-            break
+        send_manual_post.delay(
+            user_id=user.id,
+            channel_id=setting.channel_id,
+            category=setting.category,
+            style=setting.style,
+            request_id=callback.id
+        )
+
+        text = (
+            "🚀 <b>Post is being sent!</b>\n\n"
+            f"📺 Channel: {setting.channel_id}\n"
+            f"📂 Category: {get_category_emoji_name(setting.category)}\n"
+            f"🎨 Style: {get_style_emoji_name(setting.style)}\n\n"
+            "⏳ The post will be published within a minute"
+        )
+
+        await send_text_only(callback, text, get_profile_keyboard())
 
     except Exception as e:
         logging.error(f"Error sending manual post: {e}")
@@ -1691,7 +1551,7 @@ async def manual_schedule_setup(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(UserStates.scheduling_manual_post)
-async def process_schedule_time(message: Message, state: FSMContext):
+async def process_schedule_time(message: Message, state: FSMContext, user_context: UserContext, db: AsyncSession):
     time_input = message.text.strip()
 
     try:
@@ -1707,60 +1567,55 @@ async def process_schedule_time(message: Message, state: FSMContext):
         return
 
     try:
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == message.from_user.id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if not user:
-                await message.answer("❌ User not found")
-                return
-
-            settings_result = await db.execute(
-                select(AutopostSettings).where(
-                    and_(
-                        AutopostSettings.user_id == user.id,
-                        AutopostSettings.is_active == True
-                    )
-                ).limit(1)
-            )
-            setting = settings_result.scalar_one_or_none()
-
-            if not setting:
-                await message.answer("❌ Autoposting settings not found")
-                return
-
-            schedule_post_at_time.delay(
-                user_id=user.id,
-                channel_id=setting.channel_id,
-                category=setting.category,
-                style=setting.style,
-                target_time=time_input
-            )
+        user = user_context.user if user_context else None
+
+        if not user:
+            await message.answer("❌ User not found")
+            return
 
-            now = datetime.now()
-            target_hour, target_minute = hour, minute
-            target_datetime = now.replace(hour=target_hour, minute=target_minute, second=0)
+        settings_result = await db.execute(
+            select(AutopostSettings).where(
+                and_(
+                    AutopostSettings.user_id == user.id,
+                    AutopostSettings.is_active == True
+                )
+            ).limit(1)
+        )
+        setting = settings_result.scalar_one_or_none()
 
-            if target_datetime <= now:
-                target_datetime += timedelta(days=1)
-                day_text = "tomorrow"
-            else:
-                day_text = "today"
+        if not setting:
+            await message.answer("❌ Autoposting settings not found")
+            return
 
-            text = (
-                "✅ <b>Post scheduled!</b>\n\n"
-                f"⏰ Send time: {time_input} ({day_text})\n"
-                f"📺 Channel: {setting.channel_id}\n"
-                f"📂 Category: {get_category_emoji_name(setting.category)}\n"
-                f"🎨 Style: {get_style_emoji_name(setting.style)}\n\n"
-                "🔔 The post will be sent automatically at the specified time"
-            )
+        schedule_post_at_time.delay(
+            user_id=user.id,
+            channel_id=setting.channel_id,
+            category=setting.category,
+            style=setting.style,
+            target_time=time_input
+        )
+
+        now = datetime.now()
+        target_hour, target_minute = hour, minute
+        target_datetime = now.replace(hour=target_hour, minute=target_minute, second=0)
+
+        if target_datetime <= now:
+            target_datetime += timedelta(days=1)
+            day_text = "tomorrow"
+        else:
+            day_text = "today"
+
+        text = (
+            "✅ <b>Post scheduled!</b>\n\n"
+            f"⏰ Send time: {time_input} ({day_text})\n"
+            f"📺 Channel: {setting.channel_id}\n"
+            f"📂 Category: {get_category_emoji_name(setting.category)}\n"
+            f"🎨 Style: {get_style_emoji_name(setting.style)}\n\n"
+            "🔔 The post will be sent automatically at the specified time"
+        )
 
-            await message.answer(text, reply_markup=get_profile_keyboard(), parse_mode='HTML')
-            await state.clear()
-            break
+        await message.answer(text, reply_markup=get_profile_keyboard(), parse_mode='HTML')
+        await state.clear()
 
     except Exception as e:
         logging.error(f"Error scheduling post: {e}")
@@ -2,13 +2,15 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, LabeledPrice, PreCheckoutQuery, Message
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select
 from datetime import datetime, timedelta
 from database.models import User, Subscription, Transaction
-from database.database import get_db
 from bot.keyboards import get_subscription_keyboard, get_main_menu_keyboard
 from bot.states import UserStates
 from config.settings import settings
+from services.analytics_service import AnalyticsService
+from services.user_context_service import UserContextService
+from services.profile_service import ProfileService
 import logging
 
 router = Router()
@@ -77,6 +79,7 @@ async def process_subscription_purchase(callback: CallbackQuery, state: FSMConte
             provider_token="",
             currency="XTR",
             prices=prices,
+            # sendInvoice only takes an HTTP URL here, cached file_ids can't be used
             photo_url=settings.SUBSCRIPTION_IMAGES.get(days),
             photo_width=512,
             photo_height=512,
@@ -144,7 +147,7 @@ async def process_pre_checkout_query(pre_checkout_query: PreCheckoutQuery):
 
 
 @router.message(F.successful_payment)
-async def process_successful_payment(message: Message):
+async def process_successful_payment(message: Message, db: AsyncSession):
     payment = message.successful_payment
 
     logging.info(f"💰 ПОЛУЧЕН ПЛАТЕЖ!")
@@ -157,48 +160,49 @@ async def process_successful_payment(message: Message):
         days = int(payload_parts[1])
         user_telegram_id = int(payload_parts[2])
 
-        async for db in get_db():
-            user_result = await db.execute(
-                select(User).where(User.telegram_id == user_telegram_id)
-            )
-            user = user_result.scalar_one_or_none()
-
-            if user:
-                expires_at = datetime.utcnow() + timedelta(days=days)
-
-                subscription = Subscription(
-                    user_id=user.id,
-                    plan_type=days,
-                    expires_at=expires_at,
-                    is_active=True
-                )
-                db.add(subscription)
-
-                transaction = Transaction(
-                    user_id=user.id,
-                    amount=payment.total_amount,
-                    currency=payment.currency,
-                    payment_method="stars",
-                    status="completed",
-                    external_id=payment.telegram_payment_charge_id
-                )
-                db.add(transaction)
+        user_result = await db.execute(
+            select(User).where(User.telegram_id == user_telegram_id)
+        )
+        user = user_result.scalar_one_or_none()
 
-                await db.commit()
+        if user:
+            expires_at = datetime.utcnow() + timedelta(days=days)
 
-                success_text = (
-                    "🎉 <b>Payment processed successfully!</b>\n\n"
-                    f"✅ Subscription activated for <b>{days} days</b>\n"
-                    f"📅 Valid until: <b>{expires_at.strftime('%d.%m.%Y %H:%M')}</b>\n\n"
-                    "🚀 Now you can set up automatic posting!\n"
-                    "Use the /start command to access all features."
-                )
+            subscription = Subscription(
+                user_id=user.id,
+                plan_type=days,
+                expires_at=expires_at,
+                is_active=True
+            )
+            db.add(subscription)
+
+            transaction = Transaction(
+                user_id=user.id,
+                amount=payment.total_amount,
+                currency=payment.currency,
+                payment_method="stars",
+                status="completed",
+                external_id=payment.telegram_payment_charge_id,
+                plan_type=days
+            )
+            db.add(transaction)
+
+            await db.commit()
+            await UserContextService.invalidate(user_telegram_id)
+            await ProfileService.invalidate(user_telegram_id)
+
+            success_text = (
+                "🎉 <b>Payment processed successfully!</b>\n\n"
+                f"✅ Subscription activated for <b>{days} days</b>\n"
+                f"📅 Valid until: <b>{expires_at.strftime('%d.%m.%Y %H:%M')}</b>\n\n"
+                "🚀 Now you can set up automatic posting!\n"
+                "Use the /start command to access all features."
+            )
 
-                await message.answer(success_text, parse_mode='HTML')
+            await message.answer(success_text, parse_mode='HTML')
 
-                await notify_admin_about_payment(message.bot, payment, user, days)
+            await notify_admin_about_payment(message.bot, payment, user, days)
 
-            break
 
     except Exception as e:
         logging.error(f"Ошибка обработки платежа: {e}")
@@ -238,36 +242,18 @@ async def notify_admin_about_payment(bot, payment, user, days):
 
 async def get_payment_statistics(db: AsyncSession, period_days: int = 30):
     try:
-        start_date = datetime.utcnow() - timedelta(days=period_days)
+        summary = await AnalyticsService.get_revenue_summary(db, period_days)
 
-        result = await db.execute(
-            select(Transaction).where(
-                and_(
-                    Transaction.status == 'completed',
-                    Transaction.created_at >= start_date
-                )
-            )
-        )
-        transactions = result.scalars().all()
-
-        total_amount = sum(t.amount for t in transactions)
-        total_count = len(transactions)
-
-        subscription_stats = {}
-        for transaction in transactions:
-            if transaction.amount == 100:
-                subscription_stats['7_days'] = subscription_stats.get('7_days', 0) + 1
-            elif transaction.amount == 180:
-                subscription_stats['14_days'] = subscription_stats.get('14_days', 0) + 1
-            elif transaction.amount == 300:
-                subscription_stats['30_days'] = subscription_stats.get('30_days', 0) + 1
+        subscription_stats = {
+            f"{days}_days": count for days, count in summary['by_plan'].items()
+        }
 
         return {
-            'total_amount': total_amount,
-            'total_count': total_count,
+            'total_amount': summary['total_amount'],
+            'total_count': summary['total_count'],
             'period_days': period_days,
             'subscription_stats': subscription_stats,
-            'average_amount': total_amount / total_count if total_count > 0 else 0
+            'average_amount': summary['average_amount']
         }
 
     except Exception as e:
@@ -276,31 +262,29 @@ async def get_payment_statistics(db: AsyncSession, period_days: int = 30):
 
 
 @router.message(F.text == "/payment_stats")
-async def show_payment_stats(message: Message):
+async def show_payment_stats(message: Message, read_db: AsyncSession):
     if message.from_user.id not in settings.ADMIN_IDS:
         return
 
     try:
-        async for db in get_db():
-            stats = await get_payment_statistics(db, 30)
-
-            if stats:
-                stats_text = (
-                    f"📊 <b>Payment statistics for 30 days</b>\n\n"
-                    f"💰 Total amount: <b>{stats['total_amount']} Stars</b>\n"
-                    f"📦 Number of payments: <b>{stats['total_count']}</b>\n"
-                    f"📈 Average payment: <b>{stats['average_amount']:.1f} Stars</b>\n\n"
-                    f"<b>By plan:</b>\n"
-                    f"• 7 days: {stats['subscription_stats'].get('7_days', 0)} pcs\n"
-                    f"• 14 days: {stats['subscription_stats'].get('14_days', 0)} pcs\n"
-                    f"• 30 days: {stats['subscription_stats'].get('30_days', 0)} pcs"
-                )
+        stats = await get_payment_statistics(read_db, 30)
+
+        if stats:
+            stats_text = (
+                f"📊 <b>Payment statistics for 30 days</b>\n\n"
+                f"💰 Total amount: <b>{stats['total_amount']} Stars</b>\n"
+                f"📦 Number of payments: <b>{stats['total_count']}</b>\n"
+                f"📈 Average payment: <b>{stats['average_amount']:.1f} Stars</b>\n\n"
+                f"<b>By plan:</b>\n"
+                f"• 7 days: {stats['subscription_stats'].get('7_days', 0)} pcs\n"
+                f"• 14 days: {stats['subscription_stats'].get('14_days', 0)} pcs\n"
+                f"• 30 days: {stats['subscription_stats'].get('30_days', 0)} pcs"
+            )
 
-                await message.answer(stats_text, parse_mode='HTML')
-            else:
-                await message.answer("❌ Error retrieving statistics")
+            await message.answer(stats_text, parse_mode='HTML')
+        else:
+            await message.answer("❌ Error retrieving statistics")
 
-            break
 
     except Exception as e:
         logging.error(f"Error displaying statistics: {e}")
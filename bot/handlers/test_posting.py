@@ -1,6 +1,7 @@
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from bot.keyboards import (
     get_category_keyboard,
     get_style_keyboard,
@@ -11,7 +12,7 @@ from bot.states import UserStates
 from services.news_service import NewsService
 from services.content_generator import ContentGenerator
 from services.test_post_service import TestPostService
-from database.database import get_db
+from services.channel_cache_service import ChannelCacheService
 import logging
 import html
 
@@ -43,19 +44,17 @@ async def send_text_only(callback: CallbackQuery, text: str, reply_markup=None):
 
 
 @router.callback_query(F.data == "test_post")
-async def start_test_posting(callback: CallbackQuery, state: FSMContext):
-    async for db in get_db():
-        can_create, error_message = await TestPostService.can_create_test_post(
-            db, callback.from_user.id
-        )
+async def start_test_posting(callback: CallbackQuery, state: FSMContext, db: AsyncSession):
+    can_create, error_message = await TestPostService.can_create_test_post(
+        db, callback.from_user.id
+    )
 
-        if not can_create:
-            error_text = f"🚫 <b>Test post limit exceeded</b>\n\n{error_message}"
-            await send_text_only(callback, error_text, get_subscription_keyboard())
-            await callback.answer()
-            return
+    if not can_create:
+        error_text = f"🚫 <b>Test post limit exceeded</b>\n\n{error_message}"
+        await send_text_only(callback, error_text, get_subscription_keyboard())
+        await callback.answer()
+        return
 
-        break
 
     await state.set_state(UserStates.selecting_category)
 
@@ -142,7 +141,7 @@ async def select_style(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(UserStates.waiting_channel_setup)
-async def receive_channel_info(message: Message, state: FSMContext):
+async def receive_channel_info(message: Message, state: FSMContext, db: AsyncSession):
     channel_input = message.text.strip()
 
     if not (channel_input.startswith('@') or 'telegram.me/' in channel_input or 't.me/' in channel_input):
@@ -167,10 +166,10 @@ async def receive_channel_info(message: Message, state: FSMContext):
     await state.update_data(channel_username=channel_username)
     await state.set_state(UserStates.checking_bot_permissions)
 
-    await check_bot_permissions_real(message, state, channel_username)
+    await check_bot_permissions_real(message, state, channel_username, db)
 
 
-async def check_bot_permissions_real(message: Message, state: FSMContext, channel_username: str):
+async def check_bot_permissions_real(message: Message, state: FSMContext, channel_username: str, db: AsyncSession):
     try:
         safe_channel_name = escape_html(channel_username)
 
@@ -180,10 +179,12 @@ async def check_bot_permissions_real(message: Message, state: FSMContext, channe
         )
 
         try:
-            chat = await message.bot.get_chat(channel_username)
-            chat_member = await message.bot.get_chat_member(channel_username, message.bot.id)
+            channel = await ChannelCacheService.get(message.bot, channel_username)
+            if not channel.can_post:
+                # The user may have just fixed the rights, don't trust a negative cache entry
+                channel = await ChannelCacheService.get(message.bot, channel_username, refresh=True)
 
-            if chat_member.status not in ['administrator']:
+            if channel.status not in ['administrator']:
                 await checking_msg.edit_text(
                     f"❌ <b>Bot is not an administrator in channel {safe_channel_name}</b>\n\n"
                     "Please add the bot as an administrator with message posting permissions.",
@@ -191,7 +192,7 @@ async def check_bot_permissions_real(message: Message, state: FSMContext, channe
                 )
                 return
 
-            if not chat_member.can_post_messages:
+            if not channel.can_post:
                 await checking_msg.edit_text(
                     f"❌ <b>Bot doesn't have posting permissions in channel {safe_channel_name}</b>\n\n"
                     "Please grant the bot message posting permissions.",
@@ -205,7 +206,7 @@ async def check_bot_permissions_real(message: Message, state: FSMContext, channe
                 parse_mode='HTML'
             )
 
-            await generate_and_send_test_post(message, state, channel_username)
+            await generate_and_send_test_post(message, state, channel_username, db)
 
         except Exception as e:
             error_msg = str(e)
@@ -240,7 +241,7 @@ async def check_bot_permissions_real(message: Message, state: FSMContext, channe
         )
 
 
-async def generate_and_send_test_post(message: Message, state: FSMContext, channel_username: str):
+async def generate_and_send_test_post(message: Message, state: FSMContext, channel_username: str, db: AsyncSession):
     try:
         user_data = await state.get_data()
         category = user_data.get('category', 'general')
@@ -271,15 +272,13 @@ async def generate_and_send_test_post(message: Message, state: FSMContext, chann
                 disable_web_page_preview=False
             )
 
-            async for db in get_db():
-                await TestPostService.record_test_post(
-                    db,
-                    message.from_user.id,
-                    channel_username,
-                    category,
-                    style
-                )
-                break
+            await TestPostService.record_test_post(
+                db,
+                message.from_user.id,
+                channel_username,
+                category,
+                style
+            )
 
             safe_channel = escape_html(channel_username)
             safe_category = escape_html(category)
@@ -1,7 +1,23 @@
+from functools import lru_cache, wraps
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+# Markups are shared between updates, handlers must not mutate what they get
+# back. The uncached builder stays reachable as ``get_*_keyboard.__wrapped__``.
 
+
+def prebuilt(build):
+    """Builds a static keyboard once at import and returns it on every call."""
+    markup = build()
+
+    @wraps(build)
+    def get_keyboard():
+        return markup
+
+    return get_keyboard
+
+
+@prebuilt
 def get_main_menu_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="👤 My Profile", callback_data="my_profile")],
@@ -17,6 +33,7 @@ def get_main_menu_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_profile_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📦 Subscription", callback_data="profile_subscription")],
@@ -30,6 +47,7 @@ def get_profile_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_posting_settings_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📺 My Channels", callback_data="posting_channels")],
@@ -42,6 +60,7 @@ def get_posting_settings_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_style_selection_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🎩 Formal", callback_data="set_style_formal")],
@@ -52,6 +71,7 @@ def get_style_selection_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_schedule_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="1️⃣ 1 time per day", callback_data="schedule_1")],
@@ -63,6 +83,7 @@ def get_schedule_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_subscription_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
@@ -80,6 +101,7 @@ def get_subscription_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@prebuilt
 def get_category_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
@@ -106,6 +128,7 @@ def get_category_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@prebuilt
 def get_style_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
@@ -123,6 +146,7 @@ def get_style_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@prebuilt
 def get_bot_check_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
@@ -136,6 +160,7 @@ def get_bot_check_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@prebuilt
 def get_admin_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="👥 Users", callback_data="admin_users")],
@@ -150,6 +175,7 @@ def get_admin_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_admin_back_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="⬅️ Back to Admin", callback_data="admin_back")]
@@ -157,16 +183,17 @@ def get_admin_back_keyboard():
     return keyboard
 
 
-def get_admin_users_keyboard(page: int = 0, total_pages: int = 1):
+def get_admin_users_keyboard(page: int = 0, total_pages: int = 1, prev_cursor: str = None, next_cursor: str = None):
     keyboard = []
 
-    if total_pages > 1:
+    # Cursors point at the first/last row shown, so page N costs the same as page 1
+    if prev_cursor or next_cursor:
         nav_buttons = []
-        if page > 0:
-            nav_buttons.append(InlineKeyboardButton(text="⬅️ Prev", callback_data=f"admin_users_page_{page - 1}"))
-        nav_buttons.append(InlineKeyboardButton(text=f"{page + 1}/{total_pages}", callback_data="noop"))
-        if page < total_pages - 1:
-            nav_buttons.append(InlineKeyboardButton(text="Next ➡️", callback_data=f"admin_users_page_{page + 1}"))
+        if prev_cursor:
+            nav_buttons.append(InlineKeyboardButton(text="⬅️ Prev", callback_data=f"admin_users_prev_{page - 1}_{prev_cursor}"))
+        nav_buttons.append(InlineKeyboardButton(text=f"{page + 1}/~{total_pages}", callback_data="noop"))
+        if next_cursor:
+            nav_buttons.append(InlineKeyboardButton(text="Next ➡️", callback_data=f"admin_users_next_{page + 1}_{next_cursor}"))
         keyboard.append(nav_buttons)
 
     keyboard.extend([
@@ -179,6 +206,7 @@ def get_admin_users_keyboard(page: int = 0, total_pages: int = 1):
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@prebuilt
 def get_admin_sources_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📋 Source List", callback_data="admin_list_sources")],
@@ -189,6 +217,7 @@ def get_admin_sources_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_admin_categories_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📋 Category List", callback_data="admin_list_categories")],
@@ -199,6 +228,7 @@ def get_admin_categories_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_admin_tokens_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📋 Token List", callback_data="admin_list_tokens")],
@@ -209,6 +239,7 @@ def get_admin_tokens_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_admin_sites_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📋 Site List", callback_data="admin_list_sites")],
@@ -240,6 +271,7 @@ def get_admin_logs_keyboard(page: int = 0, total_pages: int = 1):
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@lru_cache(maxsize=128)
 def get_confirmation_keyboard(action: str, item_id: str = ""):
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -250,6 +282,7 @@ def get_confirmation_keyboard(action: str, item_id: str = ""):
     return keyboard
 
 
+@prebuilt
 def get_admin_stats_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="📊 Last 7 days", callback_data="admin_stats_7")],
@@ -261,6 +294,7 @@ def get_admin_stats_keyboard():
     return keyboard
 
 
+@prebuilt
 def get_autopost_setup_keyboard():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="🆕 Create New Setup", callback_data="autopost_new")],
@@ -272,6 +306,7 @@ def get_autopost_setup_keyboard():
     return keyboard
 
 
+@lru_cache(maxsize=16)
 def get_autopost_step_keyboard(step: str, has_back: bool = True):
     keyboard = []
 
@@ -302,9 +337,11 @@ def get_autopost_step_keyboard(step: str, has_back: bool = True):
 
 
 def get_category_selection_keyboard_new(selected_categories: list = None):
-    if selected_categories is None:
-        selected_categories = []
+    return _category_selection_keyboard(frozenset(selected_categories or ()))
+
 
+@lru_cache(maxsize=256)
+def _category_selection_keyboard(selected_categories: frozenset):
     categories = [
         ("it", "💻 IT & Tech"),
         ("crypto", "₿ Crypto"),
@@ -344,6 +381,7 @@ def get_category_selection_keyboard_new(selected_categories: list = None):
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@lru_cache(maxsize=8)
 def get_style_selection_keyboard_new(selected_style: str = None):
     styles = [
         ("formal", "🎩 Formal"),
@@ -365,6 +403,7 @@ def get_style_selection_keyboard_new(selected_style: str = None):
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@lru_cache(maxsize=8)
 def get_schedule_selection_keyboard_new(selected_frequency: int = None):
     schedules = [
         (1, "1️⃣ 1 time per day (09:00)"),
@@ -386,6 +425,7 @@ def get_schedule_selection_keyboard_new(selected_frequency: int = None):
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+@prebuilt
 def get_confirmation_keyboard_autopost():
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="💾 Save Settings", callback_data="autopost_save_all")],
@@ -395,6 +435,7 @@ def get_confirmation_keyboard_autopost():
     return keyboard
 
 
+@lru_cache(maxsize=2)
 def get_manual_post_keyboard(limit_reached=False):
 
     buttons = []
@@ -412,6 +453,7 @@ def get_manual_post_keyboard(limit_reached=False):
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+@prebuilt
 def get_manual_schedule_cancel_keyboard():
 
     return InlineKeyboardMarkup(inline_keyboard=[
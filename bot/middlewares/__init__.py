@@ -0,0 +1,11 @@
+from bot.middlewares.db_session import DbSessionMiddleware, ReleaseConnectionMiddleware, release_connection
+from bot.middlewares.user_context import UserContextMiddleware
+from bot.middlewares.throttling import ThrottlingMiddleware
+
+__all__ = [
+    'DbSessionMiddleware',
+    'ReleaseConnectionMiddleware',
+    'release_connection',
+    'UserContextMiddleware',
+    'ThrottlingMiddleware',
+]
@@ -0,0 +1,71 @@
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.database import async_session, async_read_session
+import logging
+
+_current_sessions: ContextVar[Tuple[AsyncSession, ...]] = ContextVar('current_db_sessions', default=())
+
+
+async def release_connection(session: AsyncSession):
+    """Returns the session's connection to the pool if it only holds reads.
+
+    Nothing is expired on commit, so objects already loaded stay usable and the
+    next query simply checks out a connection again. Sessions with unflushed
+    changes are left alone until the handler commits them.
+    """
+    if not session.in_transaction() or session.new or session.dirty or session.deleted:
+        return
+
+    try:
+        await session.commit()
+    except Exception as e:
+        logging.warning(f"Failed to release DB connection: {e}")
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """Provides lazily connected sessions scoped to the update.
+
+    ``db`` is bound to the primary. ``read_db`` is bound to the read replica
+    (or the primary when none is configured) and is meant for reporting.
+    """
+
+    def __init__(self, session_factory=async_session, read_session_factory=async_read_session):
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.session_factory() as session, self.read_session_factory() as read_session:
+            data['db'] = session
+            data['read_db'] = read_session
+            token = _current_sessions.set((session, read_session))
+            try:
+                return await handler(event, data)
+            finally:
+                _current_sessions.reset(token)
+
+
+class ReleaseConnectionMiddleware(BaseRequestMiddleware):
+    """Bot API request middleware that frees the update's DB connection before
+    waiting on Telegram."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType]
+    ):
+        for session in _current_sessions.get():
+            await release_connection(session)
+
+        return await make_request(bot, method)
@@ -0,0 +1,133 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User as TelegramUser
+from services.redis_client import get_redis
+from config.settings import settings
+import logging
+import time
+
+
+class LocalTokenBucket:
+    """Per-user token buckets kept in process memory, for single-process mode."""
+
+    MAX_BUCKETS = 10000
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+
+    async def consume(self, user_id: int) -> bool:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+
+        if len(self._buckets) >= self.MAX_BUCKETS and user_id not in self._buckets:
+            self._prune(now)
+        self._buckets[user_id] = (tokens, now)
+
+        return allowed
+
+    def _prune(self, now: float):
+        # Buckets that have refilled completely carry no information
+        full_after = self.burst / self.rate
+        for user_id, (_, updated) in list(self._buckets.items()):
+            if now - updated >= full_after:
+                del self._buckets[user_id]
+
+
+class RedisTokenBucket:
+    """Per-user token buckets shared by every bot process through Redis."""
+
+    KEY_PREFIX = 'throttle'
+
+    # Uses the Redis clock so buckets agree across hosts
+    CONSUME_SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return allowed
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+
+    async def consume(self, user_id: int) -> bool:
+        result = await get_redis().eval(
+            self.CONSUME_SCRIPT, 1, f"{self.KEY_PREFIX}:{user_id}", self.burst, self.rate
+        )
+        return result == 1
+
+
+def create_token_bucket():
+    backend = settings.THROTTLE_BACKEND
+    if backend == 'auto':
+        backend = 'local' if settings.BOT_MODE == 'polling' else 'redis'
+
+    if backend == 'redis':
+        return RedisTokenBucket(settings.THROTTLE_RATE, settings.THROTTLE_BURST)
+    return LocalTokenBucket(settings.THROTTLE_RATE, settings.THROTTLE_BURST)
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Drops messages and button presses from users who exceed their token bucket.
+
+    Registered as the first outer update middleware, so throttled updates never
+    reach the user context cache or the database. A throttled callback is still
+    answered, which stops the button spinner without any other work. Payment
+    updates are never throttled. Redis errors let the update through.
+    """
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket or create_token_bucket()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user: TelegramUser = data.get('event_from_user')
+
+        if not from_user or not isinstance(event, Update) or not self._is_throttled_type(event):
+            return await handler(event, data)
+
+        try:
+            allowed = await self.bucket.consume(from_user.id)
+        except Exception as e:
+            logging.warning(f"Throttling check failed for {from_user.id}: {e}")
+            allowed = True
+
+        if allowed:
+            return await handler(event, data)
+
+        if event.callback_query:
+            try:
+                await event.callback_query.answer("⏳ Too many requests, please slow down")
+            except Exception as e:
+                logging.warning(f"Failed to answer throttled callback for {from_user.id}: {e}")
+
+        return None
+
+    @staticmethod
+    def _is_throttled_type(event: Update) -> bool:
+        if event.callback_query:
+            return True
+        return bool(event.message and not event.message.successful_payment)
@@ -0,0 +1,37 @@
+from typing import Any, Awaitable, Callable, Dict
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TelegramUser
+from database.database import async_session
+from services.user_context_service import UserContextService
+import logging
+
+
+class UserContextMiddleware(BaseMiddleware):
+    """Puts the sender's cached ``UserContext`` into handler data as ``user_context``.
+
+    Registered as an outer update middleware after aiogram's own context
+    middleware, so ``event_from_user`` is already resolved, and after
+    ``DbSessionMiddleware`` so a cache miss reuses the update's session.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        from_user: TelegramUser = data.get('event_from_user')
+        data['user_context'] = None
+
+        if from_user and not from_user.is_bot:
+            try:
+                db = data.get('db')
+                if db is not None:
+                    data['user_context'] = await UserContextService.get(db, from_user.id)
+                else:
+                    async with async_session() as db:
+                        data['user_context'] = await UserContextService.get(db, from_user.id)
+            except Exception as e:
+                logging.error(f"Error resolving user context for {from_user.id}: {e}")
+
+        return await handler(event, data)
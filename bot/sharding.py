@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates, TelegramMethod
+from aiogram.types import Update
+from redis.exceptions import ResponseError
+from services.redis_client import get_redis
+from config.settings import settings
+
+# Update fields whose payload carries the chat, checked in this order
+CHAT_UPDATE_TYPES = (
+    'message', 'edited_message', 'channel_post', 'edited_channel_post',
+    'my_chat_member', 'chat_member', 'chat_join_request',
+    'message_reaction', 'message_reaction_count', 'chat_boost', 'removed_chat_boost',
+)
+
+# Update fields that only carry the sender
+USER_UPDATE_TYPES = (
+    'inline_query', 'chosen_inline_result', 'shipping_query', 'pre_checkout_query', 'poll_answer',
+)
+
+CONSUMER_GROUP = 'bot'
+
+
+def stream_name(shard: int) -> str:
+    return f"{settings.SHARD_STREAM_PREFIX}:{shard}"
+
+
+def dump_update(update: Update) -> Dict[str, Any]:
+    # Aliases keep Telegram's field names ('from'), the same shape feed_raw_update expects
+    return update.model_dump(mode='json', by_alias=True, exclude_none=True)
+
+
+def update_chat_id(update: Dict[str, Any]) -> int:
+    """Returns the chat an update belongs to, falling back to the sender.
+
+    Updates without either (e.g. poll state changes) map to 0.
+    """
+    for name in CHAT_UPDATE_TYPES:
+        payload = update.get(name)
+        if payload and payload.get('chat'):
+            return payload['chat']['id']
+
+    callback_query = update.get('callback_query')
+    if callback_query:
+        message = callback_query.get('message')
+        if message and message.get('chat'):
+            return message['chat']['id']
+        sender = callback_query.get('from')
+        if sender:
+            return sender['id']
+
+    for name in USER_UPDATE_TYPES:
+        payload = update.get(name)
+        if payload:
+            sender = payload.get('from') or payload.get('user')
+            if sender:
+                return sender['id']
+
+    return 0
+
+
+def shard_for(update: Dict[str, Any], shards: int) -> int:
+    return update_chat_id(update) % shards
+
+
+class UpdateReceiver:
+    """Long-polls Telegram and appends each update to the stream of its shard.
+
+    All updates of a chat land in the same stream, and each stream is read by
+    exactly one worker, so per-chat ordering survives the fan-out. Delivery is
+    at least once: a crash between XADD and the next getUpdates replays the
+    last batch.
+    """
+
+    def __init__(self, bot: Bot, shards: int, allowed_updates: Optional[List[str]] = None):
+        self.bot = bot
+        self.shards = shards
+        self.allowed_updates = allowed_updates
+        self.offset = None
+
+    async def run(self):
+        redis = get_redis()
+        failures = 0
+
+        while True:
+            try:
+                updates = await self.bot(
+                    GetUpdates(
+                        offset=self.offset,
+                        timeout=settings.SHARD_POLLING_TIMEOUT,
+                        allowed_updates=self.allowed_updates
+                    ),
+                    request_timeout=int(self.bot.session.timeout + settings.SHARD_POLLING_TIMEOUT)
+                )
+                failures = 0
+            except Exception as e:
+                failures += 1
+                delay = min(2 ** failures, 60)
+                logging.error(f"Failed to fetch updates, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                continue
+
+            if not updates:
+                continue
+
+            async with redis.pipeline(transaction=False) as pipe:
+                for update in updates:
+                    raw = dump_update(update)
+                    pipe.xadd(
+                        stream_name(shard_for(raw, self.shards)),
+                        {'update': json.dumps(raw)},
+                        maxlen=settings.SHARD_STREAM_MAXLEN,
+                        approximate=True
+                    )
+                await pipe.execute()
+
+            self.offset = updates[-1].update_id + 1
+
+
+class ShardWorker:
+    """Feeds the updates of one shard stream into the dispatcher.
+
+    Updates of different chats run concurrently up to
+    UPDATE_WORKER_CONCURRENCY; updates of the same chat run one after another
+    in stream order. Entries are acknowledged once handled, and entries left
+    pending by a previous run of this shard are replayed on start.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, shard: int):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.shard = shard
+        self.stream = stream_name(shard)
+        self.consumer = f"{CONSUMER_GROUP}-{shard}"
+        self._semaphore = asyncio.Semaphore(settings.UPDATE_WORKER_CONCURRENCY)
+        self._chat_tails: Dict[int, asyncio.Task] = {}
+
+    async def run(self):
+        redis = get_redis()
+
+        try:
+            await redis.xgroup_create(self.stream, CONSUMER_GROUP, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+
+        # Our own pending entries are replayed first, then '>' waits for new ones
+        replaying = True
+        last_id = '0'
+
+        while True:
+            try:
+                response = await redis.xreadgroup(
+                    CONSUMER_GROUP, self.consumer, {self.stream: last_id},
+                    count=settings.UPDATE_WORKER_CONCURRENCY, block=5000
+                )
+            except Exception as e:
+                logging.error(f"Failed to read shard {self.shard}: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            entries = response[0][1] if response else []
+            if replaying and not entries:
+                replaying, last_id = False, '>'
+                continue
+
+            for entry_id, fields in entries:
+                await self._schedule(entry_id, json.loads(fields['update']))
+
+            if replaying:
+                # Replayed entries stay pending until acked, so page past them
+                last_id = entries[-1][0]
+
+    async def _schedule(self, entry_id: str, update: Dict[str, Any]):
+        await self._semaphore.acquire()
+
+        chat_id = update_chat_id(update)
+        previous = self._chat_tails.get(chat_id)
+        task = asyncio.create_task(self._process(entry_id, update, previous))
+        self._chat_tails[chat_id] = task
+
+        def _done(finished: asyncio.Task):
+            self._semaphore.release()
+            if self._chat_tails.get(chat_id) is finished:
+                del self._chat_tails[chat_id]
+
+        task.add_done_callback(_done)
+
+    async def _process(self, entry_id: str, update: Dict[str, Any], previous: Optional[asyncio.Task]):
+        if previous:
+            await asyncio.wait([previous])
+
+        try:
+            result = await self.dispatcher.feed_raw_update(self.bot, update)
+            if isinstance(result, TelegramMethod):
+                await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+        except Exception as e:
+            logging.error(f"Error handling update {update.get('update_id')} on shard {self.shard}: {e}")
+
+        try:
+            await get_redis().xack(self.stream, CONSUMER_GROUP, entry_id)
+        except Exception as e:
+            logging.error(f"Failed to ack update {update.get('update_id')} on shard {self.shard}: {e}")
+
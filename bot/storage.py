@@ -0,0 +1,34 @@
+from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
+from config.settings import settings
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _orjson_dumps(data) -> bytes:
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _compact_json_dumps(data) -> str:
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def create_fsm_storage() -> RedisStorage:
+    """Redis FSM storage with expiring records and per-bot keys.
+
+    Abandoned wizards expire after FSM_STATE_TTL / FSM_DATA_TTL seconds instead
+    of staying in Redis forever. Data is serialized with orjson when it is
+    installed, otherwise with compact stdlib JSON; both read each other's
+    output.
+    """
+    return RedisStorage.from_url(
+        settings.REDIS_URL,
+        key_builder=DefaultKeyBuilder(prefix=settings.FSM_KEY_PREFIX, with_bot_id=True),
+        state_ttl=settings.FSM_STATE_TTL or None,
+        data_ttl=settings.FSM_DATA_TTL or None,
+        json_dumps=_orjson_dumps if orjson else _compact_json_dumps,
+        json_loads=orjson.loads if orjson else json.loads
+    )
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Optional
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+
+class LimitedRequestHandler(SimpleRequestHandler):
+    """Webhook handler that answers Telegram right away and processes at most
+    ``concurrency`` updates at a time.
+
+    When every slot is busy the request is held open until one frees up, so
+    Telegram (bounded by the webhook's max_connections) backs off instead of
+    the process piling up unbounded tasks.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        concurrency: int,
+        secret_token: Optional[str] = None,
+        **data: Any
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        update = await request.json(loads=bot.session.json_loads)
+
+        await self._semaphore.acquire()
+        try:
+            feed_update_task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        self._background_feed_update_tasks.add(feed_update_task)
+        feed_update_task.add_done_callback(self._background_feed_update_tasks.discard)
+        feed_update_task.add_done_callback(lambda _: self._semaphore.release())
+
+        return web.json_response({}, dumps=bot.session.json_dumps)
@@ -99,6 +99,19 @@ celery_app.conf.update(
                 }
             }
         },
+        'maintain-log-partitions': {
+            'task': 'tasks.maintain_log_partitions',
+            'schedule': crontab(hour=2, minute=30),
+            'options': {
+                'expires': 3600,
+                'retry': True,
+                'retry_policy': {
+                    'max_retries': 3,
+                    'interval_start': 0,
+                    'interval_step': 300,
+                }
+            }
+        },
         'check-subscription-expiry': {
             'task': 'tasks.check_subscription_expiry',
             'schedule': crontab(hour='*/6', minute=0),
@@ -125,6 +138,22 @@ celery_app.conf.update(
                 }
             }
         },
+        'refresh-analytics-rollups': {
+            'task': 'tasks.refresh_analytics_rollups',
+            'schedule': crontab(minute='*/15'),
+            'options': {
+                'expires': 800,
+                'retry': False,
+            }
+        },
+        'reconcile-post-quotas': {
+            'task': 'tasks.reconcile_post_quotas',
+            'schedule': crontab(minute='*/10'),
+            'options': {
+                'expires': 500,
+                'retry': False,
+            }
+        },
         'generate-daily-analytics': {
             'task': 'tasks.generate_analytics_report',
             'schedule': crontab(hour=9, minute=0),
@@ -1,19 +1,62 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from config.settings import settings
 
+
+def build_engine_options() -> dict:
+    connect_args = {
+        'statement_cache_size': settings.DB_STATEMENT_CACHE_SIZE,
+        'server_settings': {'jit': settings.DB_JIT},
+    }
+
+    if settings.DB_POOL_CLASS == 'null':
+        return {'poolclass': NullPool, 'connect_args': connect_args}
+
+    # Without pre-ping, stale connections are caught by pool_recycle and by
+    # SQLAlchemy invalidating the pool on the first disconnect error
+    return {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'connect_args': connect_args,
+    }
+
+
+def build_database_url(url: str):
+    # Setting both cache sizes to 0 disables server-side prepared statements,
+    # which is required behind PgBouncer in transaction pooling mode
+    return make_url(url.replace('postgresql://', 'postgresql+asyncpg://')).update_query_dict({
+        'prepared_statement_cache_size': str(settings.DB_PREPARED_STATEMENT_CACHE_SIZE)
+    })
+
+
 # Создаем асинхронный движок
 engine = create_async_engine(
-    settings.DATABASE_URL.replace('postgresql://', 'postgresql+asyncpg://'),
+    build_database_url(settings.DATABASE_URL),
     echo=False,
-    pool_pre_ping=True
+    **build_engine_options()
 )
 
+# Reporting and backups read from the replica when one is configured
+read_engine = create_async_engine(
+    build_database_url(settings.DATABASE_REPLICA_URL),
+    echo=False,
+    **build_engine_options()
+) if settings.DATABASE_REPLICA_URL else engine
+
 # Создаем фабрику сессий
 async_session = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+async_read_session = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
 async def get_db():
     async with async_session() as session:
         try:
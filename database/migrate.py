@@ -0,0 +1,46 @@
+"""Brings the database schema to the latest Alembic revision.
+
+Databases built by ``Base.metadata.create_all()`` before the migrations
+existed have the tables but no ``alembic_version``; they are stamped at the
+0001 baseline first, so ``upgrade head`` only applies the later revisions.
+
+    python -m database.migrate
+"""
+import asyncio
+import logging
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from database.database import engine
+
+BASELINE_REVISION = '0001'
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'alembic.ini')
+
+
+async def needs_baseline_stamp() -> bool:
+    try:
+        async with engine.connect() as conn:
+            tables = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+    finally:
+        await engine.dispose()
+
+    return 'users' in tables and 'alembic_version' not in tables
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    config = Config(ALEMBIC_INI)
+
+    if asyncio.run(needs_baseline_stamp()):
+        logging.info(f"Existing schema without migration history, stamping revision {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+
+    command.upgrade(config, 'head')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Float, Date, Index
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, ForeignKey, Text, Float, Date, Index, text, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
@@ -21,6 +21,15 @@ class User(Base):
     test_post_limits = relationship("TestPostLimit", back_populates="user")
     post_logs = relationship("PostLog", back_populates="user")
 
+    __table_args__ = (
+        # Trigram index serves case-insensitive equality, prefix and fuzzy search
+        Index(
+            'idx_users_username_trgm', func.lower(username).label('username_lower'),
+            postgresql_using='gin', postgresql_ops={'username_lower': 'gin_trgm_ops'}
+        ),
+        {'extend_existing': True}
+    )
+
 
 class Subscription(Base):
     __tablename__ = 'subscriptions'
@@ -34,6 +43,12 @@ class Subscription(Base):
 
     user = relationship("User", back_populates="subscriptions")
 
+    __table_args__ = (
+        Index('idx_subscriptions_user_active_expires', 'user_id', 'is_active', 'expires_at'),
+        Index('idx_subscriptions_active_expires_id', 'expires_at', 'id', postgresql_where=text('is_active')),
+        {'extend_existing': True}
+    )
+
 
 class AutopostSettings(Base):
     __tablename__ = 'autopost_settings'
@@ -51,6 +66,29 @@ class AutopostSettings(Base):
 
     user = relationship("User", back_populates="autopost_settings")
 
+    __table_args__ = (
+        Index('idx_autopost_settings_user_active', 'user_id', 'is_active'),
+        Index('idx_autopost_settings_active', 'user_id', postgresql_where=text('is_active')),
+        {'extend_existing': True}
+    )
+
+
+class Channel(Base):
+    __tablename__ = 'channels'
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(BigInteger, unique=True, nullable=False)
+    # '@' + lowercased username, comparable with AutopostSettings.channel_id
+    handle = Column(String(255), index=True)
+    title = Column(String(255))
+    type = Column(String(32))
+    status = Column(String(32), nullable=False)
+    is_admin = Column(Boolean, nullable=False, default=False)
+    can_post = Column(Boolean, nullable=False, default=False)
+    member_count = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class Transaction(Base):
     __tablename__ = 'transactions'
@@ -62,17 +100,31 @@ class Transaction(Base):
     payment_method = Column(String(50))
     status = Column(String(20), default='pending')
     external_id = Column(String(255))
+    plan_type = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index('idx_transactions_status_created', 'status', 'created_at'),
+        Index('idx_transactions_user_status', 'user_id', 'status'),
+        {'extend_existing': True}
+    )
+
 
 class ActionLog(Base):
     __tablename__ = 'action_logs'
 
-    id = Column(Integer, primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     action_type = Column(String(100), nullable=False)
     details = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    # Monthly range partitions are managed by services.partition_service
+    __table_args__ = (
+        Index('idx_action_logs_user_created', 'user_id', 'created_at'),
+        Index('idx_action_logs_type_created', 'action_type', 'created_at'),
+        {'postgresql_partition_by': 'RANGE (created_at)', 'extend_existing': True}
+    )
 
 
 class TestPostLimit(Base):
@@ -98,20 +150,50 @@ class TestPostLimit(Base):
 class PostLog(Base):
     __tablename__ = 'post_logs'
 
-    id = Column(Integer, primary_key=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     channel_id = Column(String(255), nullable=False)
     category = Column(String(100), nullable=False)
     style = Column(String(50), nullable=False)
     post_type = Column(String(20), default='manual')
     success = Column(Boolean, default=True)
+    error_class = Column(String(100), nullable=True)
     error_message = Column(Text, nullable=True)
-    created_at = Column(Date, default=date.today)
+    latency_ms = Column(Integer, nullable=True)
+    message_id = Column(BigInteger, nullable=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
 
     user = relationship("User", back_populates="post_logs")
 
+    # Monthly range partitions are managed by services.partition_service
     __table_args__ = (
         Index('idx_post_logs_user_date', 'user_id', 'created_at'),
         Index('idx_post_logs_user_channel_date', 'user_id', 'channel_id', 'created_at'),
-        {'extend_existing': True}
-    )
\ No newline at end of file
+        {'postgresql_partition_by': 'RANGE (created_at)', 'extend_existing': True}
+    )
+
+class DailyStats(Base):
+    __tablename__ = 'daily_stats'
+
+    day = Column(Date, primary_key=True)
+    new_users = Column(Integer, nullable=False, default=0)
+    active_subscriptions = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DailyRevenueStats(Base):
+    __tablename__ = 'daily_revenue_stats'
+
+    day = Column(Date, primary_key=True)
+    plan_type = Column(Integer, primary_key=True)
+    purchases = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+class DailyPostStats(Base):
+    __tablename__ = 'daily_post_stats'
+
+    day = Column(Date, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    sent = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
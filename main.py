@@ -1,12 +1,22 @@
 # main.py
 import asyncio
 import logging
+from datetime import datetime
+from sqlalchemy import text
+import multiprocessing
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.redis import RedisStorage
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
 from config.settings import settings
-from bot.handlers import start, test_posting, subscription, faq, admin, profile
+from bot.handlers import start, test_posting, subscription, faq, admin, profile, channels
 from database.database import engine
 from database.models import Base
+from services.partition_service import PartitionService
+from bot.middlewares import DbSessionMiddleware, ReleaseConnectionMiddleware, UserContextMiddleware, ThrottlingMiddleware
+from bot.factory import create_bot
+from bot.storage import create_fsm_storage
+from bot.webhook import LimitedRequestHandler
+from bot.sharding import UpdateReceiver, ShardWorker
 from dotenv import load_dotenv
 import os
 
@@ -30,17 +40,27 @@ load_dotenv()
 print(f"ADMIN_IDS from env: {os.getenv('ADMIN_IDS')}")
 
 async def create_tables():
+    # Migration 0007 installs pg_trgm; this only helps databases built by create_all,
+    # and managed Postgres may refuse it to the bot's role
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except Exception as e:
+        logging.warning(f"Could not create the pg_trgm extension, run the migrations instead: {e}")
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await PartitionService.ensure_partitions(
+            conn, datetime.utcnow().date(), settings.LOG_PARTITION_MONTHS_AHEAD
+        )
 
 
-async def main():
-    await create_tables()
-
-    bot = Bot(token=settings.BOT_TOKEN)
-
-    storage = RedisStorage.from_url(settings.REDIS_URL)
-    dp = Dispatcher(storage=storage)
+def create_dispatcher() -> Dispatcher:
+    # FSM state lives in Redis so any bot process can continue a conversation
+    dp = Dispatcher(storage=create_fsm_storage())
+    dp.update.outer_middleware(ThrottlingMiddleware())
+    dp.update.outer_middleware(DbSessionMiddleware())
+    dp.update.outer_middleware(UserContextMiddleware())
 
     dp.include_router(start.router)
     dp.include_router(test_posting.router)
@@ -48,14 +68,167 @@ async def main():
     dp.include_router(faq.router)
     dp.include_router(admin.router)
     dp.include_router(profile.router)
+    dp.include_router(channels.router)
+
+    return dp
 
 
+def create_bot_with_middlewares() -> Bot:
+    bot = create_bot()
+    bot.session.middleware(ReleaseConnectionMiddleware())
+    return bot
+
+
+async def run_polling():
+    bot = create_bot_with_middlewares()
+    dp = create_dispatcher()
 
     try:
+        # getUpdates is rejected while a webhook is set, e.g. after switching modes
+        await bot.delete_webhook()
         await dp.start_polling(bot)
     finally:
         await bot.session.close()
 
 
+async def on_webhook_startup(bot: Bot, dispatcher: Dispatcher):
+    await bot.set_webhook(
+        url=settings.WEBHOOK_BASE_URL.rstrip('/') + settings.WEBHOOK_PATH,
+        secret_token=settings.WEBHOOK_SECRET or None,
+        max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=dispatcher.resolve_used_update_types()
+    )
+    logger.info(f"Webhook set to {settings.WEBHOOK_BASE_URL.rstrip('/')}{settings.WEBHOOK_PATH}")
+
+
+async def create_webhook_app(worker_index: int) -> web.Application:
+    bot = create_bot_with_middlewares()
+    dp = create_dispatcher()
+
+    # One process registers the webhook, the rest only serve it
+    if worker_index == 0:
+        dp.startup.register(on_webhook_startup)
+
+    app = web.Application()
+    LimitedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        concurrency=settings.WEBHOOK_CONCURRENCY,
+        secret_token=settings.WEBHOOK_SECRET or None
+    ).register(app, path=settings.WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    return app
+
+
+def serve_webhook(worker_index: int = 0):
+    web.run_app(
+        create_webhook_app(worker_index),
+        host=settings.WEBHOOK_HOST,
+        port=settings.WEBHOOK_PORT,
+        reuse_port=settings.WEBHOOK_WORKERS > 1,
+        print=None
+    )
+
+
+def run_webhook():
+    if not settings.WEBHOOK_BASE_URL:
+        raise ValueError("WEBHOOK_BASE_URL is required when BOT_MODE=webhook")
+    if not settings.WEBHOOK_SECRET:
+        logger.warning("WEBHOOK_SECRET is empty, webhook requests are not authenticated")
+
+    if settings.WEBHOOK_WORKERS <= 1:
+        serve_webhook()
+        return
+
+    # Workers share the port through SO_REUSEPORT and the kernel balances connections
+    workers = [
+        multiprocessing.Process(target=serve_webhook, args=(index,), name=f"webhook-{index}")
+        for index in range(settings.WEBHOOK_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+
+async def run_shard_worker(shard: int):
+    bot = create_bot_with_middlewares()
+    dp = create_dispatcher()
+
+    await dp.emit_startup(bot=bot)
+    try:
+        await ShardWorker(dp, bot, shard).run()
+    finally:
+        await dp.emit_shutdown(bot=bot)
+        await bot.session.close()
+
+
+def serve_shard(shard: int):
+    try:
+        asyncio.run(run_shard_worker(shard))
+    except KeyboardInterrupt:
+        pass
+
+
+async def run_receiver():
+    bot = create_bot()
+    # Only used to work out which update types the handlers need
+    dp = create_dispatcher()
+
+    try:
+        await bot.delete_webhook()
+        await UpdateReceiver(bot, settings.SHARD_WORKERS, dp.resolve_used_update_types()).run()
+    finally:
+        await bot.session.close()
+
+
+def run_sharded():
+    # Workers are started before this process builds its own dispatcher,
+    # routers can only be attached once per process
+    workers = [
+        multiprocessing.Process(target=serve_shard, args=(shard,), name=f"shard-{shard}")
+        for shard in range(settings.SHARD_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        asyncio.run(run_receiver())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.join()
+
+
+async def prepare_database():
+    try:
+        await create_tables()
+    finally:
+        # Pooled connections must not leak into forked worker processes
+        await engine.dispose()
+
+
+def main():
+    asyncio.run(prepare_database())
+
+    if settings.BOT_MODE == 'webhook':
+        run_webhook()
+    elif settings.BOT_MODE == 'sharded':
+        run_sharded()
+    else:
+        asyncio.run(run_polling())
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
@@ -0,0 +1,237 @@
+from datetime import datetime, date, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, and_, cast, union_all, Date, literal, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from database.models import (
+    User, Subscription, Transaction, PostLog,
+    DailyStats, DailyRevenueStats, DailyPostStats
+)
+import logging
+
+
+class AnalyticsService:
+    """Maintains the daily_* rollup tables and reads dashboard numbers from them.
+
+    Days are UTC calendar days, matching the naive UTC timestamps in the raw tables.
+    """
+
+    @staticmethod
+    async def refresh_rollups(db: AsyncSession, days_back: int = 1):
+        today = datetime.utcnow().date()
+        start_day = today - timedelta(days=days_back)
+        start_time = datetime.combine(start_day, datetime.min.time())
+
+        await AnalyticsService._refresh_daily_stats(db, start_time, today)
+        await AnalyticsService._refresh_revenue_stats(db, start_time)
+        await AnalyticsService._refresh_post_stats(db, start_time)
+
+        await db.commit()
+
+        logging.info(f"Analytics rollups refreshed from {start_day} to {today}")
+
+    @staticmethod
+    async def missing_history_days(db: AsyncSession) -> int:
+        """Days back to the oldest user when the rollups don't reach that far yet, else 0.
+
+        Every post and payment belongs to a user, so the first registration day
+        is the oldest day the raw tables can hold.
+        """
+        result = await db.execute(
+            select(
+                select(func.min(cast(User.created_at, Date))).scalar_subquery(),
+                select(func.min(DailyStats.day)).where(DailyStats.new_users > 0).scalar_subquery()
+            )
+        )
+        first_user_day, first_rollup_day = result.one()
+
+        if first_user_day is None or (first_rollup_day is not None and first_rollup_day <= first_user_day):
+            return 0
+
+        return (datetime.utcnow().date() - first_user_day).days
+
+    @staticmethod
+    async def _refresh_daily_stats(db: AsyncSession, start_time: datetime, today: date):
+        day = cast(User.created_at, Date)
+        new_users = (
+            select(day.label('day'), func.count(User.id).label('new_users'))
+            .where(User.created_at >= start_time)
+            .group_by(day)
+        )
+
+        stmt = insert(DailyStats).from_select(['day', 'new_users'], new_users)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyStats.day],
+            set_={'new_users': stmt.excluded.new_users, 'updated_at': datetime.utcnow()}
+        )
+        await db.execute(stmt)
+
+        # Active subscriptions is a point-in-time snapshot, so only today's row gets it
+        active_subscriptions = (
+            select(
+                literal(today, Date).label('day'),
+                literal(0).label('new_users'),
+                func.count(Subscription.id).label('active_subscriptions')
+            )
+            .where(
+                and_(
+                    Subscription.is_active == True,
+                    Subscription.expires_at > datetime.utcnow()
+                )
+            )
+        )
+
+        stmt = insert(DailyStats).from_select(['day', 'new_users', 'active_subscriptions'], active_subscriptions)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyStats.day],
+            set_={'active_subscriptions': stmt.excluded.active_subscriptions, 'updated_at': datetime.utcnow()}
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def _refresh_revenue_stats(db: AsyncSession, start_time: datetime):
+        revenue = AnalyticsService._live_revenue_query(start_time)
+
+        # Rebuilt rather than upserted, so days whose payments all left 'completed' drop out
+        await db.execute(delete(DailyRevenueStats).where(DailyRevenueStats.day >= start_time.date()))
+
+        stmt = insert(DailyRevenueStats).from_select(['day', 'plan_type', 'purchases', 'revenue'], revenue)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyRevenueStats.day, DailyRevenueStats.plan_type],
+            set_={'purchases': stmt.excluded.purchases, 'revenue': stmt.excluded.revenue}
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    async def _refresh_post_stats(db: AsyncSession, start_time: datetime):
+        day = cast(PostLog.created_at, Date)
+
+        posts = (
+            select(
+                day.label('day'),
+                PostLog.category,
+                func.count(PostLog.id).filter(PostLog.success == True).label('sent'),
+                func.count(PostLog.id).filter(PostLog.success == False).label('failed')
+            )
+            .where(PostLog.created_at >= start_time)
+            .group_by(day, PostLog.category)
+        )
+
+        await db.execute(delete(DailyPostStats).where(DailyPostStats.day >= start_time.date()))
+
+        stmt = insert(DailyPostStats).from_select(['day', 'category', 'sent', 'failed'], posts)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyPostStats.day, DailyPostStats.category],
+            set_={'sent': stmt.excluded.sent, 'failed': stmt.excluded.failed}
+        )
+        await db.execute(stmt)
+
+    @staticmethod
+    def _live_revenue_query(start_time: datetime):
+        day = cast(Transaction.created_at, Date)
+        plan_type = func.coalesce(Transaction.plan_type, literal_column('0'))
+
+        return (
+            select(
+                day.label('day'),
+                plan_type.label('plan_type'),
+                func.count(Transaction.id).label('purchases'),
+                func.sum(Transaction.amount).label('revenue')
+            )
+            .where(
+                and_(
+                    Transaction.status == 'completed',
+                    Transaction.created_at >= start_time
+                )
+            )
+            .group_by(day, plan_type)
+        )
+
+    @staticmethod
+    async def get_revenue_summary(db: AsyncSession, period_days: int = 30) -> dict:
+        today = datetime.utcnow().date()
+        start_day = today - timedelta(days=period_days - 1)
+        today_start = datetime.combine(today, datetime.min.time())
+
+        # Closed days come from the rollup, today is aggregated live from transactions,
+        # and both are folded into per-plan totals in the same statement
+        daily = union_all(
+            select(
+                DailyRevenueStats.day,
+                DailyRevenueStats.plan_type,
+                DailyRevenueStats.purchases,
+                DailyRevenueStats.revenue
+            ).where(
+                and_(
+                    DailyRevenueStats.day >= start_day,
+                    DailyRevenueStats.day < today
+                )
+            ),
+            AnalyticsService._live_revenue_query(today_start)
+        ).subquery()
+
+        result = await db.execute(
+            select(
+                daily.c.plan_type,
+                func.sum(daily.c.purchases),
+                func.sum(daily.c.revenue),
+                func.sum(daily.c.purchases).filter(daily.c.day == today),
+                func.sum(daily.c.revenue).filter(daily.c.day == today)
+            )
+            .group_by(daily.c.plan_type)
+        )
+
+        summary = {
+            'period_days': period_days,
+            'total_amount': 0,
+            'total_count': 0,
+            'today_amount': 0,
+            'today_count': 0,
+            'by_plan': {}
+        }
+
+        for plan_type, purchases, revenue, today_purchases, today_revenue in result.all():
+            summary['total_count'] += purchases or 0
+            summary['total_amount'] += revenue or 0
+            summary['today_count'] += today_purchases or 0
+            summary['today_amount'] += today_revenue or 0
+            if plan_type:
+                summary['by_plan'][plan_type] = purchases or 0
+
+        summary['average_amount'] = (
+            summary['total_amount'] / summary['total_count'] if summary['total_count'] else 0
+        )
+
+        return summary
+
+    @staticmethod
+    async def get_active_subscriptions(db: AsyncSession) -> int:
+        result = await db.execute(
+            select(DailyStats.active_subscriptions).order_by(DailyStats.day.desc()).limit(1)
+        )
+        return result.scalar() or 0
+
+    @staticmethod
+    async def get_overview(db: AsyncSession, period_days: int = 7) -> dict:
+        start_day = datetime.utcnow().date() - timedelta(days=period_days - 1)
+
+        new_users_result = await db.execute(
+            select(func.sum(DailyStats.new_users)).where(DailyStats.day >= start_day)
+        )
+
+        posts_result = await db.execute(
+            select(func.sum(DailyPostStats.sent), func.sum(DailyPostStats.failed))
+            .where(DailyPostStats.day >= start_day)
+        )
+        posts_sent, posts_failed = posts_result.one()
+
+        revenue = await AnalyticsService.get_revenue_summary(db, period_days)
+
+        return {
+            'period_days': period_days,
+            'new_users': new_users_result.scalar() or 0,
+            'active_subscriptions': await AnalyticsService.get_active_subscriptions(db),
+            'revenue': revenue['total_amount'],
+            'purchases': revenue['total_count'],
+            'posts_sent': posts_sent or 0,
+            'posts_failed': posts_failed or 0
+        }
@@ -5,17 +5,26 @@ from sqlalchemy import select, and_
 from database.models import User, Subscription, AutopostSettings
 from services.news_service import NewsService, NewsItem
 from services.content_generator import ContentGenerator
+from services.post_log_writer import PostLogWriter
+from services.channel_cache_service import ChannelCacheService
+from services.channel_service import ChannelService
 from aiogram import Bot
 import asyncio
 import logging
+import time
+import uuid
 
 
 class AutopostService:
 
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, post_log_writer: Optional[PostLogWriter] = None):
         self.bot = bot
         self.news_service = NewsService()
         self.content_generator = ContentGenerator()
+        self.post_log_writer = post_log_writer or PostLogWriter()
+
+    async def close(self):
+        await self.post_log_writer.close()
 
     async def process_autoposts(self, db: AsyncSession):
         try:
@@ -41,7 +50,8 @@ class AutopostService:
                 select(AutopostSettings).where(
                     and_(
                         AutopostSettings.user_id == user_id,
-                        AutopostSettings.is_active == True
+                        AutopostSettings.is_active == True,
+                        ChannelService.autopost_channel_is_postable()
                     )
                 )
             )
@@ -68,6 +78,11 @@ class AutopostService:
             if hasattr(settings, 'weekdays_only') and settings.weekdays_only and datetime.now().weekday() >= 5:
                 return
 
+            # Skip before generating content for channels the bot can no longer post to
+            if not await ChannelCacheService.can_post(self.bot, settings.channel_id):
+                logging.info(f"Skipping channel {settings.channel_id}: bot cannot post there")
+                return
+
             news_list = await self.news_service.get_news_by_category(
                 settings.category,
                 limit=1
@@ -83,14 +98,20 @@ class AutopostService:
                 settings.style
             )
 
-            await self.send_to_channel(settings.channel_id, content)
+            await self.send_to_channel(
+                settings.channel_id, content,
+                user_id=settings.user_id, category=settings.category, style=settings.style, post_type='auto'
+            )
 
         except Exception as e:
             logging.error(f"Error creating posts for setting {settings.id}: {e}")
 
-    async def send_to_channel(self, channel_id: str, content: str):
+    async def send_to_channel(self, channel_id: str, content: str, user_id: Optional[int] = None,
+                              category: Optional[str] = None, style: Optional[str] = None,
+                              post_type: str = 'auto'):
+        started = time.monotonic()
         try:
-            await self.bot.send_message(
+            message = await self.bot.send_message(
                 chat_id=channel_id,
                 text=content,
                 parse_mode='HTML',
@@ -98,9 +119,25 @@ class AutopostService:
             )
 
             logging.info(f"Post sent to channel {channel_id}")
+            if user_id is not None:
+                self.post_log_writer.record(
+                    user_id, channel_id, category, style, post_type, True,
+                    latency_ms=int((time.monotonic() - started) * 1000),
+                    message_id=message.message_id
+                )
+            return True
 
         except Exception as e:
             logging.error(f"Error sending to channel {channel_id}: {e}")
+            if ChannelCacheService.is_access_error(e):
+                await ChannelCacheService.mark_unavailable(channel_id, str(e))
+            if user_id is not None:
+                self.post_log_writer.record(
+                    user_id, channel_id, category, style, post_type, False,
+                    latency_ms=int((time.monotonic() - started) * 1000),
+                    error=e
+                )
+            return False
 
     async def send_single_post(self, db: AsyncSession, user_id: int, channel_id: str, category: str, style: str):
         try:
@@ -115,12 +152,15 @@ class AutopostService:
                     )
                 except:
                     pass
-                return
+                return False
 
             news_item = news_list[0]
             content = await self.content_generator.generate_post(news_item, style)
 
-            await self.send_to_channel(channel_id, content)
+            if not await self.send_to_channel(
+                channel_id, content, user_id=user_id, category=category, style=style, post_type='manual'
+            ):
+                raise RuntimeError(f"Channel {channel_id} rejected the post")
 
             try:
                 await self.bot.send_message(
@@ -131,6 +171,7 @@ class AutopostService:
                 pass
 
             logging.info(f"Manual post sent to {channel_id} for user {user_id}")
+            return True
 
         except Exception as e:
             logging.error(f"Error sending manual post: {e}")
@@ -143,13 +184,16 @@ class AutopostService:
             except:
                 pass
 
+            return False
+
     async def process_custom_time_posts(self, db: AsyncSession, current_time: str):
         try:
             result = await db.execute(
                 select(AutopostSettings, User).join(User).where(
                     and_(
                         AutopostSettings.is_active == True,
-                        AutopostSettings.specific_times.like(f'%{current_time}%')
+                        AutopostSettings.specific_times.like(f'%{current_time}%'),
+                        ChannelService.autopost_channel_is_postable()
                     )
                 )
             )
@@ -209,15 +253,21 @@ class AutopostService:
 
     async def validate_channel_access(self, channel_id: str) -> dict:
         try:
-            chat = await self.bot.get_chat(channel_id)
-            chat_member = await self.bot.get_chat_member(channel_id, self.bot.id)
+            channel = await ChannelCacheService.get(self.bot, channel_id)
+
+            # A cached refusal from Telegram is reported like the live error was
+            if channel.error:
+                return {
+                    'success': False,
+                    'error': channel.error
+                }
 
             return {
                 'success': True,
-                'is_admin': chat_member.status == 'administrator',
-                'can_post': getattr(chat_member, 'can_post_messages', False),
-                'chat_title': chat.title,
-                'chat_type': chat.type
+                'is_admin': channel.status == 'administrator',
+                'can_post': channel.can_post,
+                'chat_title': channel.title,
+                'chat_type': channel.type
             }
         except Exception as e:
             return {
@@ -281,6 +331,7 @@ class AutopostService:
             delay_seconds = delay_minutes * 60
             send_manual_post.apply_async(
                 args=[user_id, channel_id, category, style],
+                kwargs={'request_id': uuid.uuid4().hex},
                 countdown=delay_seconds
             )
 
@@ -0,0 +1,255 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from database.models import User, Subscription, Transaction
+import gzip
+import io
+import json
+import logging
+import os
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class BackupService:
+    """Streams tables into compressed NDJSON files.
+
+    A full snapshot is written every ``full_interval_days``; runs in between
+    only export rows whose watermark column moved past the previous run.
+    Subscriptions and transactions have no ``updated_at``, so changes to
+    existing rows (e.g. deactivation) are only picked up by the next full
+    snapshot. Incremental windows overlap by WATERMARK_OVERLAP, so a row can
+    appear in consecutive files; ``load_latest`` keeps the newest copy.
+    """
+
+    TABLES = {
+        'users': (
+            User,
+            ('id', 'telegram_id', 'username', 'language', 'created_at', 'updated_at'),
+            'updated_at'
+        ),
+        'subscriptions': (
+            Subscription,
+            ('id', 'user_id', 'plan_type', 'is_active', 'created_at', 'expires_at'),
+            'created_at'
+        ),
+        'transactions': (
+            Transaction,
+            ('id', 'user_id', 'amount', 'currency', 'status', 'external_id', 'created_at'),
+            'created_at'
+        ),
+    }
+
+    STATE_FILENAME = 'backup_state.json'
+
+    WATERMARK_OVERLAP = timedelta(minutes=10)
+
+    def __init__(self, backup_dir: str, compression: str = 'gzip', batch_size: int = 1000,
+                 full_interval_days: int = 7, retention_days: int = 30):
+        self.backup_dir = backup_dir
+        self.batch_size = batch_size
+        self.full_interval_days = full_interval_days
+        self.retention_days = retention_days
+
+        if compression == 'zstd' and zstandard is None:
+            logging.warning("zstandard is not installed, falling back to gzip backups")
+            compression = 'gzip'
+        self.compression = compression
+
+    async def create_backup(self, db: AsyncSession, now: datetime) -> str:
+        os.makedirs(self.backup_dir, exist_ok=True)
+
+        state = self._load_state()
+        is_full = self._is_full_due(state, now)
+        watermarks = {} if is_full else state.get('watermarks', {})
+
+        kind = 'full' if is_full else 'incr'
+        extension = 'ndjson.zst' if self.compression == 'zstd' else 'ndjson.gz'
+        backup_path = os.path.join(self.backup_dir, f"backup_{kind}_{now.strftime('%Y%m%d_%H%M%S')}.{extension}")
+        tmp_path = backup_path + '.tmp'
+
+        new_watermarks = dict(watermarks)
+        row_counts = {}
+
+        with self._open_writer(tmp_path) as f:
+            f.write(self._dumps({
+                'type': kind,
+                'timestamp': now.isoformat(),
+                'since': watermarks
+            }))
+
+            for table_name in self.TABLES:
+                since = watermarks.get(table_name)
+                count, watermark = await self._export_table(
+                    db, f, table_name, datetime.fromisoformat(since) if since else None
+                )
+                row_counts[table_name] = count
+                if watermark:
+                    new_watermarks[table_name] = watermark.isoformat()
+
+        os.replace(tmp_path, backup_path)
+
+        state['watermarks'] = new_watermarks
+        if is_full:
+            state['last_full_at'] = now.isoformat()
+        self._save_state(state)
+
+        logging.info(f"{kind} backup rows: {row_counts}")
+        return backup_path
+
+    async def _export_table(self, db: AsyncSession, f, table_name: str, since: Optional[datetime]):
+        model, columns, watermark_column = self.TABLES[table_name]
+        watermark_attr = getattr(model, watermark_column)
+
+        query = select(*[getattr(model, column) for column in columns]).order_by(model.id)
+        if since:
+            # Rows committed late can carry a timestamp just below the last watermark
+            query = query.where(watermark_attr >= since - self.WATERMARK_OVERLAP)
+
+        watermark_index = columns.index(watermark_column)
+        watermark = since
+        count = 0
+
+        result = await db.stream(query.execution_options(yield_per=self.batch_size))
+
+        async for rows in result.partitions(self.batch_size):
+            chunk = []
+            for row in rows:
+                chunk.append(self._dumps({'table': table_name, 'row': dict(zip(columns, row))}))
+
+                row_watermark = row[watermark_index]
+                if row_watermark and (watermark is None or row_watermark > watermark):
+                    watermark = row_watermark
+
+            f.write(''.join(chunk))
+            count += len(chunk)
+
+        return count, watermark
+
+    def cleanup_old_backups(self, now: datetime) -> int:
+        """Removes backups older than the retention period.
+
+        Incrementals only make sense on top of the preceding full backup and
+        every incremental after it, so the newest full older than the first
+        retained backup is kept together with the rest of its chain.
+        """
+        cutoff_time = now - timedelta(days=self.retention_days)
+        chain = []
+        expired = []
+
+        for filename in os.listdir(self.backup_dir):
+            if not filename.startswith('backup_') or filename == self.STATE_FILENAME:
+                continue
+
+            file_path = os.path.join(self.backup_dir, filename)
+            file_time = datetime.fromtimestamp(os.path.getmtime(file_path), tz=now.tzinfo)
+
+            if self._is_chain_file(filename):
+                chain.append((self._backup_stamp(filename), filename, file_time))
+            elif file_time < cutoff_time:
+                expired.append(filename)
+
+        chain.sort()
+        keep_from = next((i for i, (_, _, file_time) in enumerate(chain) if file_time >= cutoff_time), len(chain) - 1)
+        while keep_from > 0 and not chain[keep_from][1].startswith('backup_full_'):
+            keep_from -= 1
+
+        expired.extend(filename for _, filename, _ in chain[:max(keep_from, 0)])
+
+        for filename in expired:
+            os.remove(os.path.join(self.backup_dir, filename))
+
+        return len(expired)
+
+    def load_latest(self) -> Dict[str, Dict[int, dict]]:
+        """Reads the latest full backup and the incrementals after it.
+
+        Incremental windows overlap, so rows are merged by id with the newest
+        file winning.
+        """
+        chain = sorted(
+            (self._backup_stamp(filename), filename)
+            for filename in os.listdir(self.backup_dir)
+            if self._is_chain_file(filename)
+        )
+        fulls = [i for i, (_, filename) in enumerate(chain) if filename.startswith('backup_full_')]
+        if not fulls:
+            return {}
+
+        tables = {table_name: {} for table_name in self.TABLES}
+        for _, filename in chain[fulls[-1]:]:
+            with self._open_reader(os.path.join(self.backup_dir, filename)) as f:
+                next(f)
+                for line in f:
+                    record = json.loads(line)
+                    tables[record['table']][record['row']['id']] = record['row']
+
+        return tables
+
+    @staticmethod
+    def _is_chain_file(filename: str) -> bool:
+        return filename.startswith(('backup_full_', 'backup_incr_')) and not filename.endswith('.tmp')
+
+    @staticmethod
+    def _backup_stamp(filename: str) -> str:
+        # backup_<kind>_<YYYYmmdd>_<HHMMSS>.<extension>
+        return filename.split('_', 2)[2].split('.', 1)[0]
+
+    def _is_full_due(self, state: dict, now: datetime) -> bool:
+        last_full_at = state.get('last_full_at')
+        if not last_full_at:
+            return True
+
+        return now - datetime.fromisoformat(last_full_at) >= timedelta(days=self.full_interval_days)
+
+    def _open_writer(self, path: str):
+        if self.compression == 'zstd':
+            raw = open(path, 'wb')
+            compressed = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+            return io.TextIOWrapper(compressed, encoding='utf-8')
+
+        return gzip.open(path, 'wt', encoding='utf-8')
+
+    def _open_reader(self, path: str):
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            compressed = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+            return io.TextIOWrapper(compressed, encoding='utf-8')
+
+        return gzip.open(path, 'rt', encoding='utf-8')
+
+    def _load_state(self) -> dict:
+        state_path = os.path.join(self.backup_dir, self.STATE_FILENAME)
+        if not os.path.exists(state_path):
+            return {}
+
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unreadable backup state, forcing a full backup: {e}")
+            return {}
+
+    def _save_state(self, state: dict):
+        state_path = os.path.join(self.backup_dir, self.STATE_FILENAME)
+        tmp_path = state_path + '.tmp'
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+
+        os.replace(tmp_path, state_path)
+
+    @staticmethod
+    def _dumps(record: dict) -> str:
+        return json.dumps(record, ensure_ascii=False, default=BackupService._default) + '\n'
+
+    @staticmethod
+    def _default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
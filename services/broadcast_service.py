@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Union
+from sqlalchemy import select, and_, exists, not_
+from database.models import User, Subscription
+import logging
+
+
+AUDIENCE_TYPES = ('all', 'active_subscribers', 'language', 'custom')
+
+
+def _has_active_subscription():
+    return exists().where(
+        and_(
+            Subscription.user_id == User.id,
+            Subscription.is_active == True,
+            Subscription.expires_at > datetime.utcnow()
+        )
+    )
+
+
+def _has_any_subscription():
+    return exists().where(Subscription.user_id == User.id)
+
+
+# Named conditions a 'custom' audience can pick from
+CUSTOM_FILTERS = {
+    'no_active_subscription': lambda: not_(_has_active_subscription()),
+    'expired_subscribers': lambda: and_(_has_any_subscription(), not_(_has_active_subscription())),
+    'never_subscribed': lambda: not_(_has_any_subscription()),
+}
+
+
+class BroadcastService:
+
+    @staticmethod
+    def normalize_audience(audience: Union[str, dict]) -> dict:
+        if isinstance(audience, str):
+            audience = {'type': audience}
+
+        audience_type = audience.get('type', 'all')
+        if audience_type not in AUDIENCE_TYPES:
+            raise ValueError(f"Unknown broadcast audience: {audience_type}")
+
+        if audience_type == 'language' and not audience.get('language'):
+            raise ValueError("Language audience requires 'language'")
+
+        if audience_type == 'custom' and audience.get('filter') not in CUSTOM_FILTERS:
+            raise ValueError(f"Custom audience requires 'filter', one of: {', '.join(CUSTOM_FILTERS)}")
+
+        return audience
+
+    @staticmethod
+    def build_audience_query(audience: Union[str, dict]):
+        audience = BroadcastService.normalize_audience(audience)
+        audience_type = audience['type']
+
+        query = select(User.id, User.telegram_id)
+
+        if audience_type == 'active_subscribers':
+            query = query.where(_has_active_subscription())
+        elif audience_type == 'language':
+            query = query.where(User.language == audience['language'])
+        elif audience_type == 'custom':
+            query = query.where(CUSTOM_FILTERS[audience['filter']]())
+
+        return query.order_by(User.id)
+
+    @staticmethod
+    async def iter_recipients(session_factory, audience: Union[str, dict],
+                              batch_size: int = 500) -> AsyncIterator[List[int]]:
+        """Yields the audience's telegram ids in batches, paging by user id.
+
+        Each batch is read in its own short session, so a long broadcast never
+        holds a transaction open while messages are being sent.
+        """
+        query = BroadcastService.build_audience_query(audience)
+        last_id = 0
+
+        while True:
+            async with session_factory() as db:
+                result = await db.execute(query.where(User.id > last_id).limit(batch_size))
+                rows = result.all()
+
+            if not rows:
+                break
+
+            last_id = rows[-1].id
+            yield [row.telegram_id for row in rows]
+
+            if len(rows) < batch_size:
+                break
+
+        logging.info(f"Finished paging broadcast audience {audience}")
@@ -0,0 +1,151 @@
+from dataclasses import dataclass, asdict
+from typing import Optional, Union
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.types import Chat, ChatMember
+from services.redis_client import get_redis
+from config.settings import settings
+import json
+import logging
+
+ADMIN_STATUSES = ('administrator', 'creator')
+
+# Bad Request descriptions that mean the bot can't reach or post to the chat,
+# as opposed to a problem with the message itself
+ACCESS_ERRORS = ('chat not found', 'not enough rights', 'need administrator rights', 'chat_write_forbidden')
+
+
+@dataclass
+class ChannelInfo:
+    chat_id: Optional[int]
+    username: Optional[str]
+    title: Optional[str]
+    type: Optional[str]
+    status: str
+    can_post: bool
+    error: Optional[str] = None
+
+    @property
+    def is_admin(self) -> bool:
+        return self.status in ADMIN_STATUSES
+
+
+class ChannelCacheService:
+    """Caches the bot's view of a channel: chat metadata and its own rights.
+
+    Entries are stored under the reference the caller uses (``@username`` or
+    the numeric id) and live CHANNEL_INFO_TTL seconds. ``my_chat_member``
+    updates overwrite them as soon as the bot is promoted, demoted or removed.
+    Channels Telegram refuses access to are cached as unavailable for
+    CHANNEL_INFO_NEGATIVE_TTL seconds.
+    """
+
+    KEY_PREFIX = 'channel_info'
+
+    @staticmethod
+    def normalize(channel: Union[str, int]) -> str:
+        channel = str(channel).strip()
+        return channel.lower() if channel.startswith('@') else channel
+
+    @staticmethod
+    def _key(channel: Union[str, int]) -> str:
+        return f"{ChannelCacheService.KEY_PREFIX}:{ChannelCacheService.normalize(channel)}"
+
+    @staticmethod
+    def _build(chat: Chat, member: ChatMember) -> ChannelInfo:
+        return ChannelInfo(
+            chat_id=chat.id,
+            username=chat.username,
+            title=chat.title,
+            type=chat.type,
+            status=member.status,
+            can_post=member.status == 'creator' or bool(getattr(member, 'can_post_messages', False))
+        )
+
+    @staticmethod
+    async def _read(channel: Union[str, int]) -> Optional[ChannelInfo]:
+        try:
+            cached = await get_redis().get(ChannelCacheService._key(channel))
+            if cached:
+                return ChannelInfo(**json.loads(cached))
+        except Exception as e:
+            logging.warning(f"Channel cache read failed for {channel}: {e}")
+        return None
+
+    @staticmethod
+    async def store(info: ChannelInfo, *references: Union[str, int]):
+        """Writes ``info`` under each given reference plus its id and @username."""
+        keys = set(ChannelCacheService._key(reference) for reference in references)
+        if info.chat_id is not None:
+            keys.add(ChannelCacheService._key(info.chat_id))
+        if info.username:
+            keys.add(ChannelCacheService._key(f"@{info.username}"))
+
+        ttl = settings.CHANNEL_INFO_TTL if info.error is None else settings.CHANNEL_INFO_NEGATIVE_TTL
+        payload = json.dumps(asdict(info))
+
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(key, payload, ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            logging.warning(f"Channel cache write failed for {info.chat_id or references}: {e}")
+
+    @staticmethod
+    async def get(bot: Bot, channel: Union[str, int], refresh: bool = False) -> ChannelInfo:
+        """Returns the cached channel info, fetching it on a miss or when ``refresh``.
+
+        Live fetches raise Telegram errors as before; access errors are also
+        remembered so scheduled sends can skip the channel.
+        """
+        if not refresh:
+            cached = await ChannelCacheService._read(channel)
+            if cached:
+                return cached
+
+        try:
+            chat = await bot.get_chat(channel)
+            member = await bot.get_chat_member(channel, bot.id)
+        except (TelegramBadRequest, TelegramForbiddenError) as e:
+            await ChannelCacheService.mark_unavailable(channel, str(e))
+            raise
+
+        info = ChannelCacheService._build(chat, member)
+        await ChannelCacheService.store(info, channel)
+
+        return info
+
+    @staticmethod
+    async def can_post(bot: Bot, channel: Union[str, int]) -> bool:
+        """Whether a scheduled send to ``channel`` is worth attempting.
+
+        Transient errors count as postable so the send itself decides.
+        """
+        try:
+            return (await ChannelCacheService.get(bot, channel)).can_post
+        except (TelegramBadRequest, TelegramForbiddenError):
+            return False
+        except Exception as e:
+            logging.warning(f"Could not check channel {channel}: {e}")
+            return True
+
+    @staticmethod
+    def is_access_error(error: Exception) -> bool:
+        if isinstance(error, TelegramForbiddenError):
+            return True
+        return isinstance(error, TelegramBadRequest) and any(
+            marker in str(error).lower() for marker in ACCESS_ERRORS
+        )
+
+    @staticmethod
+    async def mark_unavailable(channel: Union[str, int], error: str):
+        await ChannelCacheService.store(
+            ChannelInfo(chat_id=None, username=None, title=None, type=None, status='left', can_post=False, error=error),
+            channel
+        )
+
+    @staticmethod
+    async def update_from_member(chat: Chat, member: ChatMember):
+        """Refreshes the cache from a ``my_chat_member`` update, no API calls needed."""
+        await ChannelCacheService.store(ChannelCacheService._build(chat, member))
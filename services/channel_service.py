@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, exists, func, cast, String
+from sqlalchemy.dialects.postgresql import insert
+from aiogram.types import Chat, ChatMember
+from database.models import Channel, AutopostSettings
+from services.channel_cache_service import ADMIN_STATUSES
+
+
+class ChannelService:
+    """Keeps the ``channels`` table in line with ``my_chat_member`` updates."""
+
+    @staticmethod
+    def handle_for(username: Optional[str]) -> Optional[str]:
+        return f"@{username.lower()}" if username else None
+
+    @staticmethod
+    async def upsert_from_member(db: AsyncSession, chat: Chat, member: ChatMember,
+                                 member_count: Optional[int] = None):
+        values = {
+            'chat_id': chat.id,
+            'handle': ChannelService.handle_for(chat.username),
+            'title': chat.title,
+            'type': chat.type,
+            'status': member.status,
+            'is_admin': member.status in ADMIN_STATUSES,
+            'can_post': member.status == 'creator' or bool(getattr(member, 'can_post_messages', False)),
+            'member_count': member_count,
+            'updated_at': datetime.utcnow(),
+        }
+
+        stmt = insert(Channel).values(**values)
+        # A failed member count lookup shouldn't wipe the last known one
+        update_values = {key: stmt.excluded[key] for key in values if key != 'chat_id'}
+        update_values['member_count'] = func.coalesce(stmt.excluded.member_count, Channel.member_count)
+
+        await db.execute(stmt.on_conflict_do_update(index_elements=['chat_id'], set_=update_values))
+
+    @staticmethod
+    def autopost_channel_is_postable():
+        """Filter for AutopostSettings queries that drops channels known to be dead.
+
+        Channels the bot has never seen an update for have no row and pass.
+        """
+        return ~exists().where(
+            and_(
+                Channel.can_post == False,
+                or_(
+                    Channel.handle == func.lower(AutopostSettings.channel_id),
+                    cast(Channel.chat_id, String) == AutopostSettings.channel_id
+                )
+            )
+        )
@@ -0,0 +1,65 @@
+from typing import Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import Message
+from services.redis_client import get_redis
+import hashlib
+import logging
+
+
+class MediaCacheService:
+    """Remembers the file_id Telegram assigns to an image sent by URL.
+
+    The first send lets Telegram fetch the URL; later sends reuse the file_id
+    and skip the external host entirely. file_ids are only valid for the bot
+    that received them, so keys include the bot id.
+    """
+
+    KEY_PREFIX = 'media_file_id'
+
+    @staticmethod
+    def _key(bot: Bot, url: str) -> str:
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        return f"{MediaCacheService.KEY_PREFIX}:{bot.id}:{digest}"
+
+    @staticmethod
+    async def get_file_id(bot: Bot, url: str) -> Optional[str]:
+        try:
+            return await get_redis().get(MediaCacheService._key(bot, url))
+        except Exception as e:
+            logging.warning(f"Media cache read failed for {url}: {e}")
+            return None
+
+    @staticmethod
+    async def remember(bot: Bot, url: str, message: Message):
+        if not message.photo:
+            return
+
+        try:
+            await get_redis().set(MediaCacheService._key(bot, url), message.photo[-1].file_id)
+        except Exception as e:
+            logging.warning(f"Media cache write failed for {url}: {e}")
+
+    @staticmethod
+    async def forget(bot: Bot, url: str):
+        try:
+            await get_redis().delete(MediaCacheService._key(bot, url))
+        except Exception as e:
+            logging.warning(f"Media cache delete failed for {url}: {e}")
+
+    @staticmethod
+    async def send_photo(bot: Bot, chat_id: int, url: str, **kwargs) -> Message:
+        file_id = await MediaCacheService.get_file_id(bot, url)
+
+        if file_id:
+            try:
+                return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            except TelegramBadRequest as e:
+                # The file_id went stale, fall back to the URL and cache the new one
+                logging.warning(f"Cached file_id for {url} rejected: {e}")
+                await MediaCacheService.forget(bot, url)
+
+        message = await bot.send_photo(chat_id=chat_id, photo=url, **kwargs)
+        await MediaCacheService.remember(bot, url, message)
+
+        return message
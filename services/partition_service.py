@@ -0,0 +1,102 @@
+from datetime import date
+from typing import List
+from sqlalchemy import text
+import logging
+import re
+
+
+class PartitionService:
+    """Creates and drops the monthly range partitions of the log tables.
+
+    Partitions are named ``<table>_yYYYYmMM`` and cover one calendar month of
+    ``created_at``. Retention drops whole partitions instead of deleting rows.
+    """
+
+    TABLES = ('post_logs', 'action_logs')
+
+    PARTITION_NAME = re.compile(r'_y(\d{4})m(\d{2})$')
+
+    @staticmethod
+    def _add_months(month: date, months: int) -> date:
+        index = month.year * 12 + month.month - 1 + months
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def partition_name(table: str, month: date) -> str:
+        return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+    @staticmethod
+    async def ensure_partitions(conn, today: date, months_ahead: int) -> List[str]:
+        current_month = today.replace(day=1)
+        created = []
+
+        for table in PartitionService.TABLES:
+            if not await PartitionService.is_partitioned(conn, table):
+                logging.warning(
+                    f"{table} is not partitioned yet, skipping its partitions; "
+                    f"run the migrations (alembic upgrade head, revision 0004)"
+                )
+                continue
+
+            existing = set(await PartitionService._list_partitions(conn, table))
+
+            for offset in range(months_ahead + 1):
+                month = PartitionService._add_months(current_month, offset)
+                name = PartitionService.partition_name(table, month)
+                if name in existing:
+                    continue
+
+                next_month = PartitionService._add_months(month, 1)
+                await conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+                ))
+                created.append(name)
+
+        if created:
+            logging.info(f"Created partitions: {', '.join(created)}")
+
+        return created
+
+    @staticmethod
+    async def drop_expired_partitions(conn, today: date, retention_months: int) -> List[str]:
+        cutoff = PartitionService._add_months(today.replace(day=1), -retention_months)
+        dropped = []
+
+        for table in PartitionService.TABLES:
+            for name in await PartitionService._list_partitions(conn, table):
+                match = PartitionService.PARTITION_NAME.search(name)
+                if not match:
+                    continue
+
+                month = date(int(match.group(1)), int(match.group(2)), 1)
+                if month < cutoff:
+                    await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                    await conn.execute(text(f"DROP TABLE {name}"))
+                    dropped.append(name)
+
+        if dropped:
+            logging.info(f"Dropped expired partitions: {', '.join(dropped)}")
+
+        return dropped
+
+    @staticmethod
+    async def is_partitioned(conn, table: str) -> bool:
+        result = await conn.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"),
+            {'table': table}
+        )
+        return bool(result.scalar())
+
+    @staticmethod
+    async def _list_partitions(conn, table: str) -> List[str]:
+        result = await conn.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table"
+            ),
+            {'table': table}
+        )
+        return [row[0] for row in result.all()]
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
+from database.database import async_session
+from database.models import PostLog
+from config.settings import settings
+import asyncio
+import logging
+
+
+class PostLogWriter:
+    """Buffers post outcomes and writes them to post_logs in bulk.
+
+    Rows are flushed as one multi-row INSERT once ``batch_size`` rows are
+    buffered or ``flush_interval_ms`` after the first buffered row, whichever
+    comes first. Call ``close()`` before the event loop ends to flush the rest.
+    """
+
+    def __init__(self, session_factory=async_session, batch_size: Optional[int] = None,
+                 flush_interval_ms: Optional[int] = None):
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.POST_LOG_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.POST_LOG_FLUSH_INTERVAL_MS) / 1000
+
+        self._buffer = []
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self._pending = set()
+
+    def record(self, user_id: int, channel_id: str, category: str, style: str, post_type: str,
+               success: bool, latency_ms: Optional[int] = None, message_id: Optional[int] = None,
+               error: Optional[Exception] = None):
+        self._buffer.append({
+            'user_id': user_id,
+            'channel_id': str(channel_id),
+            'category': category,
+            'style': style,
+            'post_type': post_type,
+            'success': success,
+            'latency_ms': latency_ms,
+            'message_id': message_id,
+            'error_class': type(error).__name__ if error else None,
+            'error_message': str(error)[:1000] if error else None,
+            'created_at': datetime.utcnow()
+        })
+
+        if len(self._buffer) >= self.batch_size:
+            self._spawn(self.flush())
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_later())
+
+    async def flush(self) -> int:
+        async with self._lock:
+            rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            try:
+                async with self.session_factory() as db:
+                    await db.execute(insert(PostLog).values(rows))
+                    await db.commit()
+            except Exception as e:
+                logging.error(f"Error writing {len(rows)} post logs: {e}")
+                return 0
+
+        return len(rows)
+
+    async def close(self):
+        if self._timer:
+            self._timer.cancel()
+
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+        await self.flush()
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+        finally:
+            self._timer = None
+
+        await self.flush()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
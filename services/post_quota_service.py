@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_
+from database.models import PostLog
+from services.redis_client import get_redis
+from config.settings import settings
+import logging
+
+
+class PostQuotaService:
+    """Daily post counters kept in Redis.
+
+    Each reservation bumps a per-channel and a per-user counter in a single Lua
+    call, so the limit check and the increment cannot race between workers.
+    Counters expire at the next local midnight.
+    """
+
+    KEY_PREFIX = 'post_quota'
+
+    RESERVE_SCRIPT = """
+    local current = redis.call('INCR', KEYS[1])
+    if current == 1 then
+        redis.call('EXPIREAT', KEYS[1], ARGV[2])
+    end
+    if current > tonumber(ARGV[1]) then
+        redis.call('DECR', KEYS[1])
+        return -1
+    end
+    if redis.call('INCR', KEYS[2]) == 1 then
+        redis.call('EXPIREAT', KEYS[2], ARGV[2])
+    end
+    return current
+    """
+
+    RELEASE_SCRIPT = """
+    for _, key in ipairs(KEYS) do
+        if tonumber(redis.call('GET', key) or '0') > 0 then
+            redis.call('DECR', key)
+        end
+    end
+    return 1
+    """
+
+    # Raises each counter to the matching ARGV count, never lowers it
+    RAISE_SCRIPT = """
+    local corrected = 0
+    for i, key in ipairs(KEYS) do
+        local count = tonumber(ARGV[i + 1])
+        if tonumber(redis.call('GET', key) or '0') < count then
+            redis.call('SET', key, count, 'EXAT', ARGV[1])
+            corrected = corrected + 1
+        end
+    end
+    return corrected
+    """
+
+    RECONCILE_BATCH_SIZE = 500
+
+    @staticmethod
+    def _today() -> datetime:
+        return datetime.now(ZoneInfo(settings.TIMEZONE))
+
+    @classmethod
+    def _keys(cls, user_id: int, channel_id: Optional[str] = None) -> Tuple[str, str]:
+        day = cls._today().strftime('%Y%m%d')
+        user_key = f"{cls.KEY_PREFIX}:{day}:{user_id}"
+        return f"{user_key}:{channel_id}", user_key
+
+    @classmethod
+    def _expire_at(cls) -> int:
+        now = cls._today()
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return int(midnight.timestamp())
+
+    @classmethod
+    async def reserve(cls, user_id: int, channel_id: str) -> Tuple[bool, int]:
+        channel_key, user_key = cls._keys(user_id, channel_id)
+
+        result = await get_redis().eval(
+            cls.RESERVE_SCRIPT, 2, channel_key, user_key,
+            settings.DAILY_POST_LIMIT, cls._expire_at()
+        )
+
+        if result == -1:
+            return False, settings.DAILY_POST_LIMIT
+
+        return True, int(result)
+
+    @classmethod
+    async def release(cls, user_id: int, channel_id: str):
+        channel_key, user_key = cls._keys(user_id, channel_id)
+        await get_redis().eval(cls.RELEASE_SCRIPT, 2, channel_key, user_key)
+
+    @classmethod
+    async def get_count(cls, user_id: int, channel_id: Optional[str] = None) -> int:
+        channel_key, user_key = cls._keys(user_id, channel_id)
+        value = await get_redis().get(channel_key if channel_id else user_key)
+        return int(value or 0)
+
+    @classmethod
+    async def reconcile(cls, db: AsyncSession) -> int:
+        # PostLog timestamps are naive UTC, counters follow the local day
+        day_start = cls._today().replace(hour=0, minute=0, second=0, microsecond=0)
+        day_start = day_start.astimezone(timezone.utc).replace(tzinfo=None)
+
+        # Autoposts don't use the manual quota and failed sends were released
+        result = await db.execute(
+            select(PostLog.user_id, PostLog.channel_id, func.count(PostLog.id))
+            .where(and_(
+                PostLog.created_at >= day_start,
+                PostLog.post_type == 'manual',
+                PostLog.success == True
+            ))
+            .group_by(PostLog.user_id, PostLog.channel_id)
+        )
+
+        user_totals = {}
+        channel_counts = {}
+        for user_id, channel_id, count in result.all():
+            channel_counts[cls._keys(user_id, channel_id)[0]] = count
+            user_key = cls._keys(user_id)[1]
+            user_totals[user_key] = user_totals.get(user_key, 0) + count
+
+        expire_at = cls._expire_at()
+        redis = get_redis()
+        corrected = 0
+
+        # Only raise counters: reservations for posts still in flight are not in PostLog yet.
+        # The compare and set run inside Lua so a concurrent reserve isn't overwritten.
+        counts = list({**channel_counts, **user_totals}.items())
+        for start in range(0, len(counts), cls.RECONCILE_BATCH_SIZE):
+            batch = counts[start:start + cls.RECONCILE_BATCH_SIZE]
+            corrected += await redis.eval(
+                cls.RAISE_SCRIPT, len(batch),
+                *[key for key, _ in batch], expire_at, *[count for _, count in batch]
+            )
+
+        if corrected:
+            logging.info(f"Reconciled {corrected} post quota counters with PostLog")
+
+        return corrected
@@ -0,0 +1,208 @@
+from dataclasses import dataclass, asdict, field
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_, true
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from database.models import User, Subscription, Transaction
+from services.redis_client import get_redis
+from config.settings import settings
+import json
+import logging
+
+
+@dataclass
+class SubscriptionHistoryItem:
+    plan_type: int
+    is_active: bool
+    created_at: Optional[datetime]
+
+
+@dataclass
+class ProfileSubscription:
+    plan_type: int
+    is_active: bool
+    expires_at: datetime
+
+
+@dataclass
+class ProfileSnapshot:
+    user_id: int
+    telegram_id: int
+    username: Optional[str]
+    created_at: Optional[datetime]
+    subscription: Optional[ProfileSubscription] = None
+    history: List[SubscriptionHistoryItem] = field(default_factory=list)
+    history_total: int = 0
+    total_spent: float = 0
+    total_payments: int = 0
+    last_payment_at: Optional[datetime] = None
+
+
+class ProfileService:
+    """Read model behind the profile screen.
+
+    Everything except today's post count comes from one statement: the user row
+    with LATERAL subqueries for the current subscription, the latest history
+    entries and the completed payment aggregates. Snapshots are cached for
+    PROFILE_SNAPSHOT_TTL seconds; subscription and payment changes call
+    ``invalidate``.
+    """
+
+    KEY_PREFIX = 'profile'
+
+    HISTORY_LIMIT = 3
+
+    @staticmethod
+    def _key(telegram_id: int) -> str:
+        return f"{ProfileService.KEY_PREFIX}:{telegram_id}"
+
+    @staticmethod
+    async def get(db: AsyncSession, telegram_id: int) -> Optional[ProfileSnapshot]:
+        try:
+            cached = await get_redis().get(ProfileService._key(telegram_id))
+            if cached:
+                return ProfileService._loads(cached)
+        except Exception as e:
+            logging.warning(f"Profile cache read failed for {telegram_id}: {e}")
+
+        snapshot = await ProfileService.load(db, telegram_id)
+
+        if snapshot:
+            try:
+                await get_redis().set(
+                    ProfileService._key(telegram_id),
+                    ProfileService._dumps(snapshot),
+                    ex=settings.PROFILE_SNAPSHOT_TTL
+                )
+            except Exception as e:
+                logging.warning(f"Profile cache write failed for {telegram_id}: {e}")
+
+        return snapshot
+
+    @staticmethod
+    async def load(db: AsyncSession, telegram_id: int) -> Optional[ProfileSnapshot]:
+        current = (
+            select(Subscription.plan_type, Subscription.is_active, Subscription.expires_at)
+            .where(and_(Subscription.user_id == User.id, Subscription.is_active == True))
+            .order_by(Subscription.expires_at.desc())
+            .limit(1)
+            .lateral('current_subscription')
+        )
+
+        latest = (
+            select(Subscription.plan_type, Subscription.is_active, Subscription.created_at)
+            .where(Subscription.user_id == User.id)
+            .order_by(Subscription.created_at.desc())
+            .limit(ProfileService.HISTORY_LIMIT)
+            .correlate(User)
+            .subquery('latest_subscriptions')
+        )
+        history = (
+            select(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            'plan_type', latest.c.plan_type,
+                            'is_active', latest.c.is_active,
+                            'created_at', latest.c.created_at
+                        ),
+                        latest.c.created_at.desc()
+                    ),
+                    type_=JSON
+                ).label('history_items')
+            )
+            .lateral('history')
+        )
+
+        history_total = (
+            select(func.count().label('total'))
+            .where(Subscription.user_id == User.id)
+            .lateral('history_total')
+        )
+
+        payments = (
+            select(
+                func.coalesce(func.sum(Transaction.amount), 0).label('total_spent'),
+                func.count().label('total_payments'),
+                func.max(Transaction.created_at).label('last_payment_at')
+            )
+            .where(and_(Transaction.user_id == User.id, Transaction.status == 'completed'))
+            .lateral('payments')
+        )
+
+        result = await db.execute(
+            select(
+                User.id, User.telegram_id, User.username, User.created_at,
+                current.c.plan_type, current.c.is_active, current.c.expires_at,
+                history.c.history_items,
+                history_total.c.total,
+                payments.c.total_spent, payments.c.total_payments, payments.c.last_payment_at
+            )
+            .select_from(User)
+            .outerjoin(current, true())
+            .join(history, true())
+            .join(history_total, true())
+            .join(payments, true())
+            .where(User.telegram_id == telegram_id)
+        )
+        row = result.first()
+
+        if not row:
+            return None
+
+        return ProfileSnapshot(
+            user_id=row.id,
+            telegram_id=row.telegram_id,
+            username=row.username,
+            created_at=row.created_at,
+            subscription=ProfileSubscription(
+                plan_type=row.plan_type,
+                is_active=row.is_active,
+                expires_at=row.expires_at
+            ) if row.expires_at else None,
+            history=[
+                SubscriptionHistoryItem(
+                    plan_type=item['plan_type'],
+                    is_active=item['is_active'],
+                    created_at=datetime.fromisoformat(item['created_at']) if item['created_at'] else None
+                )
+                for item in row.history_items or []
+            ],
+            history_total=row.total,
+            total_spent=row.total_spent,
+            total_payments=row.total_payments,
+            last_payment_at=row.last_payment_at
+        )
+
+    @staticmethod
+    async def invalidate(telegram_id: int):
+        try:
+            await get_redis().delete(ProfileService._key(telegram_id))
+        except Exception as e:
+            logging.error(f"Error invalidating profile snapshot for {telegram_id}: {e}")
+
+    @staticmethod
+    def _dumps(snapshot: ProfileSnapshot) -> str:
+        return json.dumps(asdict(snapshot), default=lambda value: value.isoformat())
+
+    @staticmethod
+    def _loads(raw: str) -> ProfileSnapshot:
+        data = json.loads(raw)
+
+        def parse(value):
+            return datetime.fromisoformat(value) if value else None
+
+        subscription = data.pop('subscription')
+        history = data.pop('history')
+
+        return ProfileSnapshot(
+            **{**data, 'created_at': parse(data['created_at']), 'last_payment_at': parse(data['last_payment_at'])},
+            subscription=ProfileSubscription(
+                **{**subscription, 'expires_at': parse(subscription['expires_at'])}
+            ) if subscription else None,
+            history=[
+                SubscriptionHistoryItem(**{**item, 'created_at': parse(item['created_at'])})
+                for item in history
+            ]
+        )
@@ -0,0 +1,21 @@
+import asyncio
+import weakref
+
+from redis import asyncio as aioredis
+
+from config.settings import settings
+
+# Celery tasks run each job in a fresh event loop via asyncio.run(), and an
+# asyncio Redis connection pool cannot be shared between loops.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_redis() -> aioredis.Redis:
+    loop = asyncio.get_running_loop()
+
+    client = _clients.get(loop)
+    if client is None:
+        client = aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        _clients[loop] = client
+
+    return client
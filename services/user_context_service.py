@@ -0,0 +1,146 @@
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from database.models import User, Subscription
+from services.redis_client import get_redis
+from config.settings import settings
+import json
+import logging
+
+
+@dataclass
+class CachedUser:
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    language: Optional[str]
+    created_at: Optional[datetime]
+
+
+@dataclass
+class CachedSubscription:
+    id: int
+    plan_type: int
+    is_active: bool
+    expires_at: datetime
+    created_at: Optional[datetime]
+
+
+@dataclass
+class UserContext:
+    user: CachedUser
+    subscription: Optional[CachedSubscription] = None
+
+    @property
+    def active_subscription(self) -> Optional[CachedSubscription]:
+        if self.subscription and self.subscription.expires_at > datetime.utcnow():
+            return self.subscription
+        return None
+
+
+class UserContextService:
+    """Resolves a Telegram user and their current subscription.
+
+    Snapshots are cached in Redis for USER_CONTEXT_TTL seconds. Anything that
+    changes the user row or their subscriptions should call ``invalidate``.
+    Expiry needs no invalidation: ``active_subscription`` checks it on read.
+    """
+
+    KEY_PREFIX = 'user_context'
+
+    DATETIME_FIELDS = ('created_at', 'expires_at')
+
+    @staticmethod
+    def _key(telegram_id: int) -> str:
+        return f"{UserContextService.KEY_PREFIX}:{telegram_id}"
+
+    @staticmethod
+    async def get(db: AsyncSession, telegram_id: int) -> Optional[UserContext]:
+        try:
+            cached = await get_redis().get(UserContextService._key(telegram_id))
+            if cached:
+                return UserContextService._loads(cached)
+        except Exception as e:
+            logging.warning(f"User context cache read failed for {telegram_id}: {e}")
+
+        context = await UserContextService.load(db, telegram_id)
+
+        # Unknown users are not cached, /start creates them right away
+        if context:
+            try:
+                await get_redis().set(
+                    UserContextService._key(telegram_id),
+                    UserContextService._dumps(context),
+                    ex=settings.USER_CONTEXT_TTL
+                )
+            except Exception as e:
+                logging.warning(f"User context cache write failed for {telegram_id}: {e}")
+
+        return context
+
+    @staticmethod
+    async def load(db: AsyncSession, telegram_id: int) -> Optional[UserContext]:
+        result = await db.execute(
+            select(User, Subscription)
+            .outerjoin(
+                Subscription,
+                and_(
+                    Subscription.user_id == User.id,
+                    Subscription.is_active == True
+                )
+            )
+            .where(User.telegram_id == telegram_id)
+            .order_by(Subscription.expires_at.desc().nulls_last())
+            .limit(1)
+        )
+        row = result.first()
+
+        if not row:
+            return None
+
+        user, subscription = row
+
+        return UserContext(
+            user=CachedUser(
+                id=user.id,
+                telegram_id=user.telegram_id,
+                username=user.username,
+                language=user.language,
+                created_at=user.created_at
+            ),
+            subscription=CachedSubscription(
+                id=subscription.id,
+                plan_type=subscription.plan_type,
+                is_active=subscription.is_active,
+                expires_at=subscription.expires_at,
+                created_at=subscription.created_at
+            ) if subscription else None
+        )
+
+    @staticmethod
+    async def invalidate(telegram_id: int):
+        try:
+            await get_redis().delete(UserContextService._key(telegram_id))
+        except Exception as e:
+            logging.error(f"Error invalidating user context for {telegram_id}: {e}")
+
+    @staticmethod
+    def _dumps(context: UserContext) -> str:
+        return json.dumps(asdict(context), default=lambda value: value.isoformat())
+
+    @staticmethod
+    def _loads(raw: str) -> UserContext:
+        data = json.loads(raw)
+
+        for part in ('user', 'subscription'):
+            if data.get(part):
+                for name in UserContextService.DATETIME_FIELDS:
+                    if data[part].get(name):
+                        data[part][name] = datetime.fromisoformat(data[part][name])
+
+        return UserContext(
+            user=CachedUser(**data['user']),
+            subscription=CachedSubscription(**data['subscription']) if data['subscription'] else None
+        )
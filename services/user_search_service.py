@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, or_, case, true
+from database.models import User, Subscription
+
+
+@dataclass
+class UserSearchResult:
+    id: int
+    telegram_id: int
+    username: Optional[str]
+    created_at: Optional[datetime]
+    plan_type: Optional[int] = None
+    is_active: Optional[bool] = None
+    expires_at: Optional[datetime] = None
+
+    @property
+    def has_active_subscription(self) -> bool:
+        return bool(self.is_active and self.expires_at and self.expires_at > datetime.utcnow())
+
+
+class UserSearchService:
+    """Admin user lookup by telegram_id or by username.
+
+    Usernames are matched on ``lower(username)`` as exact, prefix or trigram
+    similarity (pg_trgm ``%``), all served by ``idx_users_username_trgm``.
+    Each result carries the user's latest subscription from the same query.
+    """
+
+    DEFAULT_LIMIT = 10
+
+    @staticmethod
+    async def search(db: AsyncSession, query: str, limit: int = DEFAULT_LIMIT) -> List[UserSearchResult]:
+        query = query.strip().lstrip('@').lower()
+        if not query:
+            return []
+
+        latest_subscription = (
+            select(Subscription.plan_type, Subscription.is_active, Subscription.expires_at)
+            .where(Subscription.user_id == User.id)
+            .order_by(Subscription.is_active.desc(), Subscription.expires_at.desc())
+            .limit(1)
+            .lateral('latest_subscription')
+        )
+
+        stmt = (
+            select(
+                User.id, User.telegram_id, User.username, User.created_at,
+                latest_subscription.c.plan_type,
+                latest_subscription.c.is_active,
+                latest_subscription.c.expires_at
+            )
+            .outerjoin(latest_subscription, true())
+            .limit(limit)
+        )
+
+        if query.isdigit():
+            stmt = stmt.where(User.telegram_id == int(query))
+        else:
+            username = func.lower(User.username)
+            prefix = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+            stmt = stmt.where(
+                or_(username.like(prefix), username.op('%')(query))
+            ).order_by(
+                case((username == query, 0), (username.like(prefix), 1), else_=2),
+                func.similarity(username, query).desc(),
+                username
+            )
+
+        result = await db.execute(stmt)
+
+        return [UserSearchResult(**row._mapping) for row in result.all()]
@@ -0,0 +1,111 @@
+import functools
+import hashlib
+import json
+import logging
+import threading
+
+import redis
+from redis.exceptions import LockError
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+
+
+def get_redis() -> redis.Redis:
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+def _heartbeat(lock, lease: int, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            lock.extend(lease, replace_ttl=True)
+        except LockError as e:
+            logger.warning(f"Lost task lock {lock.name}: {e}")
+            return
+        except Exception as e:
+            logger.warning(f"Failed to extend task lock {lock.name}: {e}")
+
+
+def singleton_task(lease: int = 120, heartbeat: float = None, name: str = None):
+    """Skip a run while another copy of the same task still holds its Redis lock.
+
+    The lock lives for ``lease`` seconds and is extended every ``heartbeat``
+    seconds while the task is running, so a crashed worker frees it quickly.
+    """
+    interval = heartbeat or lease / 3
+
+    def decorator(func):
+        lock_name = f"task_lock:{name or func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # thread_local=False so the heartbeat thread can extend the lock
+            lock = get_redis().lock(lock_name, timeout=lease, thread_local=False)
+
+            if not lock.acquire(blocking=False):
+                logger.info(f"{func.__name__} is already running, skipping this run")
+                return None
+
+            stop = threading.Event()
+            heartbeat_thread = threading.Thread(
+                target=_heartbeat, args=(lock, lease, interval, stop), daemon=True
+            )
+            heartbeat_thread.start()
+
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stop.set()
+                heartbeat_thread.join()
+                try:
+                    lock.release()
+                except LockError:
+                    logger.warning(f"Task lock {lock_name} expired before release")
+
+        return wrapper
+
+    return decorator
+
+
+def idempotent_task(ttl: int = 60, name: str = None, key_arg: str = None):
+    """Drop duplicate calls within ``ttl`` seconds.
+
+    Calls are identified by their arguments, or by the ``key_arg`` keyword
+    argument when given, so repeated deliveries of one request are dropped
+    while a deliberate second request with the same arguments still runs.
+    Calls without that argument are not deduplicated.
+    """
+
+    def decorator(func):
+        prefix = f"task_once:{name or func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key_arg:
+                if kwargs.get(key_arg) is None:
+                    return func(*args, **kwargs)
+                payload = str(kwargs[key_arg])
+            else:
+                payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+            key = f"{prefix}:{hashlib.sha1(payload.encode()).hexdigest()}"
+
+            if not get_redis().set(key, 1, nx=True, ex=ttl):
+                logger.info(f"Duplicate {func.__name__} call skipped: {payload}")
+                return None
+
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                # Let a retry through if the first attempt failed
+                get_redis().delete(key)
+                raise
+
+        return wrapper
+
+    return decorator
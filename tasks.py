@@ -1,13 +1,18 @@
 import asyncio
 import logging
-import os
-import json
 from datetime import datetime, timedelta, date, timezone
 
 from celery_app import celery_app
 from aiogram import Bot
-from database.database import async_session
+from bot.factory import create_bot
+from database.database import async_session, async_read_session
 from services.autopost_service import AutopostService
+from services.broadcast_service import BroadcastService
+from services.backup_service import BackupService
+from services.analytics_service import AnalyticsService
+from services.post_quota_service import PostQuotaService
+from services.partition_service import PartitionService
+from task_locks import singleton_task, idempotent_task
 from config.settings import settings
 from database.models import TestPostLimit
 from sqlalchemy import delete
@@ -45,6 +50,7 @@ def get_style_emoji_name(style):
 
 
 @celery_app.task
+@singleton_task(lease=300)
 def process_autoposts():
     try:
         return asyncio.run(_process_autoposts_async())
@@ -55,18 +61,22 @@ def process_autoposts():
 
 async def _process_autoposts_async():
     bot = None
+    autopost_service = None
     try:
-        bot = Bot(token=settings.BOT_TOKEN)
+        bot = create_bot()
         autopost_service = AutopostService(bot)
 
         async with async_session() as db:
             await autopost_service.process_autoposts(db)
     finally:
+        if autopost_service:
+            await autopost_service.close()
         if bot:
             await bot.session.close()
 
 
 @celery_app.task
+@singleton_task()
 def cleanup_old_test_post_limits():
     try:
         return asyncio.run(_cleanup_old_test_post_limits_async())
@@ -93,7 +103,49 @@ async def _cleanup_old_test_post_limits_async():
 
 
 @celery_app.task
-def send_manual_post(user_id: int, channel_id: str, category: str, style: str):
+@singleton_task()
+def maintain_log_partitions():
+    try:
+        return asyncio.run(_maintain_log_partitions_async())
+    except Exception as e:
+        logger.error(f"Error in maintain_log_partitions: {e}", exc_info=True)
+        raise
+
+
+async def _maintain_log_partitions_async():
+    from database.database import engine
+
+    today = datetime.utcnow().date()
+
+    async with engine.begin() as conn:
+        created = await PartitionService.ensure_partitions(
+            conn, today, settings.LOG_PARTITION_MONTHS_AHEAD
+        )
+        dropped = await PartitionService.drop_expired_partitions(
+            conn, today, settings.LOG_RETENTION_MONTHS
+        )
+
+    return {'created': created, 'dropped': dropped}
+
+
+@celery_app.task
+@singleton_task()
+def reconcile_post_quotas():
+    try:
+        return asyncio.run(_reconcile_post_quotas_async())
+    except Exception as e:
+        logging.error(f"Error in reconcile_post_quotas: {e}")
+        raise
+
+
+async def _reconcile_post_quotas_async():
+    async with async_session() as db:
+        return await PostQuotaService.reconcile(db)
+
+
+@celery_app.task
+@idempotent_task(ttl=60, key_arg='request_id')
+def send_manual_post(user_id: int, channel_id: str, category: str, style: str, request_id: str = None):
     try:
         return asyncio.run(_send_manual_post_async(user_id, channel_id, category, style))
     except Exception as e:
@@ -112,116 +164,96 @@ def schedule_post_at_time(user_id: int, channel_id: str, category: str, style: s
 
 async def _send_manual_post_async(user_id: int, channel_id: str, category: str, style: str):
     bot = None
+    autopost_service = None
     try:
         logger.info(
             f"Starting post send: user_id={user_id}, channel_id={channel_id}, category={category}, style={style}")
 
-        bot = Bot(token=settings.BOT_TOKEN)
+        bot = create_bot()
         autopost_service = AutopostService(bot)
 
         async with async_session() as db:
-            from database.models import User, PostLog
-            from sqlalchemy import select, func, and_
-            from datetime import date
+            from database.models import User
+            from sqlalchemy import select
 
             user_result = await db.execute(
-                select(User).where(User.id == user_id)
+                select(User.telegram_id).where(User.id == user_id)
             )
-            user = user_result.scalar_one_or_none()
+            telegram_id = user_result.scalar()
 
-            if not user:
+            if telegram_id is None:
                 logger.error(f"User with ID {user_id} not found")
                 return
 
-            today = date.today()
-            posts_today_result = await db.execute(
-                select(func.count(PostLog.id)).where(
-                    and_(
-                        PostLog.user_id == user_id,
-                        PostLog.channel_id == channel_id,
-                        PostLog.created_at >= today
-                    )
-                )
-            )
-            posts_today = posts_today_result.scalar() or 0
-
-            if posts_today >= 3:
-                logger.warning(f"User {user_id} reached daily post limit: {posts_today}/3")
-
-                telegram_id = user.telegram_id
-                if telegram_id:
-                    limit_message = (
-                        f"❌ <b>Post limit exceeded</b>\n\n"
-                        f"📊 Today sent: {posts_today}/3 posts\n"
-                        f"📢 Channel: {channel_id}\n"
-                        f"⏰ Try tomorrow or wait for autoposting\n\n"
-                        f"💡 Limit resets every day at 00:00"
-                    )
-
-                    try:
-                        await bot.send_message(
-                            chat_id=telegram_id,
-                            text=limit_message,
-                            parse_mode='HTML'
-                        )
-                        logger.info(f"Limit notification sent to user {telegram_id}")
-                    except Exception as notify_error:
-                        logger.warning(f"Failed to send limit notification to user {telegram_id}: {notify_error}")
-
-                return
-
-            await autopost_service.send_single_post(
-                db=db,
-                user_id=user_id,
-                channel_id=channel_id,
-                category=category,
-                style=style
-            )
+        limit = settings.DAILY_POST_LIMIT
+        reserved, posts_today = await PostQuotaService.reserve(user_id, channel_id)
 
-        logger.info("Post sent successfully")
-
-        async with async_session() as db:
-            from database.models import User
-            from sqlalchemy import select
-
-            user_result = await db.execute(
-                select(User.telegram_id).where(User.id == user_id)
-            )
-            telegram_id = user_result.scalar()
+        if not reserved:
+            logger.warning(f"User {user_id} reached daily post limit: {posts_today}/{limit}")
 
             if telegram_id:
-                posts_today_result = await db.execute(
-                    select(func.count(PostLog.id)).where(
-                        and_(
-                            PostLog.user_id == user_id,
-                            PostLog.channel_id == channel_id,
-                            PostLog.created_at >= today
-                        )
-                    )
+                limit_message = (
+                    f"❌ <b>Post limit exceeded</b>\n\n"
+                    f"📊 Today sent: {posts_today}/{limit} posts\n"
+                    f"📢 Channel: {channel_id}\n"
+                    f"⏰ Try tomorrow or wait for autoposting\n\n"
+                    f"💡 Limit resets every day at 00:00"
                 )
-                posts_after = posts_today_result.scalar() or 0
 
                 try:
-                    success_message = (
-                        f"✅ <b>Post sent successfully!</b>\n\n"
-                        f"📢 Channel: {channel_id}\n"
-                        f"📂 Category: {get_category_emoji_name(category)}\n"
-                        f"🎨 Style: {get_style_emoji_name(style)}\n"
-                        f"⏰ Time: {datetime.now(MOSCOW_TZ).strftime('%H:%M:%S')}\n"
-                        f"📊 Posts today: {posts_after}/3"
-                    )
-
                     await bot.send_message(
                         chat_id=telegram_id,
-                        text=success_message,
+                        text=limit_message,
                         parse_mode='HTML'
                     )
-                    logger.info(f"Success notification sent to user {telegram_id}")
-
+                    logger.info(f"Limit notification sent to user {telegram_id}")
                 except Exception as notify_error:
-                    logger.warning(f"Failed to send success notification to user {telegram_id}: {notify_error}")
-            else:
-                logger.warning(f"Telegram ID not found for user with ID {user_id}")
+                    logger.warning(f"Failed to send limit notification to user {telegram_id}: {notify_error}")
+
+            return
+
+        try:
+            async with async_session() as db:
+                sent = await autopost_service.send_single_post(
+                    db=db,
+                    user_id=user_id,
+                    channel_id=channel_id,
+                    category=category,
+                    style=style
+                )
+        except Exception:
+            await PostQuotaService.release(user_id, channel_id)
+            raise
+
+        if not sent:
+            await PostQuotaService.release(user_id, channel_id)
+            logger.warning(f"Post to {channel_id} for user {user_id} was not sent, quota released")
+            return
+
+        logger.info("Post sent successfully")
+
+        if telegram_id:
+            try:
+                success_message = (
+                    f"✅ <b>Post sent successfully!</b>\n\n"
+                    f"📢 Channel: {channel_id}\n"
+                    f"📂 Category: {get_category_emoji_name(category)}\n"
+                    f"🎨 Style: {get_style_emoji_name(style)}\n"
+                    f"⏰ Time: {datetime.now(MOSCOW_TZ).strftime('%H:%M:%S')}\n"
+                    f"📊 Posts today: {posts_today}/{limit}"
+                )
+
+                await bot.send_message(
+                    chat_id=telegram_id,
+                    text=success_message,
+                    parse_mode='HTML'
+                )
+                logger.info(f"Success notification sent to user {telegram_id}")
+
+            except Exception as notify_error:
+                logger.warning(f"Failed to send success notification to user {telegram_id}: {notify_error}")
+        else:
+            logger.warning(f"Telegram ID not found for user with ID {user_id}")
 
     except Exception as e:
         logger.error(f"Error sending post: {e}", exc_info=True)
@@ -257,6 +289,8 @@ async def _send_manual_post_async(user_id: int, channel_id: str, category: str,
             logger.warning(f"Failed to send error notification: {notify_error}")
 
     finally:
+        if autopost_service:
+            await autopost_service.close()
         if bot:
             await bot.session.close()
 
@@ -292,6 +326,7 @@ async def _schedule_post_async(user_id: int, channel_id: str, category: str, sty
 
 
 @celery_app.task
+@singleton_task(lease=120)
 def send_scheduled_posts():
     try:
         return asyncio.run(_send_scheduled_posts_async())
@@ -302,8 +337,9 @@ def send_scheduled_posts():
 
 async def _send_scheduled_posts_async():
     bot = None
+    autopost_service = None
     try:
-        bot = Bot(token=settings.BOT_TOKEN)
+        bot = create_bot()
         autopost_service = AutopostService(bot)
 
         current_time = datetime.now(MOSCOW_TZ).strftime('%H:%M')
@@ -315,39 +351,58 @@ async def _send_scheduled_posts_async():
         logging.error(f"Error processing scheduled posts: {e}")
         raise
     finally:
+        if autopost_service:
+            await autopost_service.close()
         if bot:
             await bot.session.close()
 
 
 @celery_app.task
-def send_broadcast_message(user_ids: list, message_text: str):
+def send_broadcast_message(audience, message_text: str):
     try:
-        return asyncio.run(_send_broadcast_async(user_ids, message_text))
+        return asyncio.run(_send_broadcast_async(audience, message_text))
     except Exception as e:
         logger.error(f"Error in send_broadcast_message: {e}", exc_info=True)
         raise
 
 
-async def _send_broadcast_async(user_ids: list, message_text: str):
+async def _send_broadcast_to_batch(bot: Bot, user_ids: list, message_text: str):
+    successful = 0
+    failed = 0
+
+    for user_id in user_ids:
+        try:
+            await bot.send_message(
+                chat_id=user_id,
+                text=message_text,
+                parse_mode='HTML'
+            )
+            successful += 1
+            await asyncio.sleep(0.1)
+        except Exception as e:
+            failed += 1
+            logging.warning(f"Failed to send message to user {user_id}: {e}")
+
+    return successful, failed
+
+
+async def _send_broadcast_async(audience, message_text: str):
     bot = None
     try:
-        bot = Bot(token=settings.BOT_TOKEN)
+        bot = create_bot()
 
         successful = 0
         failed = 0
 
-        for user_id in user_ids:
-            try:
-                await bot.send_message(
-                    chat_id=user_id,
-                    text=message_text,
-                    parse_mode='HTML'
-                )
-                successful += 1
-                await asyncio.sleep(0.1)
-            except Exception as e:
-                failed += 1
-                logging.warning(f"Failed to send message to user {user_id}: {e}")
+        if isinstance(audience, list):
+            # Legacy payload with explicit recipient IDs
+            successful, failed = await _send_broadcast_to_batch(bot, audience, message_text)
+        else:
+            async for user_ids in BroadcastService.iter_recipients(
+                    async_read_session, audience, settings.BROADCAST_BATCH_SIZE):
+                batch_successful, batch_failed = await _send_broadcast_to_batch(bot, user_ids, message_text)
+                successful += batch_successful
+                failed += batch_failed
 
         logging.info(f"Broadcast completed: {successful} successful, {failed} errors")
     finally:
@@ -356,47 +411,48 @@ async def _send_broadcast_async(user_ids: list, message_text: str):
 
 
 @celery_app.task
-def generate_analytics_report(period_days: int = 7):
+@singleton_task()
+def refresh_analytics_rollups(days_back: int = 1):
     try:
-        return asyncio.run(_generate_analytics_async(period_days))
+        return asyncio.run(_refresh_analytics_rollups_async(days_back))
     except Exception as e:
-        logger.error(f"Error in generate_analytics_report: {e}", exc_info=True)
+        logger.error(f"Error in refresh_analytics_rollups: {e}", exc_info=True)
         raise
 
 
-async def _generate_analytics_async(period_days: int):
+async def _refresh_analytics_rollups_async(days_back: int):
     try:
         async with async_session() as db:
-            from datetime import datetime, timedelta
-            from sqlalchemy import select, func, and_
-            from database.models import User, Subscription, Transaction, AutopostSettings
+            # The first run after deploy backfills everything the raw tables hold
+            missing_days = await AnalyticsService.missing_history_days(db)
+            if missing_days > days_back:
+                logging.info(f"Backfilling analytics rollups for the last {missing_days} days")
+                days_back = missing_days
 
-            start_date = datetime.now(MOSCOW_TZ) - timedelta(days=period_days)
+            await AnalyticsService.refresh_rollups(db, days_back)
 
-            new_users_result = await db.execute(
-                select(func.count(User.id)).where(User.created_at >= start_date)
-            )
-            new_users = new_users_result.scalar() or 0
+    except Exception as e:
+        logging.error(f"Error refreshing analytics rollups: {e}")
+        raise
 
-            active_subs_result = await db.execute(
-                select(func.count(Subscription.id)).where(
-                    and_(
-                        Subscription.is_active == True,
-                        Subscription.expires_at > datetime.now(MOSCOW_TZ)
-                    )
-                )
-            )
-            active_subs = active_subs_result.scalar() or 0
 
-            total_revenue_result = await db.execute(
-                select(func.sum(Transaction.amount)).where(
-                    and_(
-                        Transaction.status == 'completed',
-                        Transaction.created_at >= start_date
-                    )
-                )
-            )
-            total_revenue = total_revenue_result.scalar() or 0
+@celery_app.task
+@singleton_task()
+def generate_analytics_report(period_days: int = 7):
+    try:
+        return asyncio.run(_generate_analytics_async(period_days))
+    except Exception as e:
+        logger.error(f"Error in generate_analytics_report: {e}", exc_info=True)
+        raise
+
+
+async def _generate_analytics_async(period_days: int):
+    try:
+        async with async_read_session() as db:
+            from sqlalchemy import select, func
+            from database.models import AutopostSettings
+
+            overview = await AnalyticsService.get_overview(db, period_days)
 
             active_autoposts_result = await db.execute(
                 select(func.count(AutopostSettings.id.distinct())).where(
@@ -407,9 +463,11 @@ async def _generate_analytics_async(period_days: int):
 
             logging.info(
                 f"Analytics for {period_days} days: "
-                f"New users: {new_users}, "
-                f"Active subscriptions: {active_subs}, "
-                f"Revenue: {total_revenue} stars, "
+                f"New users: {overview['new_users']}, "
+                f"Active subscriptions: {overview['active_subscriptions']}, "
+                f"Revenue: {overview['revenue']} stars, "
+                f"Posts sent: {overview['posts_sent']}, "
+                f"Posts failed: {overview['posts_failed']}, "
                 f"Active autoposts: {active_autoposts}"
             )
 
@@ -419,6 +477,7 @@ async def _generate_analytics_async(period_days: int):
 
 
 @celery_app.task
+@singleton_task()
 def check_subscription_expiry():
     try:
         return asyncio.run(_check_subscription_expiry_async())
@@ -430,7 +489,7 @@ def check_subscription_expiry():
 async def _check_subscription_expiry_async():
     bot = None
     try:
-        bot = Bot(token=settings.BOT_TOKEN)
+        bot = create_bot()
 
         async with async_session() as db:
             from database.models import User, Subscription
@@ -480,6 +539,7 @@ async def _check_subscription_expiry_async():
 
 
 @celery_app.task
+@singleton_task()
 def cleanup_expired_subscriptions():
     try:
         return asyncio.run(_cleanup_expired_subscriptions_async())
@@ -494,35 +554,64 @@ async def _cleanup_expired_subscriptions_async():
             from database.models import Subscription, AutopostSettings
             from sqlalchemy import select, and_, update
 
-            now = datetime.now(MOSCOW_TZ)
+            # expires_at is stored as naive UTC
+            now = datetime.utcnow()
+            batch_size = settings.CLEANUP_BATCH_SIZE
 
-            expired_subs_result = await db.execute(
-                select(Subscription).where(
-                    and_(
-                        Subscription.is_active == True,
-                        Subscription.expires_at <= now
+            deactivated_count = 0
+            deactivated_settings_count = 0
+
+            while True:
+                expired_ids = (
+                    select(Subscription.id)
+                    .where(
+                        and_(
+                            Subscription.is_active == True,
+                            Subscription.expires_at <= now
+                        )
                     )
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
                 )
-            )
-            expired_subs = expired_subs_result.scalars().all()
 
-            deactivated_count = 0
+                subs_result = await db.execute(
+                    update(Subscription)
+                    .where(Subscription.id.in_(expired_ids.scalar_subquery()))
+                    .values(is_active=False)
+                    .returning(Subscription.user_id)
+                    .execution_options(synchronize_session=False)
+                )
+                user_ids = subs_result.scalars().all()
 
-            for subscription in expired_subs:
-                subscription.is_active = False
+                if not user_ids:
+                    break
 
-                await db.execute(
-                    update(AutopostSettings).where(
-                        AutopostSettings.user_id == subscription.user_id
-                    ).values(is_active=False)
+                settings_result = await db.execute(
+                    update(AutopostSettings)
+                    .where(
+                        and_(
+                            AutopostSettings.user_id.in_(set(user_ids)),
+                            AutopostSettings.is_active == True
+                        )
+                    )
+                    .values(is_active=False)
+                    .returning(AutopostSettings.id)
+                    .execution_options(synchronize_session=False)
                 )
 
-                deactivated_count += 1
+                await db.commit()
 
-            await db.commit()
+                deactivated_count += len(user_ids)
+                deactivated_settings_count += len(settings_result.all())
+
+                if len(user_ids) < batch_size:
+                    break
 
             if deactivated_count > 0:
-                logging.info(f"Deactivated {deactivated_count} expired subscriptions")
+                logging.info(
+                    f"Deactivated {deactivated_count} expired subscriptions "
+                    f"and {deactivated_settings_count} autopost settings"
+                )
 
     except Exception as e:
         logging.error(f"Error deactivating subscriptions: {e}")
@@ -530,6 +619,7 @@ async def _cleanup_expired_subscriptions_async():
 
 
 @celery_app.task
+@singleton_task(lease=300)
 def backup_database():
     try:
         return asyncio.run(_backup_database_async())
@@ -540,73 +630,22 @@ def backup_database():
 
 async def _backup_database_async():
     try:
-        async with async_session() as db:
-            from database.models import User, Subscription, Transaction
-            from sqlalchemy import select
+        backup_service = BackupService(
+            backup_dir=settings.BACKUP_DIR,
+            compression=settings.BACKUP_COMPRESSION,
+            batch_size=settings.BACKUP_BATCH_SIZE,
+            full_interval_days=settings.BACKUP_FULL_INTERVAL_DAYS,
+            retention_days=settings.BACKUP_RETENTION_DAYS
+        )
 
-            now = datetime.now(MOSCOW_TZ)
+        now = datetime.now(MOSCOW_TZ)
+
+        async with async_read_session() as db:
+            backup_path = await backup_service.create_backup(db, now)
+
+        removed = backup_service.cleanup_old_backups(now)
 
-            backup_data = {
-                'timestamp': now.isoformat(),
-                'users': [],
-                'subscriptions': [],
-                'transactions': []
-            }
-
-            users_result = await db.execute(select(User))
-            users = users_result.scalars().all()
-
-            for user in users:
-                backup_data['users'].append({
-                    'telegram_id': user.telegram_id,
-                    'username': user.username,
-                    'language': user.language,
-                    'created_at': user.created_at.isoformat() if user.created_at else None
-                })
-
-            subs_result = await db.execute(select(Subscription))
-            subscriptions = subs_result.scalars().all()
-
-            for sub in subscriptions:
-                backup_data['subscriptions'].append({
-                    'user_id': sub.user_id,
-                    'plan_type': sub.plan_type,
-                    'is_active': sub.is_active,
-                    'created_at': sub.created_at.isoformat() if sub.created_at else None,
-                    'expires_at': sub.expires_at.isoformat() if sub.expires_at else None
-                })
-
-            trans_result = await db.execute(select(Transaction))
-            transactions = trans_result.scalars().all()
-
-            for trans in transactions:
-                backup_data['transactions'].append({
-                    'user_id': trans.user_id,
-                    'amount': trans.amount,
-                    'status': trans.status,
-                    'external_id': trans.external_id,
-                    'created_at': trans.created_at.isoformat() if trans.created_at else None
-                })
-
-            backup_dir = '/app/backups'
-            os.makedirs(backup_dir, exist_ok=True)
-
-            backup_filename = f"backup_{now.strftime('%Y%m%d_%H%M%S')}.json"
-            backup_path = os.path.join(backup_dir, backup_filename)
-
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, ensure_ascii=False, indent=2)
-
-            cutoff_time = now - timedelta(days=30)
-            for filename in os.listdir(backup_dir):
-                if filename.startswith('backup_') and filename.endswith('.json'):
-                    file_path = os.path.join(backup_dir, filename)
-                    file_time = datetime.fromtimestamp(os.path.getctime(file_path))
-                    file_time = MOSCOW_TZ.localize(file_time)
-                    if file_time < cutoff_time:
-                        os.remove(file_path)
-
-            logging.info(f"Backup created: {backup_path}")
+        logging.info(f"Backup created: {backup_path}, removed {removed} old backups")
 
     except Exception as e:
         logging.error(f"Error creating backup: {e}")
@@ -625,7 +664,7 @@ def health_check():
 async def _health_check_async():
     bot = None
     try:
-        bot = Bot(token=settings.BOT_TOKEN)
+        bot = create_bot()
 
         async with async_session() as db:
             from sqlalchemy import text
@@ -0,0 +1,41 @@
+from aiogram.types import Update
+
+from bot.sharding import dump_update, update_chat_id
+
+SENDER = {'id': 42, 'is_bot': False, 'first_name': 'Test'}
+
+
+def test_inline_callback_query_routes_by_sender():
+    update = Update.model_validate({
+        'update_id': 1,
+        'callback_query': {
+            'id': '1', 'from': SENDER, 'chat_instance': '1',
+            'inline_message_id': 'inline', 'data': 'my_profile'
+        }
+    })
+
+    assert update_chat_id(dump_update(update)) == 42
+
+
+def test_callback_query_routes_by_message_chat():
+    update = Update.model_validate({
+        'update_id': 2,
+        'callback_query': {
+            'id': '2', 'from': SENDER, 'chat_instance': '2', 'data': 'my_profile',
+            'message': {'message_id': 1, 'date': 0, 'chat': {'id': -100, 'type': 'group'}}
+        }
+    })
+
+    assert update_chat_id(dump_update(update)) == -100
+
+
+def test_pre_checkout_query_routes_by_sender():
+    update = Update.model_validate({
+        'update_id': 3,
+        'pre_checkout_query': {
+            'id': '3', 'from': SENDER, 'currency': 'XTR',
+            'total_amount': 100, 'invoice_payload': 'sub_30'
+        }
+    })
+
+    assert update_chat_id(dump_update(update)) == 42